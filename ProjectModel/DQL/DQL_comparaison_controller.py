@@ -1,29 +1,155 @@
+import argparse
+import baselines
 import matplotlib.pyplot as plt
+import multiprocessing
 import numpy as np
 from dql_model import TrafficLightRL  
+from metrics_log import read_episodes, follow_episodes, episode_log_path
+from sumo_outputs import SumoOutputs
 import json
 import os
+import sys
+import time
+
+# Scénarios comparés par défaut ; d'autres configurations peuvent être ajoutées
+# (toute clé autre que name, backend, prioritized_replay et sumo_outputs est passée à TrafficLightRL.train ;
+# sumo_outputs : options de SumoOutputs, sorties SUMO du dernier épisode dans <run>/sumo_outputs)
+DEFAULT_SCENARIOS = (
+    {"name": "with_controller", "control_traffic_lights": True},
+    {"name": "without_controller", "control_traffic_lights": False},
+)
+SUMO_OUTPUT_DIR = "sumo_outputs"
+
+
+def train_scenario(scenario, sumo_config, num_episodes, output_dir):
+    """Processus de travail : entraîner un scénario dans son propre répertoire
+    (instance SUMO, modèles, points de reprise, journal des récompenses, sortie console dans train.log,
+    sorties SUMO et leur résumé report.json dans sumo_outputs/ si demandées)"""
+    os.makedirs(output_dir, exist_ok=True)
+    os.chdir(output_dir)  # train écrit ses fichiers en chemins relatifs
+    log = open("train.log", "a", buffering=1)
+    os.dup2(log.fileno(), 1)  # Y compris la sortie de SUMO (processus fils)
+    os.dup2(log.fileno(), 2)
+    options = dict(scenario)
+    name = options.pop("name")
+    agent = TrafficLightRL(prioritized_replay=options.pop("prioritized_replay", False),
+                           backend=options.pop("backend", "traci"))
+    agent.NUM_EPISODES = num_episodes
+    outputs = options.pop("sumo_outputs", None)
+    if outputs is not None:
+        outputs = SumoOutputs(SUMO_OUTPUT_DIR, **outputs)
+        options["sumo_args"] = outputs.args(sumo_config)
+    agent.train(sumo_config, model_name=name, **options)
+    if outputs is not None and agent.rewards_history:
+        outputs.save_report()
+    if len(agent.rewards_history) < num_episodes:  # train affiche l'erreur sans la propager
+        sys.exit(f"{name} : {len(agent.rewards_history)}/{num_episodes} épisodes terminés")
+
+
 #comparer sans et avec controlleur
 class TrafficComparison:
     def __init__(self, sumo_config, num_episodes=100):
         self.sumo_config = sumo_config
         self.num_episodes = num_episodes
+        self.results = {}  # Scénario -> épisodes (attributs episode, reward, steps)
+        self.failed = {}  # Scénario -> code de sortie du processus
+        self.baselines = []  # Résultats des contrôleurs de référence (baselines.run_baselines)
+        self.sumo_reports = {}  # Scénario -> indicateurs des sorties SUMO de son dernier épisode
         
-    def run_comparison(self):
-        """Exécute les simulations avec et sans contrôleur"""
-        # Avec contrôleur
-        print("Exécution de la simulation avec contrôleur...")
-        agent_with = TrafficLightRL()
-        agent_with.train(self.sumo_config, control_traffic_lights=True, 
-                        model_name="with_controller")
-        
-        # Sans contrôleur
-        print("Exécution de la simulation sans contrôleur...")
-        agent_without = TrafficLightRL()
-        agent_without.train(self.sumo_config, control_traffic_lights=False, 
-                          model_name="without_controller")
-        
-        return agent_with.rewards_history, agent_without.rewards_history
+    def run_comparison(self, scenarios=DEFAULT_SCENARIOS, output_dir="comparison_runs", max_workers=None,
+                       poll_interval=1.0):
+        """Exécute les scénarios (avec et sans contrôleur par défaut) en parallèle, un processus par
+        scénario (max_workers à la fois), chacun dans output_dir/<nom>. Les épisodes sont suivis au
+        fil de l'eau dans le journal de chaque processus ; l'échec d'un scénario n'arrête pas les autres."""
+        context = multiprocessing.get_context("spawn")  # Pas de fork d'un processus ayant chargé TensorFlow
+        sumo_config = os.path.abspath(self.sumo_config)
+        pending = list(scenarios)
+        max_workers = max_workers or len(pending)
+        running = {}  # Scénario -> [processus, journal, position de lecture]
+        self.results = {scenario["name"]: [] for scenario in scenarios}
+        self.failed = {}
+        start = time.perf_counter()
+
+        while pending or running:
+            while pending and len(running) < max_workers:
+                scenario = pending.pop(0)
+                run_dir = os.path.join(output_dir, scenario["name"])
+                log_path = os.path.join(run_dir, episode_log_path(scenario["name"]))
+                if os.path.exists(log_path):  # Journal d'un ancien run (le nouveau run le recommence)
+                    os.remove(log_path)
+                process = context.Process(target=train_scenario, name=scenario["name"],
+                                          args=(scenario, sumo_config, self.num_episodes, run_dir))
+                process.start()
+                running[scenario["name"]] = [process, log_path, 0]
+                print(f"Scénario {scenario['name']} lancé (pid {process.pid}, sortie dans {run_dir})")
+
+            time.sleep(poll_interval)
+            updated = False
+            for name, entry in list(running.items()):
+                process, log_path, offset = entry
+                alive = process.is_alive()  # Avant la lecture : aucun épisode écrit ensuite n'est perdu
+                episodes, entry[2] = follow_episodes(log_path, offset)
+                self.results[name].extend(episodes)
+                updated |= bool(episodes)
+                if not alive:
+                    process.join()
+                    del running[name]
+                    updated = True
+                    if process.exitcode != 0:
+                        self.failed[name] = process.exitcode
+                        print(f"Échec du scénario {name} (code {process.exitcode}), "
+                              f"voir {os.path.join(output_dir, name, 'train.log')}")
+            if updated:
+                self.print_progress(time.perf_counter() - start)
+
+        self.sumo_reports = self.read_sumo_reports(scenarios, output_dir)
+        return self.results.get("with_controller", []), self.results.get("without_controller", [])
+
+    def print_progress(self, elapsed):
+        """Une ligne d'avancement : épisodes terminés et dernière récompense de chaque scénario"""
+        parts = []
+        for name, episodes in self.results.items():
+            status = " ÉCHEC" if name in self.failed else ""
+            last = f" ({episodes[-1].reward:.1f})" if episodes else ""
+            parts.append(f"{name} {len(episodes)}/{self.num_episodes}{last}{status}")
+        print(f"[{elapsed / 60:6.1f} min] " + " | ".join(parts))
+
+    def read_sumo_reports(self, scenarios, output_dir="comparison_runs"):
+        """Résumés des sorties SUMO écrits par les scénarios lancés avec sumo_outputs"""
+        reports = {}
+        for scenario in scenarios:
+            path = os.path.join(output_dir, scenario["name"], SUMO_OUTPUT_DIR, "report.json")
+            if "sumo_outputs" in scenario and scenario["name"] not in self.failed and os.path.exists(path):
+                with open(path) as f:
+                    reports[scenario["name"]] = json.load(f)
+        return reports
+
+    def print_sumo_reports(self):
+        """Temps de parcours, retard et attente moyens par véhicule (sorties tripinfo de SUMO)"""
+        if not self.sumo_reports:
+            return
+        print("\nSorties SUMO (dernier épisode) :")
+        for name, report in self.sumo_reports.items():
+            print(f"{name:<20} véhicules arrivés {report['arrived']:5d}/{report['vehicles']:<5d} "
+                  f"parcours {report['mean_travel_time_s']:7.1f} s  retard {report['mean_delay_s']:7.1f} s  "
+                  f"attente {report['mean_waiting_time_s']:7.1f} s")
+
+    def run_baselines(self, seeds=(0,), backend="traci", cache_dir=baselines.DEFAULT_CACHE_DIR):
+        """Contrôleurs de référence (fixe, programme du réseau, ALINEA), relus du cache s'ils ont déjà été simulés"""
+        self.baselines = baselines.run_baselines(self.sumo_config, seeds=seeds, backend=backend, cache_dir=cache_dir)
+        return self.baselines
+
+    def baseline_rewards(self):
+        """Récompenses des contrôleurs de référence, par contrôleur (une par graine)"""
+        rewards = {}
+        for result in self.baselines:
+            rewards.setdefault(result["controller"], []).append(result["reward"])
+        return rewards
+
+    def load_results(self, with_file="rewards_history_with_control.json", without_file="rewards_history.json"):
+        """Relire des résultats déjà enregistrés (journal .jsonl ou ancien fichier JSON) sans réentraîner
+        Par défaut : les anciens fichiers JSON versionnés, que seul read_episodes lit encore"""
+        return read_episodes(with_file), read_episodes(without_file)
 
     def plot_comparison(self, with_controller, without_controller):
         """Visualise les comparaisons"""
@@ -34,9 +160,11 @@ class TrafficComparison:
         with_rewards = [ep.reward for ep in with_controller]
         without_rewards = [ep.reward for ep in without_controller]
         
-        episodes = range(1, len(with_rewards) + 1)
-        plt.plot(episodes, with_rewards, label='Avec contrôleur', color='blue')
-        plt.plot(episodes, without_rewards, label='Sans contrôleur', color='red')
+        plt.plot(range(1, len(with_rewards) + 1), with_rewards, label='Avec contrôleur', color='blue')
+        if without_rewards:
+            plt.plot(range(1, len(without_rewards) + 1), without_rewards, label='Sans contrôleur', color='red')
+        for (name, rewards), color in zip(self.baseline_rewards().items(), ('gray', 'green', 'orange', 'purple')):
+            plt.axhline(np.mean(rewards), linestyle='--', color=color, label=f'Référence {name}')
         
         plt.title('Comparaison des performances')
         plt.xlabel('Épisode')
@@ -50,18 +178,19 @@ class TrafficComparison:
         with_avg = np.convolve(with_rewards, 
                               np.ones(window)/window, 
                               mode='valid')
-        without_avg = np.convolve(without_rewards, 
-                                 np.ones(window)/window, 
-                                 mode='valid')
-        
+
         plt.plot(range(window, len(with_rewards) + 1), 
                 with_avg, 
                 label=f'Avec contrôleur (moyenne mobile {window})', 
                 color='blue')
-        plt.plot(range(window, len(without_rewards) + 1), 
-                without_avg, 
-                label=f'Sans contrôleur (moyenne mobile {window})', 
-                color='red')
+        if without_rewards:
+            without_avg = np.convolve(without_rewards, 
+                                     np.ones(window)/window, 
+                                     mode='valid')
+            plt.plot(range(window, len(without_rewards) + 1), 
+                    without_avg, 
+                    label=f'Sans contrôleur (moyenne mobile {window})', 
+                    color='red')
         
         plt.xlabel('Épisode')
         plt.ylabel('Récompense moyenne mobile')
@@ -77,21 +206,20 @@ class TrafficComparison:
         
     def print_statistics(self, with_rewards, without_rewards):
         """Affiche les statistiques comparatives"""
+        series = {'Avec contrôleur': with_rewards}
+        if without_rewards:
+            series['Sans contrôleur'] = without_rewards
+        for name, rewards in self.baseline_rewards().items():
+            series[f'Référence {name}'] = rewards  # Une valeur par graine
         stats = {
-            'Avec contrôleur': {
-                'Moyenne': np.mean(with_rewards),
-                'Écart-type': np.std(with_rewards),
-                'Maximum': np.max(with_rewards),
-                'Minimum': np.min(with_rewards),
-                'Médiane': np.median(with_rewards)
-            },
-            'Sans contrôleur': {
-                'Moyenne': np.mean(without_rewards),
-                'Écart-type': np.std(without_rewards),
-                'Maximum': np.max(without_rewards),
-                'Minimum': np.min(without_rewards),
-                'Médiane': np.median(without_rewards)
+            scenario: {
+                'Moyenne': np.mean(rewards),
+                'Écart-type': np.std(rewards),
+                'Maximum': np.max(rewards),
+                'Minimum': np.min(rewards),
+                'Médiane': np.median(rewards)
             }
+            for scenario, rewards in series.items()
         }
         
         # Sauvegarder les statistiques
@@ -107,9 +235,44 @@ class TrafficComparison:
                 print(f"{metric}: {value:.2f}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Comparaison avec et sans contrôleur")
+    parser.add_argument("--from-files", nargs=2, metavar=("AVEC", "SANS"),
+                        help="Tracer des résultats enregistrés (.json ou .jsonl) au lieu de réentraîner")
+    parser.add_argument("--episodes", type=int, default=100, help="Épisodes d'entraînement par scénario")
+    parser.add_argument("--scenarios", default=None,
+                        help="Fichier JSON : liste de scénarios supplémentaires ({\"name\": ..., options de train})")
+    parser.add_argument("--output-dir", default="comparison_runs", help="Répertoire des sorties de chaque scénario")
+    parser.add_argument("--workers", type=int, default=None, help="Processus simultanés (défaut : un par scénario)")
+    parser.add_argument("--backend", default="traci", help="Backend de simulation des scénarios (traci, libsumo...)")
+    parser.add_argument("--baselines", action="store_true",
+                        help="Comparer aussi aux contrôleurs de référence (en cache, sans entraînement) ; "
+                             "le scénario sans contrôleur, déterministe, n'est alors plus entraîné")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="Graines des contrôleurs de référence")
+    parser.add_argument("--sumo-outputs", action="store_true",
+                        help="Écrire les sorties tripinfo, summary et edgedata de SUMO de chaque scénario")
+    parser.add_argument("--period", type=float, default=None, help="Intervalle d'agrégation des edgedata (s)")
+    args = parser.parse_args()
     config_file = "../../projectnet.sumocfg" 
-    comparison = TrafficComparison(config_file)
-    with_results, without_results = comparison.run_comparison()
+    comparison = TrafficComparison(config_file, num_episodes=args.episodes)
+    if args.baselines:
+        comparison.run_baselines(args.seeds, args.backend)
+    if args.from_files:
+        with_results, without_results = comparison.load_results(*args.from_files)
+    else:
+        scenarios = list(DEFAULT_SCENARIOS)
+        if args.baselines:  # Remplacé par la référence fixed_phase (même simulation, sans entraînement)
+            scenarios = [scenario for scenario in scenarios if scenario["name"] != "without_controller"]
+        if args.scenarios:
+            with open(args.scenarios) as f:
+                scenarios += json.load(f)
+        scenarios = [{"backend": args.backend, **scenario} for scenario in scenarios]
+        if args.sumo_outputs:
+            scenarios = [{"sumo_outputs": {"period": args.period}, **scenario} for scenario in scenarios]
+        with_results, without_results = comparison.run_comparison(scenarios, args.output_dir, args.workers)
+        comparison.print_sumo_reports()
+    if not with_results or not (without_results or args.baselines):
+        print("Comparaison impossible : un des deux scénarios n'a produit aucun épisode")
+        sys.exit(1)
     comparison.plot_comparison(with_results, without_results)
 
 if __name__ == "__main__":
@@ -1,71 +1,163 @@
-import traci
+import argparse
 import numpy as np
+import sim_backend
+from state_subscription import StateSubscription
+from sumo_outputs import SumoOutputs
 
-def evaluate_traffic():
+tc = sim_backend.load_constants()
+
+VEHICLE_VARIABLES = (tc.VAR_SPEED, tc.VAR_WAITING_TIME, tc.VAR_TIMELOSS)
+CONTEXT_RANGE = 1e5  # Rayon (m) de l'abonnement de contexte : tout le réseau
+
+
+class TrafficKPIs:
     """
-    Évalue les performances du réseau en analysant les statistiques du trafic :
-    - Nombre de véhicules bloqués
-    - Longueur moyenne des files d'attente
-    - Vitesse moyenne des véhicules
+    Indicateurs de trafic cumulés à chaque pas, sans aucun appel TraCI par véhicule :
+    - vitesse, temps d'attente et temps perdu de tous les véhicules arrivent en un seul
+      message par un abonnement de contexte autour du carrefour center ;
+    - les véhicules arrêtés de chaque edge par abonnement ;
+    - le débit de sortie par simulation.getArrivedNumber (un appel par pas).
+    Retard : somme des timeLoss de SUMO (véhicules sortis + véhicules en circulation).
+    Arrêts : passages d'un temps d'attente nul à un temps d'attente positif.
+    Files : avg_queue_length garde la définition d'origine (véhicules arrêtés sur tous les edges,
+    internes ":..." compris, divisés par le nombre de tous les edges) ; avg_edge_queue_length,
+    mean_queue et max_queue ne comptent que les edges hors carrefours.
+    subscribe() après chaque start/load, update() après chaque simulationStep, report() à la demande.
     """
-    try:
-        # Obtenir la liste des véhicules actifs
-        vehicle_ids = traci.vehicle.getIDList()
-        total_vehicles = len(vehicle_ids)
-        
-        if total_vehicles == 0:
-            print("Aucun véhicule actif dans la simulation.")
-            return
 
-        # Initialisation des métriques
-        total_queue_length = 0
-        total_speed = 0
-        blocked_vehicles = 0
+    def __init__(self, sim, center="n6", edges=None, step_length=1.0):
+        self.sim = sim
+        self.center = center
+        self.edges = list(sim.edge.getIDList()) if edges is None else list(edges)
+        self.road_edges = np.array([not e.startswith(":") for e in self.edges])  # Hors edges internes
+        self.step_length = step_length
+        self.queues = StateSubscription([("edge", edge_id, tc.LAST_STEP_VEHICLE_HALTING_NUMBER)
+                                         for edge_id in self.edges])
+        self.halting = np.zeros(len(self.edges), dtype=np.float32)
+        self.speeds = np.zeros(0)
+        self.reset()
 
-        for veh_id in vehicle_ids:
-            # Longueur des files d'attente (véhicules arrêtés ou très lents)
-            speed = traci.vehicle.getSpeed(veh_id)
-            if speed < 0.1:  # Seuil pour considérer un véhicule comme bloqué
-                blocked_vehicles += 1
+    def reset(self):
+        """Remettre les cumuls à zéro (nouvel épisode)"""
+        self.steps = 0
+        self.vehicle_seconds = 0.0
+        self.distance = 0.0  # Somme des vitesses × durée (m), pour la vitesse moyenne
+        self.completed_delay = 0.0  # timeLoss des véhicules sortis
+        self.queue_sum = 0.0
+        self.max_queue = 0.0
+        self.stops = 0
+        self.arrived = 0
+        self._time_loss = {}  # Véhicule -> timeLoss au dernier pas
+        self._waiting = {}  # Véhicule -> temps d'attente au dernier pas
 
-            # Cumul des vitesses pour calculer la moyenne
-            total_speed += speed
+    def subscribe(self):
+        """S'abonner (les résultats sont disponibles immédiatement, puis à chaque pas)"""
+        self.queues.subscribe(self.sim)
+        self.sim.junction.subscribeContext(self.center, tc.CMD_GET_VEHICLE_VARIABLE, CONTEXT_RANGE,
+                                           list(VEHICLE_VARIABLES))
 
-        # Longueur moyenne des files d'attente
-        for edge_id in traci.edge.getIDList():
-            total_queue_length += traci.edge.getLastStepHaltingNumber(edge_id)
+    def update(self):
+        """Ajouter le dernier pas de simulation aux cumuls"""
+        self.queues.read(self.sim, out=self.halting)
+        vehicles = self.sim.junction.getContextSubscriptionResults(self.center) or {}
+        speed_id, waiting_id, loss_id = VEHICLE_VARIABLES
+        dt = self.step_length
 
-        avg_queue_length = total_queue_length / len(traci.edge.getIDList())
-        avg_speed = total_speed / total_vehicles
+        self.speeds = np.fromiter((values[speed_id] for values in vehicles.values()), float, len(vehicles))
+        waiting = {veh_id: values[waiting_id] for veh_id, values in vehicles.items()}
+        time_loss = {veh_id: values[loss_id] for veh_id, values in vehicles.items()}
+        self.stops += sum(1 for veh_id, w in waiting.items() if w > 0 and not self._waiting.get(veh_id))
+        self.completed_delay += sum(self._time_loss[veh_id] for veh_id in self._time_loss.keys() - time_loss.keys())
+        self._waiting, self._time_loss = waiting, time_loss
 
-        print(f"Total véhicules : {total_vehicles}")
-        print(f"Véhicules bloqués : {blocked_vehicles}")
-        print(f"Longueur moyenne des files d'attente : {avg_queue_length:.2f}")
-        print(f"Vitesse moyenne : {avg_speed:.2f} m/s")
+        self.steps += 1
+        self.vehicle_seconds += len(vehicles) * dt
+        self.distance += float(self.speeds.sum()) * dt
+        queue = float(self.halting[self.road_edges].sum())
+        self.queue_sum += queue
+        self.max_queue = max(self.max_queue, queue)
+        self.arrived += self.sim.simulation.getArrivedNumber()
 
+    def report(self):
+        """Indicateurs instantanés (dernier pas) et cumulés depuis reset()"""
+        total_vehicles = len(self.speeds)
+        duration = self.steps * self.step_length
+        delay = self.completed_delay + sum(self._time_loss.values())
         return {
             "total_vehicles": total_vehicles,
-            "blocked_vehicles": blocked_vehicles,
-            "avg_queue_length": avg_queue_length,
-            "avg_speed": avg_speed
+            "blocked_vehicles": int(np.count_nonzero(self.speeds < 0.1)),  # Seuil d'un véhicule bloqué
+            "avg_queue_length": float(self.halting.mean(dtype=np.float64)) if len(self.edges) else 0.0,
+            "avg_edge_queue_length": (float(self.halting[self.road_edges].mean(dtype=np.float64))
+                                      if self.road_edges.any() else 0.0),
+            "avg_speed": float(self.speeds.mean()) if total_vehicles else 0.0,
+            "duration_s": duration,
+            "throughput": self.arrived,
+            "throughput_per_hour": self.arrived * 3600.0 / duration if duration else 0.0,
+            "total_delay_s": delay,
+            "completed_delay_s": self.completed_delay,
+            "stops": self.stops,
+            "mean_queue": self.queue_sum / self.steps if self.steps else 0.0,
+            "max_queue": int(self.max_queue),
+            "mean_speed": self.distance / self.vehicle_seconds if self.vehicle_seconds else 0.0,
         }
 
-    except traci.TraCIException as e:
+
+def evaluate_traffic(sim=None, kpis=None):
+    """
+    Évalue les performances du réseau en analysant les statistiques du trafic :
+    - Nombre de véhicules bloqués
+    - Longueur moyenne des files d'attente
+    - Vitesse moyenne des véhicules
+    sim : backend de simulation (traci par défaut, libsumo, fake...)
+    kpis : TrafficKPIs mis à jour à chaque pas (cumuls de retard, débit, arrêts et files) ;
+    sans lui, un relevé ponctuel est fait par abonnement (sans appel par véhicule)
+    """
+    sim = sim_backend.load_backend() if sim is None else sim
+    try:
+        if kpis is None:
+            kpis = TrafficKPIs(sim)
+            kpis.subscribe()  # Résultats renvoyés dès l'abonnement
+            kpis.update()
+        metrics = kpis.report()
+
+        if metrics["total_vehicles"] == 0:
+            print("Aucun véhicule actif dans la simulation.")
+            return
+
+        print(f"Total véhicules : {metrics['total_vehicles']}")
+        print(f"Véhicules bloqués : {metrics['blocked_vehicles']}")
+        print(f"Longueur moyenne des files d'attente : {metrics['avg_queue_length']:.2f}")
+        print(f"Vitesse moyenne : {metrics['avg_speed']:.2f} m/s")
+
+        return metrics
+
+    except sim.TraCIException as e:
         print(f"Erreur lors de l'évaluation du trafic : {e}")
 
 
 if __name__ == "__main__":
+    parser = sim_backend.add_backend_argument(argparse.ArgumentParser(description="Évaluation du trafic"))
+    parser.add_argument("--outputs", default=None,
+                        help="Répertoire des sorties SUMO (tripinfo, summary, edgedata), lues en fin de simulation")
+    parser.add_argument("--period", type=float, default=None, help="Intervalle d'agrégation des edgedata (s)")
+    parser.add_argument("--lanes", action="store_true", help="Écrire aussi les agrégats par voie (lanedata)")
+    args = parser.parse_args()
     sumo_config = "../../projectnet.sumocfg"
-    
+    traci = sim_backend.load_backend(args.backend, args.trace)
+    outputs = SumoOutputs(args.outputs, args.period, args.lanes) if args.outputs else None
+
     try:
-        traci.start(["sumo", "-c", sumo_config])
+        traci.start(["sumo", "-c", sumo_config] + (outputs.args(sumo_config) if outputs else []))
+        kpis = TrafficKPIs(traci)
+        kpis.subscribe()
         step = 0
 
         while step < 1000:  # Simulation limitée à 1000 étapes
             traci.simulationStep()
+            kpis.update()  # Cumuls à chaque pas, sans appel par véhicule
 
             if step % 100 == 0:  # Évaluation toutes les 100 étapes
-                metrics = evaluate_traffic()
+                metrics = evaluate_traffic(traci, kpis)
                 print(metrics)
 
             step += 1
@@ -73,4 +165,7 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Erreur dans la simulation : {e}")
     finally:
-        traci.close()
\ No newline at end of file
+        traci.close()  # Les fichiers de sortie sont complets après la fermeture
+
+    if outputs:
+        print(outputs.save_report())
@@ -0,0 +1,133 @@
+'''Entraînement asynchrone acteur / apprenant :
+- l'acteur (un thread) avance la simulation, choisit les actions avec sa propre
+  copie NumPy du réseau et ajoute les transitions dans la mémoire partagée ;
+- l'apprenant (un autre thread) enchaîne les mises à jour du réseau et publie
+  les nouveaux poids à l'acteur toutes les publish_interval mises à jour.
+Les deux threads travaillent en même temps : SUMO calcule dans son propre processus
+(l'attente sur la socket TraCI libère le GIL) et TensorFlow libère le GIL pendant
+l'entraînement. updates_per_step borne le nombre de mises à jour par pas de
+simulation (l'apprenant attend l'acteur s'il est en avance).
+'''
+import threading
+import time
+import numpy as np
+from numpy_policy import NumpyPolicy
+
+
+class ThroughputCounters:
+    """Compteurs partagés entre l'acteur et l'apprenant"""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.env_steps = 0
+        self.updates = 0
+        self.publishes = 0
+        self.actor_busy = 0.0  # Secondes passées à simuler / choisir / stocker
+        self.learner_busy = 0.0  # Secondes passées dans update_network
+
+    def summary(self):
+        """Débits et taux d'occupation depuis le début"""
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "elapsed": elapsed,
+            "env_steps": self.env_steps,
+            "updates": self.updates,
+            "publishes": self.publishes,
+            "env_steps_per_s": self.env_steps / elapsed,
+            "updates_per_s": self.updates / elapsed,
+            "actor_utilization": self.actor_busy / elapsed,
+            "learner_utilization": self.learner_busy / elapsed,
+        }
+
+    def __str__(self):
+        s = self.summary()
+        return (f"Pas/s: {s['env_steps_per_s']:.1f}, Mises à jour/s: {s['updates_per_s']:.1f}, "
+                f"Acteur occupé: {s['actor_utilization']:.0%}, Apprenant occupé: {s['learner_utilization']:.0%}")
+
+
+class ActorLearner:
+    def __init__(self, agent, env, updates_per_step=1.0, publish_interval=100):
+        self.agent = agent  # Fournit le réseau, la mémoire et update_network
+        self.env = env  # RampMeteringEnv
+        self.updates_per_step = updates_per_step
+        self.publish_interval = publish_interval
+        self.actor_policy = NumpyPolicy(agent.model)  # Copie des poids utilisée par l'acteur
+        self.actor_policy.sync()
+        self.model_lock = threading.Lock()  # Réseau modifié par l'apprenant, sauvegardé par l'acteur
+        self.progress = threading.Condition()  # L'acteur réveille l'apprenant à chaque pas
+        self.stop = threading.Event()
+        self.counters = ThroughputCounters()
+        self.learner_error = None
+
+    def _can_update(self):
+        return (len(self.agent.memory) >= self.agent.BATCH_SIZE
+                and self.counters.updates < self.updates_per_step * self.counters.env_steps)
+
+    def _learner(self):
+        """Boucle de l'apprenant : mises à jour tant que le ratio le permet"""
+        try:
+            while not self.stop.is_set():
+                with self.progress:
+                    while not self._can_update() and not self.stop.is_set():
+                        self.progress.wait(timeout=0.1)
+                if self.stop.is_set():
+                    break
+                start = time.perf_counter()
+                with self.model_lock:
+                    self.agent.update_network()
+                    self.counters.updates += 1
+                    if self.counters.updates % self.publish_interval == 0:  # Publier les poids à l'acteur
+                        self.actor_policy.sync()
+                        self.counters.publishes += 1
+                self.counters.learner_busy += time.perf_counter() - start
+        except Exception as e:
+            self.learner_error = e
+            self.stop.set()
+
+    def _choose_action(self, state):
+        """Epsilon-greedy avec la copie des poids de l'acteur"""
+        if np.random.rand() < self.agent.EPSILON:
+            return np.random.randint(self.agent.ACTION_DIM)
+        return self.actor_policy.greedy_action(state)
+
+    def run(self, num_episodes, model_name="traffic_light_model"):
+        """Lancer l'apprenant puis jouer num_episodes épisodes dans le thread courant"""
+        agent = self.agent
+        learner = threading.Thread(target=self._learner, name="learner", daemon=True)
+        learner.start()
+        try:
+            for episode in range(num_episodes):
+                state, _ = self.env.reset()
+                total_reward = 0
+                step = 0
+                done = False
+                while not done and not self.stop.is_set():
+                    start = time.perf_counter()
+                    action = self._choose_action(state)
+                    next_state, reward, terminated, truncated, _ = self.env.step(action)
+                    done = terminated or truncated
+                    agent._store_experience(state, action, reward, next_state, terminated)  # Tronqué : valeur gardée
+                    self.counters.actor_busy += time.perf_counter() - start
+                    with self.progress:
+                        self.counters.env_steps += 1
+                        self.progress.notify()
+
+                    state = next_state
+                    total_reward += reward
+                    step += 1
+                if self.learner_error is not None:
+                    raise RuntimeError(f"Erreur de l'apprenant: {self.learner_error}") from self.learner_error
+
+                print(f"Épisode {episode + 1} terminé, Récompense: {total_reward:.2f}, Étapes: {step}, {self.counters}")
+                agent.rewards_history.append(agent.EpisodeInfo(episode + 1, total_reward, step))
+                agent.save_rewards()
+                with self.model_lock:
+                    if episode % agent.TARGET_UPDATE_FREQ == 0:  # Mise à jour du modèle cible
+                        agent.update_target_model()
+                    if (episode + 1) % 10 == 0:  # Sauvegarder le modèle tous les 10 épisodes
+                        agent._save_model(model_name, episode)
+        finally:
+            self.stop.set()
+            with self.progress:
+                self.progress.notify()
+            learner.join()
+        return self.counters.summary()
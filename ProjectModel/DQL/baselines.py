@@ -0,0 +1,197 @@
+'''Contrôleurs de référence du feu "n6", sans TensorFlow ni entraînement :
+- fixed_phase : une seule phase maintenue (phase 0 = vert, comme "Sans contrôleur")
+- fixed_time  : le programme du tlLogic de "n6" lu dans le fichier .net.xml
+- alinea      : régulation d'accès ALINEA (Papageorgiou et al., 1991) : à chaque
+  cycle, débit d'accès r += K_R * (occupation cible - occupation mesurée sur "2to3"),
+  converti en durée de vert du cycle suivant
+Chaque contrôleur choisit la phase à chaque seconde dans un RampMeteringEnv ; la
+récompense est celle de l'agent (traffic_reward), comparable à un épisode sans contrôleur.
+Les résultats sont mis en cache sur disque (un fichier JSON par clé) ; la clé est un
+hash du sumocfg, du réseau, des routes, du contrôleur, de ses paramètres et de la
+graine : une comparaison relancée sur les mêmes fichiers les relit sans simuler.
+'''
+import argparse
+import hashlib
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+import numpy as np
+import sim_backend
+from ramp_env import RampMeteringEnv, TL_ID
+from surrogate import parse_network, read_sumocfg
+
+DEFAULT_CACHE_DIR = "baseline_cache"
+
+
+class FixedPhase:
+    name = "fixed_phase"
+
+    def __init__(self, phase=0):
+        self.params = {"phase": phase}
+
+    def reset(self):
+        pass
+
+    def action(self, state):
+        return self.params["phase"]
+
+
+class FixedTime:
+    name = "fixed_time"
+
+    def __init__(self, program):
+        self.params = {"program": [[int(duration), phase_state] for duration, phase_state in program]}
+        self.ends = np.cumsum([duration for duration, _ in program])  # Fin de chaque phase dans le cycle
+        self.elapsed = 0
+
+    @classmethod
+    def from_sumocfg(cls, sumo_config, tl_id=TL_ID):
+        """Programme du feu tl_id dans le réseau du sumocfg"""
+        net_file, _, _ = read_sumocfg(sumo_config)
+        _, traffic_lights = parse_network(net_file)
+        return cls(traffic_lights[tl_id])
+
+    def reset(self):
+        self.elapsed = 0
+
+    def action(self, state):
+        phase = int(np.searchsorted(self.ends, self.elapsed % self.ends[-1], side="right"))
+        self.elapsed += 1
+        return phase
+
+
+class Alinea:
+    name = "alinea"
+
+    def __init__(self, target_occupancy=20.0, gain=70.0, cycle=60, min_rate=200.0, max_rate=1800.0,
+                 min_green=5, yellow=3):
+        # Occupations en %, débits en véhicules/h (max_rate : débit de saturation d'une voie)
+        self.params = {"target_occupancy": target_occupancy, "gain": gain, "cycle": cycle, "min_rate": min_rate,
+                       "max_rate": max_rate, "min_green": min_green, "yellow": yellow}
+        self.reset()
+
+    def reset(self):
+        self.rate = self.params["max_rate"]
+        self.green = self._green_time()
+        self.second = 0
+        self.occupancies = []
+
+    def _green_time(self):
+        p = self.params
+        green = round(p["cycle"] * self.rate / p["max_rate"])
+        return int(np.clip(green, p["min_green"], p["cycle"] - p["yellow"]))
+
+    def action(self, state):
+        p = self.params
+        if self.second == 0 and self.occupancies:  # Début de cycle : loi ALINEA sur le cycle écoulé
+            occupancy = 100.0 * float(np.mean(self.occupancies))  # state[4] est une fraction
+            self.rate = float(np.clip(self.rate + p["gain"] * (p["target_occupancy"] - occupancy),
+                                      p["min_rate"], p["max_rate"]))
+            self.green = self._green_time()
+            self.occupancies = []
+        self.occupancies.append(state[4])
+        second, self.second = self.second, (self.second + 1) % p["cycle"]
+        if second < self.green:
+            return 0  # Vert
+        return 1 if second < self.green + p["yellow"] else 2  # Jaune puis rouge
+
+
+def default_controllers(sumo_config):
+    return [FixedPhase(0), FixedTime.from_sumocfg(sumo_config), Alinea()]
+
+
+def input_files(sumo_config):
+    """Fichiers dont dépend la simulation : le sumocfg, le réseau et toutes les routes"""
+    root = ET.parse(sumo_config).getroot()
+    base = os.path.dirname(os.path.abspath(sumo_config))
+    files = [sumo_config]
+    for option in ("input/net-file", "input/route-files", "input/additional-files"):
+        element = root.find(option)
+        if element is not None:
+            files += [os.path.join(base, name.strip()) for name in element.get("value").split(",")]
+    return files
+
+
+def cache_key(sumo_config, controller, seed, **settings):
+    """Hash des fichiers d'entrée et de la configuration du contrôleur"""
+    digest = hashlib.sha256()
+    for path in input_files(sumo_config):
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(json.dumps({"controller": controller.name, "params": controller.params, "seed": seed,
+                              **settings}, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+def run_baseline(sumo_config, controller, seed=0, backend="traci", episode_length=3600, drain=None):
+    """Simuler un épisode piloté par controller ; renvoie un résumé (récompense, files, vitesses)"""
+    env = RampMeteringEnv(sumo_config, backend=backend, control_interval=1, episode_length=episode_length,
+                          drain=drain)
+    controller.reset()
+    start = time.perf_counter()
+    try:
+        state, info = env.reset(seed=seed)
+        states, rewards = [state], []
+        while True:
+            state, reward, terminated, truncated, info = env.step(controller.action(state))
+            states.append(state)
+            rewards.append(reward)
+            if terminated or truncated:
+                break
+    finally:
+        env.close()
+    states = np.array(states)
+    return {
+        "controller": controller.name, "params": controller.params, "seed": seed,
+        "reward": float(np.sum(rewards)), "steps": len(rewards), "end_time": info["time"],
+        "mean_queue": float(np.mean(states[:, 0] + states[:, 1])),
+        "mean_speed": float(np.mean((states[:, 2] + states[:, 3]) * 0.5)),
+        "max_occupancy": float(states[:, 4].max()),
+        "phase_changes": int(np.count_nonzero(np.diff(states[:, 5]))),
+        "wall_s": time.perf_counter() - start,
+    }
+
+
+def cached_baseline(sumo_config, controller, seed=0, backend="traci", episode_length=3600, drain=None,
+                    cache_dir=DEFAULT_CACHE_DIR, refresh=False):
+    """run_baseline mémorisé sur disque ; refresh force une nouvelle simulation"""
+    settings = {"backend": backend, "episode_length": episode_length, "drain": drain}
+    path = os.path.join(cache_dir, f"{cache_key(sumo_config, controller, seed, **settings)}.json")
+    if not refresh and os.path.exists(path):
+        with open(path) as f:
+            return {**json.load(f), "cached": True}
+    result = run_baseline(sumo_config, controller, seed, **settings)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(result, f)
+    os.replace(path + ".tmp", path)  # Jamais de fichier de cache à moitié écrit
+    return {**result, "cached": False}
+
+
+def run_baselines(sumo_config, controllers=None, seeds=(0,), **kwargs):
+    """Résultats de chaque contrôleur (défaut : fixed_phase, fixed_time, alinea) pour chaque graine"""
+    controllers = default_controllers(sumo_config) if controllers is None else controllers
+    return [cached_baseline(sumo_config, controller, seed, **kwargs) for controller in controllers for seed in seeds]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contrôleurs de référence (sans TensorFlow), résultats en cache")
+    parser.add_argument("--config", default="../../projectnet.sumocfg", help="Fichier de configuration SUMO")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="Graines SUMO")
+    parser.add_argument("--backend", choices=sim_backend.BACKENDS, default="traci", help="Backend de simulation")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Répertoire du cache des résultats")
+    parser.add_argument("--refresh", action="store_true", help="Resimuler même si le résultat est en cache")
+    args = parser.parse_args()
+
+    results = run_baselines(args.config, seeds=args.seeds, backend=args.backend, cache_dir=args.cache_dir,
+                            refresh=args.refresh)
+    for result in results:
+        source = "cache" if result["cached"] else f"{result['wall_s']:.1f} s"
+        print(f"{result['controller']:<12} graine {result['seed']:<3} récompense {result['reward']:12.2f}  "
+              f"file moyenne {result['mean_queue']:7.2f}  vitesse moyenne {result['mean_speed']:6.2f}  "
+              f"fin {result['end_time']:6.0f} s  ({source})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+'''Benchmark avant/après du choix d'action glouton (EPSILON = 0) :
+- avant : model.predict sur un état (1, 6)
+- après : passe avant NumPy (NumpyPolicy) sur les poids copiés du modèle Keras
+On vérifie aussi que les deux donnent les mêmes Q-valeurs, pour un état et pour un lot.
+SUMO n'est pas nécessaire.
+'''
+import argparse
+import time
+import numpy as np
+from dql_model import TrafficLightRL
+
+
+def legacy_choose_action(agent, state):
+    """Ancienne version de la partie gloutonne de choose_action"""
+    q_values = agent.model.predict(np.expand_dims(state, 0), verbose=0)
+    return np.argmax(q_values[0])
+
+
+def measure(choose_fn, agent, states, warmup=10):
+    """Latence moyenne d'un choix d'action en microsecondes"""
+    for state in states[:warmup]:
+        choose_fn(agent, state)
+    start = time.perf_counter()
+    for state in states:
+        choose_fn(agent, state)
+    return (time.perf_counter() - start) / len(states) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du choix d'action (model.predict vs NumPy)")
+    parser.add_argument("--steps", type=int, default=200, help="Nombre de choix d'action mesurés avec predict")
+    parser.add_argument("--batch", type=int, default=4096, help="Taille du lot pour la vérification par lot")
+    args = parser.parse_args()
+
+    agent = TrafficLightRL(backend="fake")
+    agent.EPSILON = 0.0  # Mesurer uniquement la passe avant
+    rng = np.random.default_rng(0)
+    states = (rng.random((args.batch, agent.STATE_DIM)) * 10).astype(np.float32)
+
+    keras_q = agent.model(states, training=False).numpy()
+    numpy_q = agent.policy.q_values(states)
+    assert np.allclose(keras_q, numpy_q, atol=1e-4), "La passe avant NumPy doit donner les mêmes Q-valeurs"
+    assert np.allclose(agent.policy.q_values(states[0]), keras_q[0], atol=1e-4)
+
+    before = measure(legacy_choose_action, agent, states[:args.steps])
+    after = measure(TrafficLightRL.choose_action, agent, states)
+    start = time.perf_counter()
+    agent.policy.greedy_actions(states)
+    batch_us = (time.perf_counter() - start) * 1e6
+
+    print(f"Avant (model.predict) : {before:.0f} µs/action")
+    print(f"Après (NumPy)         : {after:.1f} µs/action ({before / after:.0f}x)")
+    print(f"Lot de {args.batch} états  : {batch_us:.0f} µs ({batch_us / args.batch:.2f} µs/état)")
+
+
+if __name__ == "__main__":
+    main()
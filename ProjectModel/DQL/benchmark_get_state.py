@@ -0,0 +1,78 @@
+'''Benchmark avant/après de l'acquisition de l'état :
+- avant : six appels TraCI (getters) par pas de simulation
+- après : abonnements TraCI décodés dans un tableau float32 préalloué
+On compte les allers-retours socket avec SUMO (commandes envoyées) et le temps
+réel par pas (simulationStep + lecture de l'état). Nécessite SUMO.
+'''
+import argparse
+import time
+import numpy as np
+import traci
+from state_subscription import StateSubscription, DQL_FEATURES
+
+
+def legacy_get_state():
+    """Ancienne version de get_state (un appel TraCI par variable)"""
+    state = [
+        traci.edge.getLastStepHaltingNumber("in"),
+        traci.edge.getLastStepHaltingNumber("E0"),
+        traci.edge.getLastStepMeanSpeed("in"),
+        traci.edge.getLastStepMeanSpeed("E0"),
+        traci.edge.getLastStepOccupancy("2to3"),
+        float(traci.trafficlight.getPhase("n6"))
+    ]
+    return np.array(state, dtype=np.float32)
+
+
+class RoundTripCounter:
+    """Compter les commandes envoyées à SUMO sur la connexion courante"""
+    def __init__(self, connection):
+        self.count = 0
+        self._send = connection._sendExact
+        connection._sendExact = self._counting_send
+
+    def _counting_send(self, *args, **kwargs):
+        self.count += 1
+        return self._send(*args, **kwargs)
+
+
+def run(sumo_config, num_steps, use_subscriptions):
+    """Simuler num_steps pas en lisant l'état à chaque pas"""
+    traci.start(["sumo", "-c", sumo_config, "--no-step-log", "true"])
+    try:
+        counter = RoundTripCounter(traci.getConnection())
+        subscription = StateSubscription(DQL_FEATURES)
+        state = np.empty(subscription.size, dtype=np.float32)
+        if use_subscriptions:
+            subscription.subscribe(traci)
+
+        counter.count = 0
+        start = time.perf_counter()
+        for _ in range(num_steps):
+            traci.simulationStep()
+            if use_subscriptions:
+                subscription.read(traci, out=state)
+            else:
+                state = legacy_get_state()
+        elapsed = time.perf_counter() - start
+        return counter.count / num_steps, elapsed / num_steps, state
+    finally:
+        traci.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de get_state (getters vs abonnements)")
+    parser.add_argument("--config", default="../../projectnet.sumocfg", help="Fichier de configuration SUMO")
+    parser.add_argument("--steps", type=int, default=1000, help="Nombre de pas de simulation")
+    args = parser.parse_args()
+
+    before = run(args.config, args.steps, use_subscriptions=False)
+    after = run(args.config, args.steps, use_subscriptions=True)
+    assert np.allclose(before[2], after[2]), "Les deux méthodes doivent donner le même état"
+
+    print(f"Avant (getters)      : {before[0]:.1f} allers-retours/pas, {before[1] * 1e6:.0f} µs/pas")
+    print(f"Après (abonnements)  : {after[0]:.1f} allers-retours/pas, {after[1] * 1e6:.0f} µs/pas")
+
+
+if __name__ == "__main__":
+    main()
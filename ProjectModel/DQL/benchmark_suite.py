@@ -0,0 +1,207 @@
+'''Suite de benchmarks des chemins critiques de l'agent, sans SUMO (backend "fake").
+Mesure get_state, choose_action, _store_experience, update_network,
+calculate_reward et un épisode complet de 3600 pas (une décision par seconde),
+puis écrit les résultats en JSON avec les informations sur la machine
+(processeur, nombre de threads, versions) pour comparer les hôtes entre eux.
+--baseline compare au fichier de référence et renvoie un code d'erreur si une
+mesure est plus lente que la référence au-delà de la tolérance ;
+--save-baseline remplace la référence par la mesure courante.
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import tensorflow as tf
+from dql_model import TrafficLightRL
+from ramp_env import RampMeteringEnv
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "projectnet.sumocfg")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+def cpu_model():
+    """Nom du processeur (platform.processor() est vide sous Linux)"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def machine_metadata():
+    """Informations sur la machine et les bibliothèques, enregistrées avec chaque mesure"""
+    try:
+        affinity = len(os.sched_getaffinity(0))
+    except AttributeError:
+        affinity = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": cpu_model(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "tensorflow": tf.__version__,
+        "cpu_count": os.cpu_count(),
+        "cpu_affinity": affinity,
+        "tf_intra_op_threads": tf.config.threading.get_intra_op_parallelism_threads(),
+        "tf_inter_op_threads": tf.config.threading.get_inter_op_parallelism_threads(),
+        "thread_env": {name: os.environ[name] for name in
+                       ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TF_NUM_INTRAOP_THREADS")
+                       if name in os.environ},
+        "git_commit": commit,
+    }
+
+
+def time_calls(fn, iterations, warmup=20):
+    """Statistiques (µs) de la durée de fn() sur iterations appels"""
+    for _ in range(warmup):
+        fn()
+    durations = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations[i] = time.perf_counter() - start
+    us = durations * 1e6
+    p50, p95, p99 = np.percentile(us, [50, 95, 99])
+    return {"iterations": iterations, "mean_us": float(us.mean()), "p50_us": float(p50),
+            "p95_us": float(p95), "p99_us": float(p99)}
+
+
+def fill_memory(agent, size, rng):
+    """Remplir la mémoire avec des transitions aléatoires plausibles"""
+    states = (rng.random((size, agent.STATE_DIM)) * 10).astype(np.float32)
+    next_states = (rng.random((size, agent.STATE_DIM)) * 10).astype(np.float32)
+    actions = rng.integers(agent.ACTION_DIM, size=size)
+    rewards = np.array([agent.calculate_reward(s, a, n) for s, a, n in zip(states, actions, next_states)])
+    agent.memory.add_batch(states, actions, rewards, next_states, rng.random(size) < 0.01)
+
+
+def run_episode(agent, sumo_config, steps):
+    """Boucle de train (choix, pas de simulation, stockage, mise à jour) sur steps décisions d'une seconde"""
+    env = RampMeteringEnv(sumo_config, backend=agent.sim, control_interval=1, episode_length=steps,
+                          drain=None)  # Toujours steps décisions, comparable à la référence
+    try:
+        state, _ = env.reset(seed=0)
+        start = time.perf_counter()
+        for _ in range(steps):
+            action = agent.choose_action(state)
+            next_state, reward, terminated, truncated, _ = env.step(action)
+            agent._store_experience(state, action, reward, next_state, terminated)
+            agent.update_network()
+            state = next_state
+        elapsed = time.perf_counter() - start
+    finally:
+        env.close()
+    return {"steps": steps, "wall_s": elapsed, "steps_per_s": steps / elapsed}
+
+
+def run_suite(sumo_config, iterations, episode_steps):
+    rng = np.random.default_rng(0)
+    np.random.seed(0)
+    tf.keras.utils.set_random_seed(0)
+    agent = TrafficLightRL(backend="fake")
+    results = {}
+
+    # get_state : lecture des abonnements après un pas de simulation
+    agent.sim.start(["sumo", "-c", sumo_config, "--seed", "0"])
+    agent.state_subscription.subscribe(agent.sim)
+    agent.sim.simulationStep()
+    results["get_state"] = time_calls(agent.get_state, iterations)
+    agent.sim.close()
+
+    states = (rng.random((iterations, agent.STATE_DIM)) * 10).astype(np.float32)
+    state, next_state = states[0], states[1]
+    agent.EPSILON = 0.0  # Passe avant à chaque appel
+    results["choose_action"] = time_calls(lambda: agent.choose_action(state), iterations)
+    agent.EPSILON = 1.0
+    results["calculate_reward"] = time_calls(lambda: agent.calculate_reward(state, 0, next_state), iterations)
+    results["_store_experience"] = time_calls(
+        lambda: agent._store_experience(state, 1, 0.5, next_state, False), iterations)
+
+    fill_memory(agent, agent.MEMORY_CAPACITY, rng)
+    results["update_network"] = time_calls(agent.update_network, max(1, iterations // 10), warmup=5)
+
+    agent.EPSILON = 0.1
+    results["episode"] = run_episode(agent, sumo_config, episode_steps)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Liste des mesures plus lentes que la référence de plus de tolerance (fraction) ;
+    x1.25 signifie 25 % plus lent (durée p50 plus longue ou débit d'épisode plus faible)"""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        if "p50_us" in stats:
+            key = "p50_us"
+            ratio = stats[key] / reference[key]
+        else:  # Épisode : débit en pas/s (plus grand = mieux), indépendant de --episode-steps
+            key = "steps_per_s"
+            ratio = reference[key] / stats[key]
+            if stats["steps"] != reference["steps"]:
+                print(f"  {name:<18} attention : {stats['steps']} pas mesurés, {reference['steps']} dans la référence")
+        status = "RÉGRESSION" if ratio > 1 + tolerance else "ok"
+        print(f"  {name:<18} {reference[key]:12.1f} -> {stats[key]:12.1f} {key:<11} x{ratio:5.2f}  {status}")
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins critiques (sans SUMO)")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="Fichier de configuration SUMO (lu par le fake)")
+    parser.add_argument("--iterations", type=int, default=2000, help="Appels mesurés par fonction")
+    parser.add_argument("--episode-steps", type=int, default=3600, help="Durée de l'épisode complet (s)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Fichier JSON des résultats")
+    parser.add_argument("--baseline", default=None, nargs="?", const=DEFAULT_BASELINE,
+                        help="Comparer à ce fichier de référence (par défaut benchmark_baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Ralentissement toléré (0.25 = +25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer la mesure comme référence")
+    args = parser.parse_args()
+
+    report = {"metadata": machine_metadata(), "results": run_suite(args.config, args.iterations, args.episode_steps)}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, stats in report["results"].items():
+        if "p50_us" in stats:
+            print(f"{name:<18} p50 {stats['p50_us']:10.1f} µs  p95 {stats['p95_us']:10.1f} µs  "
+                  f"p99 {stats['p99_us']:10.1f} µs")
+        else:
+            print(f"{name:<18} {stats['steps']} pas en {stats['wall_s']:.2f} s ({stats['steps_per_s']:.0f} pas/s)")
+    print(f"Résultats écrits dans {args.output}")
+
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Référence enregistrée dans {DEFAULT_BASELINE}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        reference_host = baseline.get("metadata", {})
+        if (reference_host.get("processor"), reference_host.get("cpu_count")) != \
+                (report["metadata"]["processor"], report["metadata"]["cpu_count"]):
+            print("Attention : la référence a été mesurée sur une autre machine")
+        print(f"Comparaison à {args.baseline} (tolérance +{args.tolerance:.0%}) :")
+        regressions = compare(report["results"], baseline, args.tolerance)
+        if regressions:
+            print(f"Régressions : {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+'''Points de reprise complets de l'entraînement de TrafficLightRL.
+Un point de reprise est un répertoire :
+- model.npz / target_model.npz : poids des réseaux principal et cible
+- optimizer.npz : variables de l'optimiseur (itération, moments d'Adam)
+- replay/ : mémoire de replay (un .npy par tableau)
+- state.json : épisode suivant, EPSILON, PER_BETA, historique des récompenses,
+  état du générateur aléatoire de NumPy
+Le répertoire est écrit à côté puis renommé : une interruption pendant la
+sauvegarde laisse le point de reprise précédent intact.
+'''
+import json
+import os
+import shutil
+import numpy as np
+
+
+def _save_arrays(path, arrays):
+    np.savez(path, **{f"arr_{i:03d}": array for i, array in enumerate(arrays)})
+
+
+def _load_arrays(path):
+    with np.load(path) as data:
+        return [data[name] for name in sorted(data.files)]
+
+
+def _optimizer_variables(model):
+    """Variables de l'optimiseur, créées si besoin (avant la première mise à jour)"""
+    optimizer = model.optimizer
+    if not getattr(optimizer, "built", True):
+        optimizer.build(model.trainable_variables)
+    variables = optimizer.variables
+    return variables() if callable(variables) else variables
+
+
+def save_checkpoint(agent, directory, next_episode):
+    """Sauvegarder tout l'état d'entraînement de l'agent (reprise à l'épisode next_episode)"""
+    directory = os.path.normpath(directory)
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    _save_arrays(os.path.join(tmp_dir, "model.npz"), agent.model.get_weights())
+    _save_arrays(os.path.join(tmp_dir, "target_model.npz"), agent.target_model.get_weights())
+    _save_arrays(os.path.join(tmp_dir, "optimizer.npz"), [v.numpy() for v in _optimizer_variables(agent.model)])
+    agent.memory.save(os.path.join(tmp_dir, "replay"))
+
+    rng_name, rng_keys, rng_pos, rng_has_gauss, rng_gauss = np.random.get_state()
+    state = {
+        "next_episode": next_episode,
+        "epsilon": agent.EPSILON,
+        "per_beta": agent.PER_BETA,
+        "prioritized_replay": agent.prioritized_replay,
+        "rewards_history": [{"episode": ep.episode, "reward": ep.reward, "steps": ep.steps}
+                            for ep in agent.rewards_history],
+        "numpy_random_state": [rng_name, rng_keys.tolist(), rng_pos, rng_has_gauss, rng_gauss],
+    }
+    with open(os.path.join(tmp_dir, "state.json"), "w") as f:
+        json.dump(state, f)
+
+    # Remplacer l'ancien point de reprise seulement une fois le nouveau complet. Une mémoire
+    # projetée depuis ce répertoire (load_checkpoint avec mmap_mode) est d'abord recopiée :
+    # sous Windows, un fichier projeté ne peut être ni renommé ni supprimé
+    agent.memory.detach()
+    old_dir = directory + ".old"
+    if os.path.exists(directory):
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def load_checkpoint(agent, directory, mmap_mode=None):
+    """Restaurer l'état d'entraînement sauvegardé par save_checkpoint ; renvoie l'épisode suivant.
+    mmap_mode : voir ReplayBuffer.load (mémoire de replay lue en mémoire par défaut)"""
+    with open(os.path.join(directory, "state.json")) as f:
+        state = json.load(f)
+    if state["prioritized_replay"] != agent.prioritized_replay:
+        raise ValueError("Le point de reprise et l'agent n'utilisent pas le même type de mémoire "
+                         f"(prioritized_replay={state['prioritized_replay']})")
+
+    agent.model.set_weights(_load_arrays(os.path.join(directory, "model.npz")))
+    agent.target_model.set_weights(_load_arrays(os.path.join(directory, "target_model.npz")))
+    variables = _optimizer_variables(agent.model)
+    values = _load_arrays(os.path.join(directory, "optimizer.npz"))
+    if [tuple(v.shape) for v in variables] != [value.shape for value in values]:
+        raise ValueError("Les variables de l'optimiseur sauvegardées ne correspondent pas au modèle")
+    for variable, value in zip(variables, values):
+        variable.assign(value)
+    agent.policy.invalidate()
+    agent.memory.load(os.path.join(directory, "replay"), mmap_mode=mmap_mode)
+
+    agent.EPSILON = state["epsilon"]
+    agent.PER_BETA = state["per_beta"]
+    agent.rewards_history = [agent.EpisodeInfo(ep["episode"], ep["reward"], ep["steps"])
+                             for ep in state["rewards_history"]]
+    agent._episodes_logged = len(agent.rewards_history)  # Déjà présents dans le journal de métriques
+    rng_name, rng_keys, rng_pos, rng_has_gauss, rng_gauss = state["numpy_random_state"]
+    np.random.set_state((rng_name, np.array(rng_keys, dtype=np.uint32), rng_pos, rng_has_gauss, rng_gauss))
+    return state["next_episode"]
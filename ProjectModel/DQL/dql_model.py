@@ -9,15 +9,26 @@ réelement besoin de changer
 -les valeurs de Q qui sont corrélées entre elles:il utilise un buffer de replay qui stocke les
 valeurs de Q
 '''
-import traci
+import argparse
 import numpy as np
 import tensorflow as tf
 import os
-from collections import deque
-import random
-import json
+import threading
+import time
+from actor_learner import ActorLearner
+import checkpoint
+from instrumentation import PhaseTimers, NULL_TIMERS
+from metrics_log import MetricsWriter, episode_log_path, step_log_path
+from numpy_policy import NumpyPolicy
+from replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from ramp_env import RampMeteringEnv
+from vec_env import SumoVecEnv
+from surrogate_env import SurrogateVecEnv
+from state_subscription import StateSubscription, SubscriptionError, DQL_FEATURES
+import sim_backend
+from reward import traffic_reward
 class TrafficLightRL:
-    def __init__(self):
+    def __init__(self, prioritized_replay=False, backend="traci"):
         # Paramètres constants
         self.NUM_PHASES = 3  # Nombre de phases possibles pour les feux de signalisation
         self.STATE_DIM = 6  # Dimension de l'état (nombre de variables utilisées)
@@ -27,20 +38,39 @@ class TrafficLightRL:
         self.EPSILON_DECAY = 0.995  # Facteur de décroissance de l'exploration
         self.MIN_EPSILON = 0.01  # Valeur minimale de EPSILON
         self.rewards_history = []
+        self.metrics = None  # Journal de métriques (ouvert au premier save_rewards)
+        self._episodes_logged = 0  # Épisodes de rewards_history déjà écrits dans le journal
         self.ALPHA = 0.001  # Taux d'apprentissage pour l'optimisation du modèle
         self.MEMORY_CAPACITY = 10000  # Taille maximale de la mémoire pour les expériences
         self.BATCH_SIZE = 32  # Taille des mini-lots pour l'entraînement
         self.NUM_EPISODES = 100  # Nombre d'épisodes pour l'entraînement
         self.TARGET_UPDATE_FREQ = 10  # Fréquence de mise à jour du modèle cible
         self.SIMULATION_TIME = 3600  # Durée de la simulation en secondes
+        self.PER_ALPHA = 0.6  # Degré de priorisation de la mémoire (0 = uniforme)
+        self.PER_BETA = 0.4  # Correction initiale du biais d'échantillonnage (poids d'importance)
+        self.PER_BETA_INCREMENT = 1e-5  # Augmentation de beta à chaque mise à jour (jusqu'à 1)
 
         # Initialisation des réseaux neuronaux
         self.model = self._build_model()  # Modèle principal
         self.target_model = self._build_model()  # Modèle cible
         self.target_model.set_weights(self.model.get_weights())  # Initialisation des poids du modèle cible
+        self._train_step = self._build_train_step()  # Étape d'entraînement compilée (graphe TensorFlow)
+        self.policy = NumpyPolicy(self.model)  # Copie NumPy du modèle principal pour choisir les actions
 
-        # Utilisation de deque pour la mémoire (circular buffer)
-        self.memory = deque(maxlen=self.MEMORY_CAPACITY)
+        # Mémoire circulaire basée sur des tableaux NumPy préalloués (uniforme par défaut)
+        self.prioritized_replay = prioritized_replay
+        if prioritized_replay:
+            self.memory = PrioritizedReplayBuffer(self.MEMORY_CAPACITY, self.STATE_DIM, alpha=self.PER_ALPHA)
+        else:
+            self.memory = ReplayBuffer(self.MEMORY_CAPACITY, self.STATE_DIM)
+        self._uniform_weights = np.ones(self.BATCH_SIZE, dtype=np.float32)  # Poids d'importance (replay uniforme)
+        self.memory_lock = threading.Lock()  # Mémoire partagée entre acteur et apprenant (train_async)
+
+        # Backend de simulation (traci, libsumo, fake...) : même API que le module traci
+        self.sim = sim_backend.load_backend(backend)
+
+        # Abonnements TraCI : l'état revient avec chaque simulationStep
+        self.state_subscription = StateSubscription(DQL_FEATURES)
     class EpisodeInfo:
         def __init__(self, episode, reward, steps):
             self.episode = episode
@@ -57,19 +87,49 @@ class TrafficLightRL:
         model.compile(optimizer=tf.optimizers.Adam(learning_rate=self.ALPHA), loss='mse')
         return model
 
-    def get_state(self):
-        """Obtenir l'état actuel du trafic depuis SUMO"""
+    def _build_train_step(self):
+        """Construire une étape d'entraînement compilée en un seul appel
+        (Q courantes, Q cibles, cibles de Bellman masquées et descente de gradient).
+        Renvoie la perte et les erreurs TD (utilisées par la mémoire priorisée)."""
+        model = self.model
+        target_model = self.target_model
+        optimizer = self.model.optimizer
+        gamma = tf.constant(self.GAMMA, dtype=tf.float32)
+        action_dim = self.ACTION_DIM
+
+        # Signature fixe : le graphe n'est tracé qu'une seule fois
+        @tf.function(input_signature=[
+            tf.TensorSpec(shape=(self.BATCH_SIZE, self.STATE_DIM), dtype=tf.float32),  # états
+            tf.TensorSpec(shape=(self.BATCH_SIZE,), dtype=tf.int32),  # actions
+            tf.TensorSpec(shape=(self.BATCH_SIZE,), dtype=tf.float32),  # récompenses
+            tf.TensorSpec(shape=(self.BATCH_SIZE, self.STATE_DIM), dtype=tf.float32),  # états suivants
+            tf.TensorSpec(shape=(self.BATCH_SIZE,), dtype=tf.float32),  # fins d'épisode
+            tf.TensorSpec(shape=(self.BATCH_SIZE,), dtype=tf.float32),  # poids d'importance
+        ])
+        def train_step(states, actions, rewards, next_states, dones, weights):
+            next_q_values = target_model(next_states, training=False)  # Q-valeurs futures (modèle cible)
+            bellman = rewards + gamma * (1.0 - dones) * tf.reduce_max(next_q_values, axis=1)
+            mask = tf.one_hot(actions, action_dim)  # Seule l'action jouée reçoit une nouvelle cible
+            with tf.GradientTape() as tape:
+                current_q_values = model(states, training=True)
+                targets = tf.stop_gradient(current_q_values * (1.0 - mask) + bellman[:, None] * mask)
+                # Même perte que 'mse', pondérée par les poids d'importance (tous à 1 en replay uniforme)
+                loss = tf.reduce_mean(weights[:, None] * tf.square(targets - current_q_values))
+            gradients = tape.gradient(loss, model.trainable_variables)
+            optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+            td_errors = bellman - tf.reduce_sum(current_q_values * mask, axis=1)
+            return loss, td_errors
+
+        return train_step
+
+    def get_state(self, sim=None):
+        """Obtenir l'état actuel du trafic depuis SUMO (sim : backend ou connexion étiquetée, self.sim par défaut).
+        Les valeurs viennent des abonnements, sans aller-retour avec SUMO :
+        [arrêtés "in", arrêtés "E0", vitesse "in", vitesse "E0", occupation "2to3", phase "n6"]"""
+        sim = self.sim if sim is None else sim
         try:
-            state = [
-                traci.edge.getLastStepHaltingNumber("in"),  # Nombre de véhicules arrêtés sur l'edge "in"
-                traci.edge.getLastStepHaltingNumber("E0"),  # Nombre de véhicules arrêtés sur l'edge "E0"
-                traci.edge.getLastStepMeanSpeed("in"),  # Vitesse moyenne sur l'edge "in"
-                traci.edge.getLastStepMeanSpeed("E0"),  # Vitesse moyenne sur l'edge "E0"
-                traci.edge.getLastStepOccupancy("2to3"),  # Occupation de l'edge "2to3"
-                float(traci.trafficlight.getPhase("n6"))  # Phase actuelle du feu de signalisation
-            ]
-            return np.array(state, dtype=np.float32)
-        except traci.TraCIException as e:
+            return self.state_subscription.read(sim)
+        except (self.sim.TraCIException, SubscriptionError) as e:
             print(f"Erreur lors de la récupération de l'état: {e}")
             return np.zeros(self.STATE_DIM, dtype=np.float32)  # Retourner un état vide en cas d'erreur
 
@@ -77,93 +137,140 @@ class TrafficLightRL:
         """Choisir une action selon la politique epsilon-greedy"""
         if np.random.rand() < self.EPSILON:
             return np.random.randint(self.ACTION_DIM)  # Exploration : choisir une action aléatoire
-        state_tensor = np.expand_dims(state, 0)  # Ajouter une dimension pour le batch
-        q_values = self.model.predict(state_tensor, verbose=0)  # Prédire les Q-valeurs pour l'état donné
-        return np.argmax(q_values[0])  # Choisir l'action avec la plus grande Q-valeur
-    def save_rewards(self, filename="rewards_history.json"):
-        """Sauvegarder les récompenses de tous les épisodes dans un fichier JSON."""
+        return self.policy.greedy_action(state)  # Choisir l'action avec la plus grande Q-valeur (passe avant NumPy)
+    def choose_actions(self, states):
+        """Choisir les actions de plusieurs environnements avec une seule passe avant du réseau"""
+        states = np.asarray(states, dtype=np.float32)
+        actions = self.policy.greedy_actions(states)  # Un seul appel pour tout le lot
+        explore = np.random.rand(len(states)) < self.EPSILON  # Exploration indépendante par environnement
+        actions[explore] = np.random.randint(self.ACTION_DIM, size=int(explore.sum()))
+        return actions
+
+    def open_metrics(self, path="rewards_history.jsonl", step_path=None, append=True):
+        """Ouvrir le journal de métriques (un épisode par ligne, et un pas par ligne si step_path est donné) ;
+        append=False vide les journaux existants"""
+        if self.metrics is not None:
+            self.metrics.close()
+        self.metrics = MetricsWriter(path, step_path=step_path, append=append)
+        return self.metrics
+
+    def _open_run_metrics(self, model_name, log_steps=False, resumed=False):
+        """Journal propre à l'entraînement de model_name, recommencé sauf en reprise"""
+        return self.open_metrics(episode_log_path(model_name), step_log_path(model_name) if log_steps else None,
+                                 append=resumed)
+
+    def save_rewards(self, filename=None):
+        """Ajouter au journal les épisodes terminés depuis le dernier appel (une ligne JSON par épisode).
+        filename : journal à utiliser (par défaut le journal ouvert, sinon rewards_history.jsonl)."""
         try:
-            # Convertir les objets EpisodeInfo en dictionnaire pour pouvoir les sérialiser en JSON
-            rewards_data = [
-                {"episode": ep.episode, "reward": ep.reward, "steps": ep.steps} 
-                for ep in self.rewards_history
-            ]
-            with open(filename, 'w') as f:
-                json.dump(rewards_data, f, indent=4)
-            print(f"Récompenses sauvegardées dans {filename}")
-        
+            if self.metrics is None or (filename is not None and self.metrics.path != filename):
+                self.open_metrics(filename or "rewards_history.jsonl")
+            for ep in self.rewards_history[self._episodes_logged:]:
+                self.metrics.log_episode(episode=ep.episode, reward=ep.reward, steps=ep.steps)
+            self._episodes_logged = len(self.rewards_history)
+            print(f"Récompenses sauvegardées dans {self.metrics.path}")
+
         except Exception as e:
             print(f"Erreur lors de la sauvegarde des récompenses : {e}")
+
     def calculate_reward(self, state, action, next_state):
         """Calculer la récompense associée à une transition d'état"""
-        queue_length = -(next_state[0] + next_state[1])  # Récompense basée sur la longueur des files d'attente
-        speed_factor = (next_state[2] + next_state[3]) * 0.5  # Facteur basé sur la vitesse moyenne
-        congestion_penalty = -next_state[4] * 3 if next_state[4] > 0.7 else 0  # Pénalité si l'occupation est trop élevée
-        phase_change = -5 if state[5] != next_state[5] else 0  # Pénalité si la phase du feu a changé
-        
-        return float(queue_length + speed_factor + congestion_penalty + phase_change)
+        return float(traffic_reward(np.asarray(state), np.asarray(next_state)))
 
     def _store_experience(self, state, action, reward, next_state, done):
         """Enregistrer l'expérience dans la mémoire"""
-        state = np.array(state, dtype=np.float32)
-        next_state = np.array(next_state, dtype=np.float32)
-        self.memory.append((state, action, reward, next_state, done))  # Ajouter l'expérience dans la mémoire
+        with self.memory_lock:
+            self.memory.add(state, action, reward, next_state, done)  # Ajouter l'expérience dans la mémoire
 
     def update_network(self):
         """Mettre à jour les poids du réseau de neurones"""
         if len(self.memory) < self.BATCH_SIZE:  # S'il n'y a pas assez d'expériences
             return
 
-        minibatch = random.sample(self.memory, self.BATCH_SIZE)  # Prendre un mini-lot d'expériences
-
-        # Extraire les composants du mini-lot
-        states = np.array([transition[0] for transition in minibatch])
-        actions = np.array([transition[1] for transition in minibatch])
-        rewards = np.array([transition[2] for transition in minibatch])
-        next_states = np.array([transition[3] for transition in minibatch])
-        dones = np.array([transition[4] for transition in minibatch])
+        # Prendre un mini-lot d'expériences (tableaux déjà prêts pour le réseau)
+        with self.memory_lock:
+            if self.prioritized_replay:
+                batch, indices, weights = self.memory.sample_with_weights(self.BATCH_SIZE, self.PER_BETA)
+                self.PER_BETA = min(1.0, self.PER_BETA + self.PER_BETA_INCREMENT)
+            else:
+                batch, weights = self.memory.sample(self.BATCH_SIZE), self._uniform_weights
+        states, actions, rewards, next_states, dones = batch  # Tableaux de sortie de sample, lus seulement ici
 
-        current_q_values = self.model.predict(states, verbose=0)  # Prédire les Q-valeurs actuelles
-        next_q_values = self.target_model.predict(next_states, verbose=0)  # Prédire les Q-valeurs futures
+        # Une seule étape compilée remplace predict/predict/fit
+        loss, td_errors = self._train_step(states, actions, rewards, next_states, dones, weights)
+        self.policy.invalidate()  # Les poids ont changé : la copie NumPy sera refaite au prochain choix
 
-        targets = current_q_values.copy()  # Copier les Q-valeurs actuelles
-        for i in range(self.BATCH_SIZE):
-            if dones[i]:  # Si l'épisode est terminé
-                targets[i][actions[i]] = rewards[i]
-            else:  # Sinon, mise à jour avec la récompense et les Q-valeurs futures
-                targets[i][actions[i]] = rewards[i] + self.GAMMA * np.max(next_q_values[i])
+        if self.prioritized_replay:  # Nouvelles priorités = erreurs TD de ce mini-lot
+            with self.memory_lock:
+                self.memory.update_priorities(indices, td_errors.numpy())
+        return loss
 
-        # Entraînement du modèle avec les cibles mises à jour
-        self.model.fit(states, targets, epochs=1, verbose=0, batch_size=self.BATCH_SIZE)
+    def update_target_model(self):
+        """Copier les poids du modèle principal dans le modèle cible"""
+        self.target_model.set_weights(self.model.get_weights())
+        self.policy.invalidate()
 
-    def train(self, sumo_config, control_traffic_lights=True, model_name="traffic_light_model"):
-        """Entraîner l'agent en simulant les épisodes dans SUMO"""
+    def train(self, sumo_config, control_traffic_lights=True, model_name="traffic_light_model",
+              resume_from=None, checkpoint_dir=None, log_steps=False, timing_file=None, profile_dir=None,
+              warmup=None, drain=None, sumo_args=(), mmap_mode=None, seed=None):
+        """Entraîner l'agent en simulant les épisodes dans SUMO.
+        Un point de reprise complet est écrit dans checkpoint_dir (par défaut checkpoints/<model_name>)
+        après chaque épisode et en cas d'erreur (une interruption, Ctrl-C, est ensuite propagée) ;
+        resume_from reprend depuis un tel répertoire ; mmap_mode="c" y projette la mémoire de replay
+        au lieu de la lire (voir ReplayBuffer.load).
+        Les épisodes sont journalisés dans rewards_history_<model_name>.jsonl, vidé au début d'un
+        entraînement qui ne reprend pas ; log_steps : aussi chaque pas dans rewards_history_<model_name>_steps.csv.
+        timing_file : temps par phase de chaque épisode (JSON par ligne) ; profile_dir : cProfile par épisode.
+        warmup : instant(s) de départ des épisodes (s) ; chaque épisode recharge l'état sauvegardé à l'un
+        d'eux (tiré au hasard) au lieu de resimuler le début (voir RampMeteringEnv).
+        drain : couper l'épisode quand le réseau s'est vidé ("terminate", "fast_forward" ; None par défaut,
+        récompenses comparables aux entraînements précédents). Cette coupure et la limite SIMULATION_TIME
+        tronquent l'épisode sans le marquer terminé dans la mémoire.
+        sumo_args : options SUMO supplémentaires (sumo_outputs.SumoOutputs.args : sorties du dernier épisode).
+        seed : graine de NumPy, TensorFlow et de la mémoire (avant une éventuelle reprise, qui restaure leurs
+        états) ; l'épisode n est simulé avec --seed seed + n, pour rejouer un entraînement enregistré
+        (--backend replay --trace). Les poids initiaux dépendent de la graine fixée avant la création de l'agent."""
+        checkpoint_dir = checkpoint_dir or os.path.join("checkpoints", model_name)
+        if seed is not None:
+            tf.keras.utils.set_random_seed(seed)  # Exploration epsilon-greedy (np.random) et TensorFlow
+            self.memory.rng = np.random.default_rng(seed)  # Tirage des mini-lots
+        episode = self.load_checkpoint(resume_from, mmap_mode) if resume_from else 0
+        self._open_run_metrics(model_name, log_steps, resumed=bool(resume_from))
+        env = RampMeteringEnv(sumo_config, backend=self.sim, control_traffic_lights=control_traffic_lights,
+                              episode_length=self.SIMULATION_TIME, warmup=warmup, drain=drain, sumo_args=sumo_args)
+        timers = PhaseTimers(timing_file or "timings.jsonl", profile_dir) if timing_file or profile_dir else NULL_TIMERS
+        env.timers = timers
         try:
-            traci.start(["sumo", "-c", sumo_config])  # Démarrer la simulation SUMO
-            
-            for episode in range(self.NUM_EPISODES):
+            for episode in range(episode, self.NUM_EPISODES):
                 print(f"Début de l'épisode {episode + 1}/{self.NUM_EPISODES}")
-                traci.load(["-c", sumo_config])  # Recharger la simulation pour chaque épisode
-                state = self.get_state()  # Obtenir l'état initial
+                timers.start_episode()
+                # Démarrer ou recharger la simulation pour chaque épisode
+                state, info = env.reset(seed=None if seed is None else seed + episode)
+                reset_time = info["time"]  # Instant de départ (> 0 avec warmup)
                 total_reward = 0
                 step = 0
 
-                while traci.simulation.getTime() <= self.SIMULATION_TIME:  # Exécuter l'épisode pendant un certain temps
+                while True:
+                    t = timers.start()
                     if control_traffic_lights:  # Si le contrôle des feux est activé
-                        
                         action = self.choose_action(state)  # Choisir l'action à partir de la politique
-                        self._apply_action(action)  # Appliquer l'action (changer la phase du feu)
                     else:
                         action = 0  # Default phase
-                        traci.trafficlight.setPhase("n6", action)  # Phase par défaut
-                        traci.simulationStep()  # Effectuer un pas de simulation
-                    
-                    next_state = self.get_state()  # Obtenir l'état suivant
-                    reward = self.calculate_reward(state, action, next_state)  # Calculer la récompense
-                    done = traci.simulation.getTime() > self.SIMULATION_TIME  # Vérifier si l'épisode est terminé
+                    timers.lap("choose_action", t)
+                    next_state, reward, terminated, truncated, info = env.step(action)  # apply_action, get_state, reward
+                    done = terminated or truncated  # Vérifier si l'épisode est terminé
 
-                    self._store_experience(state, action, reward, next_state, done)  # Enregistrer l'expérience
-                    self.update_network()  # Mettre à jour le modèle
+                    t = timers.start()
+                    # Seul un état terminal coupe la cible de Bellman ; une troncature garde la valeur de next_state
+                    self._store_experience(state, action, reward, next_state, terminated)  # Enregistrer l'expérience
+                    t = timers.lap("store_experience", t)
+                    loss = self.update_network()  # Mettre à jour le modèle
+                    t = timers.lap("update_network", t)
+                    if log_steps:
+                        self.metrics.log_step(episode + 1, step + 1, action, reward,
+                                              next_state[0] + next_state[1], (next_state[2] + next_state[3]) * 0.5,
+                                              np.nan if loss is None else float(loss), self.EPSILON)
+                        timers.lap("io", t)
 
                     state = next_state
                     total_reward += reward
@@ -175,26 +282,152 @@ class TrafficLightRL:
                 print(f"Épisode {episode + 1} terminé, Récompense: {total_reward:.2f}, Étapes: {step}")
                 episode_info = self.EpisodeInfo(episode + 1, total_reward, step)
                 self.rewards_history.append(episode_info)
+                t = timers.start()
                 self.save_rewards()
+                t = timers.lap("io", t)
                 if episode % self.TARGET_UPDATE_FREQ == 0:  # Mise à jour du modèle cible
-                    self.target_model.set_weights(self.model.get_weights())
+                    self.update_target_model()
+                    t = timers.lap("update_target", t)
                 
                 if (episode + 1) % 10 == 0:  # Sauvegarder le modèle tous les 10 épisodes
                     self._save_model(model_name, episode)
+                self.save_checkpoint(checkpoint_dir, episode + 1)
+                timers.lap("io", t)
+                report = timers.end_episode(info["time"] - reset_time, reward=total_reward, decisions=step)
+                if report is not None:
+                    print(PhaseTimers.format(report))
+
+        except (Exception, KeyboardInterrupt) as e:
+            print(f"Erreur pendant l'entraînement: {e}")
+            try:  # L'épisode interrompu sera rejoué, rien d'autre n'est perdu
+                self.save_checkpoint(checkpoint_dir, episode)
+                print(f"Point de reprise sauvegardé : train(..., resume_from={checkpoint_dir!r})")
+            except Exception as save_error:
+                print(f"Erreur lors de la sauvegarde du point de reprise: {save_error}")
+            if isinstance(e, KeyboardInterrupt):
+                raise  # Un entraînement interrompu ne doit pas passer pour terminé
+        finally:
+            env.close()  # Fermer la connexion à SUMO
+            if self.metrics is not None:
+                self.metrics.flush()  # Écrire les pas encore en mémoire
+
+    def save_checkpoint(self, directory, next_episode):
+        """Sauvegarder réseaux, optimiseur, mémoire, EPSILON et générateur aléatoire"""
+        checkpoint.save_checkpoint(self, directory, next_episode)
+
+    def load_checkpoint(self, directory, mmap_mode=None):
+        """Restaurer un point de reprise ; renvoie l'épisode à partir duquel reprendre.
+        mmap_mode : mémoire de replay projetée ("c") plutôt que lue (None)"""
+        next_episode = checkpoint.load_checkpoint(self, directory, mmap_mode=mmap_mode)
+        print(f"Reprise depuis {directory} à l'épisode {next_episode + 1}")
+        return next_episode
+
+    def train_async(self, sumo_config, model_name="traffic_light_model", updates_per_step=1.0,
+                    publish_interval=100):
+        """Entraîner l'agent avec un acteur (simulation) et un apprenant (mises à jour) en parallèle.
+        updates_per_step : nombre maximal de mises à jour par pas de simulation ;
+        publish_interval : mises à jour entre deux copies des poids vers l'acteur."""
+        env = RampMeteringEnv(sumo_config, backend=self.sim, episode_length=self.SIMULATION_TIME)
+        actor_learner = ActorLearner(self, env, updates_per_step=updates_per_step,
+                                     publish_interval=publish_interval)
+        self._open_run_metrics(model_name)
+        try:
+            summary = actor_learner.run(self.NUM_EPISODES, model_name)
+            print(f"Entraînement terminé, {actor_learner.counters}")
+            return summary
+        except Exception as e:
+            print(f"Erreur pendant l'entraînement: {e}")
+        finally:
+            env.close()  # Fermer la connexion à SUMO
+
+    def train_vectorized(self, sumo_config, num_envs=4, control_traffic_lights=True,
+                         model_name="traffic_light_model", updates_per_step=1, base_seed=0, warmup=None):
+        """Entraîner l'agent sur num_envs simulations SUMO avancées en parallèle.
+        Les transitions de toutes les simulations alimentent la même mémoire ;
+        updates_per_step mises à jour du réseau sont faites par pas (tous environnements confondus)."""
+        envs = SumoVecEnv(self, sumo_config, num_envs, control_traffic_lights=control_traffic_lights,
+                          base_seed=base_seed, warmup=warmup)
+        self._open_run_metrics(model_name)
+        try:
+            states = envs.reset()
+            total_rewards = np.zeros(num_envs)
+            steps = np.zeros(num_envs, dtype=int)
+            episode = 0
+            transitions = 0
+            start = time.perf_counter()
+
+            while episode < self.NUM_EPISODES:
+                if control_traffic_lights:
+                    actions = self.choose_actions(states)  # Une passe avant pour les N états
+                else:
+                    actions = np.zeros(num_envs, dtype=int)  # Phase par défaut
+                next_states, rewards, terminated, truncated = envs.step(actions)
+
+                self.memory.add_batch(states, actions, rewards, next_states, terminated)
+                for _ in range(updates_per_step):
+                    self.update_network()
+
+                total_rewards += rewards
+                steps += 1
+                transitions += num_envs
+                states = envs.observations  # États courants (réinitialisés pour les épisodes terminés)
+
+                for i in np.flatnonzero(terminated | truncated):
+                    if episode >= self.NUM_EPISODES:
+                        break
+                    print(f"Épisode {episode + 1} terminé (simulation {i}), Récompense: {total_rewards[i]:.2f}, "
+                          f"Étapes: {steps[i]}, Transitions/s: {transitions / (time.perf_counter() - start):.1f}")
+                    self.rewards_history.append(self.EpisodeInfo(episode + 1, float(total_rewards[i]), int(steps[i])))
+                    self.save_rewards()
+                    if episode % self.TARGET_UPDATE_FREQ == 0:  # Mise à jour du modèle cible
+                        self.update_target_model()
+                    if (episode + 1) % 10 == 0:  # Sauvegarder le modèle tous les 10 épisodes
+                        self._save_model(model_name, episode)
+                    total_rewards[i] = 0
+                    steps[i] = 0
+                    episode += 1
 
         except Exception as e:
             print(f"Erreur pendant l'entraînement: {e}")
         finally:
-            traci.close()  # Fermer la connexion à SUMO
+            envs.close()  # Fermer toutes les connexions à SUMO
+
+    def train_surrogate(self, sumo_config, num_envs=1024, num_steps=1000, updates_per_step=1,
+                        model_name="traffic_light_surrogate_model", seed=0):
+        """Pré-entraîner l'agent sur num_envs scénarios du simulateur NumPy (sans SUMO).
+        Chaque pas collecte num_envs transitions avec une seule passe avant du réseau."""
+        envs = SurrogateVecEnv(sumo_config, num_envs, seed=seed)
+        states = envs.reset()
+        total_rewards = np.zeros(num_envs)
+        start = time.perf_counter()
+        for step in range(num_steps):
+            actions = self.choose_actions(states)
+            next_states, rewards, terminated, truncated = envs.step(actions)
+            dones = terminated | truncated
+            self.memory.add_batch(states, actions, rewards, next_states, terminated)
+            for _ in range(updates_per_step):
+                self.update_network()
+            if (step + 1) % self.TARGET_UPDATE_FREQ == 0:  # Mise à jour du modèle cible
+                self.update_target_model()
+
+            total_rewards += rewards
+            states = envs.observations
+            if dones.any():
+                print(f"Pas {step + 1}: {int(dones.sum())} épisodes terminés, "
+                      f"Récompense moyenne: {total_rewards[dones].mean():.2f}, "
+                      f"Transitions/s: {(step + 1) * num_envs / (time.perf_counter() - start):.0f}")
+                total_rewards[dones] = 0
+        self._save_model(model_name, num_steps - 1)
 
-    def _apply_action(self, action):
+    def _apply_action(self, action, sim=None):
         """Appliquer l'action en modifiant la phase du feu"""
+        sim = self.sim if sim is None else sim
         try:
-            traci.trafficlight.setPhase("n6", action)  # Appliquer la phase de feu choisie
+            sim.trafficlight.setPhase("n6", action)  # Appliquer la phase de feu choisie
             phase_duration = self._get_phase_duration(action)  # Durée de la phase de feu
             for _ in range(phase_duration):
-                traci.simulationStep()  # Avancer dans la simulation
-        except traci.TraCIException as e:
+                sim.simulationStep()  # Avancer dans la simulation
+        except self.sim.TraCIException as e:
             print(f"Erreur lors de l'application de l'action: {e}")
 
     def _get_phase_duration(self, action):
@@ -211,10 +444,33 @@ class TrafficLightRL:
 
 def main():
     """Fonction principale d'entraînement"""
+    parser = sim_backend.add_backend_argument(argparse.ArgumentParser(description="Entraînement de l'agent DQL"))
+    parser.add_argument("--resume-from", default=None, help="Répertoire d'un point de reprise (checkpoints/...)")
+    parser.add_argument("--mmap-replay", action="store_true",
+                        help="Avec --resume-from : projeter la mémoire de replay (copy-on-write) au lieu de la lire")
+    parser.add_argument("--timings", default=None, help="Fichier JSONL des temps par phase de chaque épisode")
+    parser.add_argument("--profile-dir", default=None, help="Répertoire des profils cProfile (un par épisode)")
+    parser.add_argument("--warmup", type=int, nargs="+", default=None,
+                        help="Instant(s) de départ des épisodes en secondes (états sauvegardés puis rechargés)")
+    parser.add_argument("--drain", choices=("terminate", "fast_forward", "none"), default="none",
+                        help="Couper l'épisode quand le réseau s'est vidé (none : jusqu'à --simulation-time)")
+    parser.add_argument("--simulation-time", type=int, default=None,
+                        help="Durée maximale d'un épisode en secondes (troncature)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Graine de l'entraînement (poids initiaux, exploration, SUMO : seed + épisode)")
+    args = parser.parse_args()
     config_file = "../../projectnet.sumocfg"  # Fichier de configuration SUMO
-    agent = TrafficLightRL()  # Créer une instance de l'agent
+    if args.seed is not None:
+        tf.keras.utils.set_random_seed(args.seed)  # Avant la création des réseaux (poids initiaux)
+    agent = TrafficLightRL(backend=sim_backend.load_backend(args.backend, args.trace))  # Créer une instance de l'agent
+    if args.simulation_time is not None:
+        agent.SIMULATION_TIME = args.simulation_time
     # agent.train(config_file, control_traffic_lights=True, model_name="traffic_light_control")  # Entraîner l'agent
-    agent.train(config_file, control_traffic_lights=False, model_name="without_traffic_light_control")  # Entraîner l'agent
+    agent.train(config_file, control_traffic_lights=False, model_name="without_traffic_light_control",
+                resume_from=args.resume_from, mmap_mode="c" if args.mmap_replay else None,
+                timing_file=args.timings,
+                profile_dir=args.profile_dir, warmup=args.warmup,
+                drain=None if args.drain == "none" else args.drain, seed=args.seed)  # Entraîner l'agent
 
 if __name__ == "__main__":
     main()  # Exécuter la fonction principale
@@ -1,7 +1,13 @@
-import traci
+import argparse
 import numpy as np
 import tensorflow as tf
-import pickle
+from state_subscription import StateSubscription, SubscriptionError, DQL_FEATURES
+import sim_backend
+from numpy_policy import NumpyPolicy
+from instrumentation import PhaseTimers, NULL_TIMERS
+from reward import traffic_reward
+from sumo_outputs import SumoOutputs
+from trajectory import TrajectoryWriter, CHECKPOINT_SUMO_ARGS
 
 class CustomLoss(tf.keras.losses.Loss):
     def __init__(self, name="custom_loss"):
@@ -14,7 +20,7 @@ class CustomLoss(tf.keras.losses.Loss):
         return {"name": self.name}
 
 class TrafficLightRLTest:
-    def __init__(self, model_path):
+    def __init__(self, model_path, backend="traci"):
         # Register both the custom loss and the MSE metric
         custom_objects = {
             "CustomLoss": CustomLoss,
@@ -30,88 +36,123 @@ class TrafficLightRLTest:
             print(f"Error loading model: {e}")
             raise
             
+        self.policy = NumpyPolicy(self.model)  # Weights never change during the test
         self.STATE_DIM = 6
         self.ACTION_DIM = 3
-        self.test_data = []
+        self.trajectory_path = "DQL_TEST_VISUALISATION.traj"  # Typed columns, see trajectory.py
+        self.sim = sim_backend.load_backend(backend)  # traci, libsumo or fake: same API
+        self.state_subscription = StateSubscription(DQL_FEATURES)
 
     def get_state(self):
-        """Get current traffic state from SUMO"""
+        """Get current traffic state from the SUMO subscriptions (no extra round trip)"""
         try:
-            state = [
-                traci.edge.getLastStepHaltingNumber("in"),
-                traci.edge.getLastStepHaltingNumber("E0"),
-                traci.edge.getLastStepMeanSpeed("in"),
-                traci.edge.getLastStepMeanSpeed("E0"),
-                traci.edge.getLastStepOccupancy("2to3"),
-                float(traci.trafficlight.getPhase("n6"))
-            ]
-            return np.array(state, dtype=np.float32)
-        except traci.TraCIException as e:
+            return self.state_subscription.read(self.sim)
+        except (self.sim.TraCIException, SubscriptionError) as e:
             print(f"Error getting state: {e}")
             return np.zeros(self.STATE_DIM, dtype=np.float32)
 
     def choose_action(self, state):
         """Choose action using loaded model"""
-        state_tensor = np.expand_dims(state, 0)
         try:
-            q_values = self.model.predict(state_tensor, verbose=0)
-            return np.argmax(q_values[0])
+            return self.policy.greedy_action(state)  # NumPy forward pass, no Keras dispatch
         except Exception as e:
             print(f"Error predicting action: {e}")
             return 0
 
-    def test(self, sumo_config):
-        """Test agent on SUMO simulation"""
+    def test(self, sumo_config, timing_file=None, profile_dir=None, stop_when_drained=False, outputs=None,
+             checkpoint_every=None):
+        """Test agent on SUMO simulation.
+        timing_file: per-phase timings appended as one JSON line; profile_dir: cProfile dump of the run.
+        stop_when_drained: end the run once no vehicle is running or waiting to be inserted
+        (getMinExpectedNumber() == 0) instead of stepping an empty network until t=3600;
+        off by default so the run keeps its full horizon
+        outputs: SumoOutputs whose files SUMO writes during the run; its report is printed and saved after close
+        checkpoint_every: save the simulation state every N steps into the trajectory, so that
+        dql_test_visualization_with_sumo.py can replay from any step without simulating from t=0"""
+        timers = PhaseTimers(timing_file or "timings.jsonl", profile_dir) if timing_file or profile_dir else NULL_TIMERS
+        timers.start_episode()
+        sumo_args = CHECKPOINT_SUMO_ARGS if checkpoint_every else []  # Dynamics-relevant options, kept for replay
+        recorder = TrajectoryWriter(self.trajectory_path, self.STATE_DIM, sumo_args=sumo_args)
         try:
-            traci.start(["sumo", "-c", sumo_config])
+            self.sim.start(["sumo", "-c", sumo_config] + sumo_args + (outputs.args(sumo_config) if outputs else []))
+            self.state_subscription.subscribe(self.sim)
             state = self.get_state()
             total_reward = 0
             step = 0
 
-            while traci.simulation.getTime() <= 3600:
+            sim_time = self.sim.simulation.getTime()
+            while sim_time <= 3600:
+                if checkpoint_every and step % checkpoint_every == 0:
+                    t = timers.start()
+                    recorder.checkpoint(self.sim, step, sim_time)
+                    timers.lap("checkpoint", t)
+                t = timers.start()
                 action = self.choose_action(state)
-                traci.trafficlight.setPhase("n6", action)
+                t = timers.lap("choose_action", t)
+                self.sim.trafficlight.setPhase("n6", action)
 
-                traci.simulationStep()
+                self.sim.simulationStep()
+                t = timers.lap("apply_action", t)
                 next_state = self.get_state()
+                t = timers.lap("get_state", t)
                 reward = self.calculate_reward(state, action, next_state)
+                t = timers.lap("reward", t)
 
-                self.test_data.append({
-                    "state": state.tolist(),
-                    "action": action,
-                    "reward": reward,
-                    "next_state": next_state.tolist()
-                })
+                recorder.append(step, state, action, reward, next_state, sim_time)  # Time the state was observed
+                timers.lap("record", t)
 
                 state = next_state
                 total_reward += reward
                 step += 1
+                sim_time = self.sim.simulation.getTime()
+
+                if stop_when_drained and self.sim.simulation.getMinExpectedNumber() == 0:
+                    print(f"Network drained at t={sim_time:.0f} s")
+                    break
 
             print(f"Test completed, Total reward: {total_reward:.2f}, Steps: {step}")
         except Exception as e:
             print(f"Error during test: {e}")
         finally:
-            traci.close()
+            self.sim.close()
+            t = timers.start()
             try:
-                with open("DQL_TEST_VISUALISATION.pkl", "wb") as f:
-                    pickle.dump(self.test_data, f)
+                recorder.close()  # Only the last partial chunk is left to write
             except Exception as e:
                 print(f"Error saving test data: {e}")
+            timers.lap("io", t)
+            report = timers.end_episode(recorder.size, decisions=recorder.size)  # One simulated second per step
+            if report is not None:
+                print(PhaseTimers.format(report))
+            if outputs is not None:
+                try:
+                    print(f"SUMO outputs: {outputs.save_report()}")
+                except Exception as e:
+                    print(f"Error reading SUMO outputs: {e}")
 
     def calculate_reward(self, state, action, next_state):
         """Calculate reward for state transition"""
-        queue_length = -(next_state[0] + next_state[1])
-        speed_factor = (next_state[2] + next_state[3]) * 0.5
-        congestion_penalty = -next_state[4] * 3 if next_state[4] > 0.7 else 0
-        phase_change = -5 if state[5] != next_state[5] else 0
-
-        return float(queue_length + speed_factor + congestion_penalty + phase_change)
+        return float(traffic_reward(np.asarray(state), np.asarray(next_state)))
 
 if __name__ == "__main__":
+    parser = sim_backend.add_backend_argument(argparse.ArgumentParser(description="Test the trained DQL agent"))
+    parser.add_argument("--timings", default=None, help="Append per-phase timings (JSON lines) to this file")
+    parser.add_argument("--profile-dir", default=None, help="Write a cProfile dump of the test run to this directory")
+    parser.add_argument("--stop-when-drained", action="store_true",
+                        help="End the run as soon as the network has drained instead of at t=3600")
+    parser.add_argument("--outputs", default=None,
+                        help="Directory for SUMO tripinfo/summary/edgedata outputs, parsed after the run")
+    parser.add_argument("--period", type=float, default=None, help="Aggregation interval of the edgedata output (s)")
+    parser.add_argument("--checkpoint-every", type=int, default=300,
+                        help="Save the simulation state every N steps for seekable replay (0: never)")
+    args = parser.parse_args()
     try:
         sumo_config_file = "../../projectnet.sumocfg"
         model_path = "DQL_models/with_controller_episode_100.h5"
-        tester = TrafficLightRLTest(model_path)
-        tester.test(sumo_config_file)
+        tester = TrafficLightRLTest(model_path, backend=sim_backend.load_backend(args.backend, args.trace))
+        tester.test(sumo_config_file, timing_file=args.timings, profile_dir=args.profile_dir,
+                    stop_when_drained=args.stop_when_drained,
+                    outputs=SumoOutputs(args.outputs, args.period) if args.outputs else None,
+                    checkpoint_every=args.checkpoint_every)
     except Exception as e:
         print(f"Error in main execution: {e}")
\ No newline at end of file
@@ -1,100 +1,160 @@
-import traci
-import pickle
+import argparse
+import os
 import time
 import numpy as np
-import tensorflow as tf
+import sim_backend
+from state_subscription import StateSubscription, DQL_FEATURES
+from trajectory import load_trajectory
+
+TL_ID = "n6"
+
 
 class TrafficLightVisualization:
-    def __init__(self, test_data_path, sumo_config):
+    """
+    Rejeu d'une trajectoire de test enregistrée (dql_test.py) :
+    - seek(step) : recharge le dernier point de sauvegarde de la trajectoire situé avant
+      step (dql_test.py --checkpoint-every N), puis réapplique les actions enregistrées
+      jusqu'à step : au plus N pas simulés, quel que soit step ;
+    - visualize(start_step) : à partir de start_step sous sumo-gui, delay secondes par pas ;
+    - verify() : sans interface et sans attente, réapplique les actions enregistrées et
+      compare chaque observation reproduite à l'état enregistré (next_state).
+    Les pas reproduisent la boucle du test : setPhase(action), simulationStep, observation.
+    """
+
+    def __init__(self, test_data_path, sumo_config, gui=True, backend="traci"):
         self.sumo_config = sumo_config
         self.test_data_path = test_data_path
-        
+        self.gui = gui
+        self.sim = sim_backend.load_backend(backend)
+        self.state_subscription = StateSubscription(DQL_FEATURES)
+        self.trajectory = None
+        self.step = None  # Prochain pas enregistré à rejouer
+        self.time = 0.0  # Temps simulé avant ce pas
+        self.started = False
+
     def load_test_data(self):
         """Charger les données de test sauvegardées"""
         try:
-            with open(self.test_data_path, "rb") as f:
-                return pickle.load(f)
+            self.trajectory = load_trajectory(self.test_data_path)  # Répertoire .traj (ou ancien .pkl)
+            return self.trajectory
         except Exception as e:
             print(f"Erreur lors du chargement des données de test: {e}")
             return None
 
-    def visualize(self):
-        """Visualiser la simulation avec les données de test"""
-        # Charger les données
-        test_data = self.load_test_data()
-        if test_data is None:
-            return
+    def _sumo_args(self):
+        args = ["-c", self.sumo_config] + self.trajectory.sumo_args
+        if self.gui:
+            args += ["--start", "--quit-on-end", "--delay", "0"]  # Attente gérée par visualize
+        return args
+
+    def seek(self, step):
+        """Placer la simulation juste avant le pas step ; renvoie le nombre de pas simulés pour y arriver"""
+        if self.trajectory is None and self.load_test_data() is None:
+            raise RuntimeError(f"Trajectoire illisible : {self.test_data_path}")
+        step = int(np.clip(step, 0, len(self.trajectory)))
+        args = self._sumo_args()
+        checkpoints = [c for c in self.trajectory.checkpoints if c["step"] <= step]
+        start_step = 0
+        if checkpoints:  # load --load-state (simulation.loadState réinjecte les véhicules déjà arrivés)
+            checkpoint = checkpoints[-1]
+            start_step = checkpoint["step"]
+            args += ["--begin", str(checkpoint["time"]),
+                     "--load-state", os.path.join(self.trajectory.path, checkpoint["file"])]
+        if self.started:
+            self.sim.load(args)
+        else:
+            self.sim.start(["sumo-gui" if self.gui else "sumo"] + args)
+            self.started = True
+        self.state_subscription.subscribe(self.sim)  # Les abonnements sont perdus à chaque load
+        self.time = self.sim.simulation.getTime()
+        self.step = start_step
+        self.play(step)
+        return step - start_step
+
+    def advance(self):
+        """Rejouer le prochain pas enregistré ; renvoie l'observation obtenue"""
+        self.sim.trafficlight.setPhase(TL_ID, int(self.trajectory["action"][self.step]))
+        self.time += 1.0  # Pas d'une seconde, comme dans le test
+        self.sim.simulationStep(self.time)  # Cible explicite : simulationStep() ne repart pas de --begin après load
+        self.step += 1
+        return self.state_subscription.read(self.sim)
+
+    def play(self, end_step=None, delay=0.0, progress_every=0):
+        """Rejouer jusqu'au pas end_step (exclu, défaut : fin de la trajectoire), delay secondes par pas"""
+        end_step = len(self.trajectory) if end_step is None else min(end_step, len(self.trajectory))
+        while self.step < end_step:
+            self.advance()
+            if progress_every and self.step % progress_every == 0:
+                print(f"Étape de visualisation: {self.step}/{len(self.trajectory)}")
+            if delay:
+                time.sleep(delay)
+
+    def verify(self, start_step=0, end_step=None, atol=1e-4):
+        """Rejeu sans attente depuis start_step : chaque observation doit égaler next_state enregistré.
+        Renvoie un résumé (pas vérifiés, écarts, premier écart, écart maximal, durée)."""
+        start = time.perf_counter()
+        self.seek(start_step)
+        expected = self.trajectory["next_state"]
+        end_step = len(self.trajectory) if end_step is None else min(end_step, len(self.trajectory))
+        first_step = self.step
+        errors = np.zeros(max(end_step - first_step, 0))
+        while self.step < end_step:
+            i = self.step
+            errors[i - first_step] = np.max(np.abs(self.advance() - expected[i]))
+        mismatches = np.flatnonzero(errors > atol)
+        return {
+            "steps": len(errors),
+            "mismatches": len(mismatches),
+            "first_mismatch": int(mismatches[0] + first_step) if len(mismatches) else None,
+            "max_error": float(errors.max()) if len(errors) else 0.0,
+            "wall_s": time.perf_counter() - start,
+        }
 
+    def visualize(self, start_step=0, end_step=None, delay=0.1):
+        """Visualiser la simulation avec les données de test à partir de start_step"""
         try:
-            # Démarrer SUMO avec l'interface graphique et des options supplémentaires
-            sumo_cmd = [
-                "sumo-gui",
-                "-c", self.sumo_config,
-                "--start",  # Démarrer la simulation immédiatement
-                "--quit-on-end",  # Quitter à la fin
-                "--delay", "300"  # Délai entre les étapes (en ms)
-            ]
-            
-            traci.start(sumo_cmd)
-            
-            # Attendre que SUMO soit prêt
-            time.sleep(1)
-            
+            skipped = self.seek(start_step)
             print("Démarrage de la visualisation...")
-            print(f"Nombre total d'étapes à visualiser: {len(test_data)}")
-
-            # Initialiser la simulation
-            traci.simulationStep()
-
-            # Parcourir les données de test
-            for i, entry in enumerate(test_data):
-                # Obtenir l'état et l'action
-                state = np.array(entry["state"])
-                action = entry["action"]
-                
-                # Appliquer l'action au feu de signalisation
-                try:
-                    current_phase = traci.trafficlight.getPhase("n6")
-                    if current_phase != action:
-                        traci.trafficlight.setPhase("n6", action)
-                except Exception as e:
-                    print(f"Erreur lors du changement de phase: {e}")
-                
-                # Avancer la simulation
-                traci.simulationStep()
-                
-                # Vérifier si des véhicules sont présents
-                vehicles = traci.vehicle.getIDList()
-                if len(vehicles) == 0 and i > 100:  # Vérifier après quelques étapes
-                    print("Aucun véhicule dans la simulation, vérifiez la configuration")
-                
-                # Afficher la progression
-                if i % 100 == 0:
-                    print(f"Étape de visualisation: {i}/{len(test_data)}")
-                    print(f"Nombre de véhicules: {len(vehicles)}")
-                
-                # Ajouter un délai pour une meilleure visualisation
-                time.sleep(0.1)
-
-        except traci.exceptions.FatalTraCIError as e:
-            print(f"Erreur SUMO: {e}")
-        except Exception as e:
-            print(f"Erreur inattendue: {e}")
+            print(f"Pas {self.step}/{len(self.trajectory)} atteint ({skipped} pas rejoués depuis le point de sauvegarde)")
+            self.play(end_step, delay, progress_every=100)
+        except Exception as e:  # FatalTraCIError quand la fenêtre est fermée, selon le backend
+            print(f"Erreur pendant la visualisation: {e}")
         finally:
+            self.close()
+            print("Visualisation terminée")
+
+    def close(self):
+        if self.started:
             try:
-                traci.close()
-                print("Visualisation terminée")
-            except:
+                self.sim.close()
+            except Exception:
                 pass
+            self.started = False
+
 
 def main():
-    # Chemins des fichiers
-    test_data_path = "DQL_TEST_VISUALISATION.pkl"
+    parser = sim_backend.add_backend_argument(argparse.ArgumentParser(description="Rejeu d'une trajectoire de test"))
+    parser.add_argument("--data", default="DQL_TEST_VISUALISATION.traj", help="Trajectoire enregistrée par dql_test.py")
+    parser.add_argument("--start-step", type=int, default=0, help="Premier pas rejoué (depuis le point de sauvegarde le plus proche)")
+    parser.add_argument("--end-step", type=int, default=None, help="Dernier pas rejoué (exclu)")
+    parser.add_argument("--delay", type=float, default=0.1, help="Attente par pas sous sumo-gui (s)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Sans interface, à vitesse maximale : vérifier que les observations rejouées égalent les enregistrées")
+    args = parser.parse_args()
     sumo_config = "../../projectnet.sumocfg"
-    
-    # Créer et exécuter la visualisation
-    visualizer = TrafficLightVisualization(test_data_path, sumo_config)
-    visualizer.visualize()
+
+    visualizer = TrafficLightVisualization(args.data, sumo_config, gui=not args.verify,
+                                           backend=sim_backend.load_backend(args.backend, args.trace))
+    if args.verify:
+        try:
+            report = visualizer.verify(args.start_step, args.end_step)
+        finally:
+            visualizer.close()
+        print(f"{report['steps']} pas vérifiés en {report['wall_s']:.2f} s : {report['mismatches']} écarts "
+              f"(premier : {report['first_mismatch']}, écart maximal {report['max_error']:.3g})")
+    else:
+        visualizer.visualize(args.start_step, args.end_step, args.delay)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,300 @@
+'''Simulation factice ayant la même interface que le module traci (pour les tests
+et les benchmarks sans SUMO). Le trafic est un modèle de files d'attente simple et
+déterministe (pour une graine donnée) autour du feu "n6" :
+- la bretelle (E0 puis E2) se vide seulement quand le feu est vert (phase 0),
+- l'autoroute ("in" puis "2to3") ralentit quand la bretelle déverse beaucoup de véhicules.
+Seul le sous-ensemble de l'API utilisé par le projet est implémenté.
+'''
+import json
+import re
+import types
+import numpy as np
+
+# Identifiants des variables TraCI utilisées par le projet (mêmes valeurs que traci.constants)
+constants = types.SimpleNamespace(
+    LAST_STEP_MEAN_SPEED=0x11,
+    LAST_STEP_OCCUPANCY=0x13,
+    LAST_STEP_VEHICLE_HALTING_NUMBER=0x14,
+    LAST_STEP_VEHICLE_NUMBER=0x10,
+    TL_CURRENT_PHASE=0x28,
+    VAR_SPEED=0x40,
+    VAR_WAITING_TIME=0x7a,
+    VAR_TIMELOSS=0x8c,
+    CMD_GET_VEHICLE_VARIABLE=0xa4,
+)
+
+
+class TraCIException(Exception):
+    """Erreur non fatale (même rôle que traci.TraCIException)"""
+
+
+class FatalTraCIError(Exception):
+    """Erreur fatale (même rôle que traci.FatalTraCIError)"""
+
+
+exceptions = types.SimpleNamespace(TraCIException=TraCIException, FatalTraCIError=FatalTraCIError)
+
+EDGES = {  # id: (nombre de voies, vitesse maximale en m/s, longueur en m)
+    "in": (3, 30.0, 238.12),
+    "E0": (1, 13.89, 297.24),
+    "E2": (1, 13.89, 150.0),
+    "2to3": (3, 30.0, 104.04),
+    "3to4": (3, 30.0, 150.0),
+}
+PHASE_DURATIONS = [82, 3, 5]  # Programme statique du feu "n6" (vert, jaune, rouge)
+VEHICLE_LENGTH = 7.5  # Longueur moyenne d'un véhicule + écart (m)
+
+
+class _Domain:
+    """Domaine TraCI (edge, trafficlight, ...) avec la gestion des abonnements"""
+    def __init__(self, simulation, getters):
+        self._simulation = simulation
+        self._getters = getters  # variable TraCI -> fonction(objet)
+        self._subscriptions = {}
+
+    def subscribe(self, object_id, variables=()):
+        self._subscriptions[object_id] = list(variables)
+
+    def getSubscriptionResults(self, object_id):
+        variables = self._subscriptions.get(object_id)
+        if variables is None or not self._simulation.running:
+            return {}
+        return {variable: self._getters[variable](object_id) for variable in variables}
+
+
+class _ContextDomain(_Domain):
+    """Domaine junction : abonnements de contexte aux véhicules"""
+    def subscribeContext(self, object_id, domain, dist, variables=()):
+        self._subscriptions[object_id] = list(variables)
+
+    def getContextSubscriptionResults(self, object_id):
+        variables = self._subscriptions.get(object_id)
+        if variables is None or not self._simulation.running:
+            return {}
+        return {veh_id: {variable: self._getters[variable](veh_id) for variable in variables}
+                for veh_id in self._simulation._vehicle_ids()}
+
+
+class FakeSimulation:
+    """Une simulation factice (équivalent d'une connexion TraCI)"""
+    def __init__(self, cmd=None, demand_end=1200):
+        self.demand_end = demand_end  # Plus aucun véhicule n'entre après cet instant
+        self.running = False
+        self._configure(cmd or [])
+
+        tc = constants
+        self.edge = _Domain(self, {
+            tc.LAST_STEP_VEHICLE_HALTING_NUMBER: self._halting,
+            tc.LAST_STEP_MEAN_SPEED: self._mean_speed,
+            tc.LAST_STEP_OCCUPANCY: self._occupancy,
+            tc.LAST_STEP_VEHICLE_NUMBER: self._vehicle_number,
+        })
+        self.edge.getLastStepHaltingNumber = self._halting
+        self.edge.getLastStepMeanSpeed = self._mean_speed
+        self.edge.getLastStepOccupancy = self._occupancy
+        self.edge.getLastStepVehicleNumber = self._vehicle_number
+        self.edge.getIDList = lambda: list(EDGES)
+
+        self.trafficlight = _Domain(self, {tc.TL_CURRENT_PHASE: lambda tl_id: self._get_phase(tl_id)})
+        self.trafficlight.getPhase = self._get_phase
+        self.trafficlight.setPhase = self._set_phase
+
+        vehicle_getters = {
+            tc.VAR_SPEED: self._vehicle_speed,
+            tc.VAR_WAITING_TIME: lambda veh_id: float(self._vehicle_speed(veh_id) == 0.0),
+            tc.VAR_TIMELOSS: lambda veh_id: float(self._vehicle_speed(veh_id) == 0.0),
+        }
+        self.vehicle = _Domain(self, vehicle_getters)
+        self.vehicle.getIDList = self._vehicle_ids
+        self.vehicle.getIDCount = lambda: len(self._vehicle_ids())
+        self.vehicle.getSpeed = self._vehicle_speed
+        # Abonnement de contexte autour d'un carrefour : tous les véhicules du réseau, quel que soit le rayon
+        self.junction = _ContextDomain(self, vehicle_getters)
+
+        self.simulation = types.SimpleNamespace(
+            getTime=lambda: float(self.time),
+            getMinExpectedNumber=self._min_expected_number,
+            getArrivedNumber=lambda: self.arrived,
+            saveState=self._save_state,
+        )
+        self._reset()
+
+    def _configure(self, cmd):
+        """Lire la graine (--seed) et l'état initial (--load-state) dans la ligne de commande SUMO"""
+        args = " ".join(str(arg) for arg in cmd)
+        match = re.search(r"--seed\s+(\d+)", args)
+        self.seed = int(match.group(1)) if match else 0
+        match = re.search(r"--load-state\s+(\S+)", args)
+        self.state_file = match.group(1) if match else None
+
+    def _reset(self):
+        self.rng = np.random.default_rng(self.seed)
+        self.time = 0
+        self.phase = 0
+        self.phase_remaining = PHASE_DURATIONS[0]
+        self.counts = {edge_id: 0.0 for edge_id in EDGES}  # Véhicules présents par edge
+        self.halting = {edge_id: 0.0 for edge_id in EDGES}  # Véhicules arrêtés par edge
+        self.exited = 0.0  # Véhicules sortis du réseau depuis le début
+        self.arrived = 0  # Véhicules sortis pendant le dernier pas
+        if self.state_file is not None:
+            with open(self.state_file) as f:
+                state = json.load(f)
+            self.time, self.phase, self.phase_remaining = state["time"], state["phase"], state["phase_remaining"]
+            self.counts, self.halting = state["counts"], state["halting"]
+        self.running = True
+
+    def _save_state(self, path):
+        """Équivalent de simulation.saveState (l'état aléatoire vient de --seed au rechargement)"""
+        with open(path, "w") as f:
+            json.dump({"time": self.time, "phase": self.phase, "phase_remaining": self.phase_remaining,
+                       "counts": self.counts, "halting": self.halting}, f)
+
+    # Contrôle de la simulation
+    def simulationStep(self, step=0.0):
+        if not self.running:
+            raise FatalTraCIError("Not connected.")
+        target = max(float(step), self.time + 1)
+        while self.time < target:
+            self._advance()
+
+    def load(self, args):
+        self._configure(args)
+        self._reset()
+        for domain in (self.edge, self.trafficlight, self.vehicle, self.junction):
+            domain._subscriptions.clear()  # Comme SUMO : load supprime les abonnements
+
+    def close(self, wait=True):
+        self.running = False
+
+    # Dynamique du trafic (une seconde)
+    def _advance(self):
+        demand = self.time < self.demand_end
+        main_arrivals = self.rng.poisson(0.9) if demand else 0
+        ramp_arrivals = self.rng.poisson(0.6) if demand else 0
+        green = self.phase == 0
+
+        ramp_out = min(self.counts["E2"], 1.0)  # Insertion de la bretelle dans l'autoroute
+        signal_out = min(self.counts["E0"], 1.0) if green else 0.0  # Passage du feu
+        main_out = min(self.counts["in"], 1.5)
+        merge_out = min(self.counts["2to3"], 3.0)
+        exit_out = min(self.counts["3to4"], 3.0)
+
+        self.counts["E0"] += ramp_arrivals - signal_out
+        self.counts["E2"] += signal_out - ramp_out
+        self.counts["in"] += main_arrivals - main_out
+        self.counts["2to3"] += main_out + ramp_out - merge_out
+        self.counts["3to4"] += merge_out - exit_out
+        self.arrived = int(self.exited + exit_out) - int(self.exited)
+        self.exited += exit_out
+
+        self.halting["E0"] = max(0.0, self.counts["E0"] - (1.0 if green else 0.0))
+        self.halting["E2"] = max(0.0, self.counts["E2"] - 1.0)
+        self.halting["in"] = max(0.0, self.counts["in"] - 4.0 - 2.0 * (1.0 - ramp_out))
+        self.halting["2to3"] = max(0.0, self.counts["2to3"] - 6.0)
+        self.halting["3to4"] = 0.0
+
+        self.time += 1
+        self.phase_remaining -= 1
+        if self.phase_remaining <= 0:  # Passage automatique à la phase suivante du programme
+            self._set_phase("n6", (self.phase + 1) % len(PHASE_DURATIONS))
+
+    # Variables des edges
+    def _check_edge(self, edge_id):
+        if edge_id not in EDGES:
+            raise TraCIException(f"Edge '{edge_id}' is not known")
+
+    def _vehicle_number(self, edge_id):
+        self._check_edge(edge_id)
+        return int(round(self.counts[edge_id]))
+
+    def _halting(self, edge_id):
+        self._check_edge(edge_id)
+        return int(round(self.halting[edge_id]))
+
+    def _mean_speed(self, edge_id):
+        self._check_edge(edge_id)
+        lanes, max_speed, length = EDGES[edge_id]
+        if self.counts[edge_id] < 0.5:
+            return max_speed  # Edge vide : SUMO renvoie la vitesse maximale
+        moving = 1.0 - self.halting[edge_id] / max(self.counts[edge_id], 1.0)
+        return max_speed * max(0.0, moving)
+
+    def _occupancy(self, edge_id):
+        self._check_edge(edge_id)
+        lanes, max_speed, length = EDGES[edge_id]
+        return min(1.0, self.counts[edge_id] * VEHICLE_LENGTH / (lanes * length))  # Fraction, comme SUMO
+
+    # Feu de signalisation
+    def _get_phase(self, tl_id):
+        if tl_id != "n6":
+            raise TraCIException(f"Traffic light '{tl_id}' is not known")
+        return self.phase
+
+    def _set_phase(self, tl_id, phase):
+        if tl_id != "n6":
+            raise TraCIException(f"Traffic light '{tl_id}' is not known")
+        if not 0 <= int(phase) < len(PHASE_DURATIONS):
+            raise TraCIException(f"The phase index {phase} is not in the allowed range")
+        self.phase = int(phase)
+        self.phase_remaining = PHASE_DURATIONS[self.phase]
+
+    # Véhicules (identifiants synthétiques, un par véhicule compté sur chaque edge)
+    def _vehicle_ids(self):
+        return [f"{edge_id}.{i}" for edge_id in EDGES for i in range(int(round(self.counts[edge_id])))]
+
+    def _vehicle_speed(self, veh_id):
+        edge_id, _, index = veh_id.rpartition(".")
+        if edge_id not in EDGES:
+            raise TraCIException(f"Vehicle '{veh_id}' is not known")
+        halted = int(index) < int(round(self.halting[edge_id]))
+        return 0.0 if halted else EDGES[edge_id][1]
+
+    def _min_expected_number(self):
+        if self.time < self.demand_end:
+            return 1 + int(sum(self.counts.values()))
+        return int(round(sum(self.counts.values())))
+
+
+class FakeTraci:
+    '''Objet se comportant comme le module traci : start/load/close/simulationStep
+    et les domaines (edge, trafficlight, simulation, vehicle) s'appliquent à la
+    simulation courante ; les simulations étiquetées s'obtiennent par getConnection.
+    '''
+    TraCIException = TraCIException
+    FatalTraCIError = FatalTraCIError
+    exceptions = exceptions
+    constants = constants
+
+    def __init__(self, **simulation_options):
+        self._options = simulation_options
+        self._connections = {}
+        self._current = None
+
+    def start(self, cmd, label="default", **kwargs):
+        self._connections[label] = FakeSimulation(cmd, **self._options)
+        self._current = label
+        return self._connections[label]
+
+    def getConnection(self, label="default"):
+        if label not in self._connections:
+            raise TraCIException(f"Connection '{label}' is not known.")
+        return self._connections[label]
+
+    def switch(self, label):
+        self._current = self.getConnection(label) and label
+
+    def close(self, wait=True):
+        self._simulation().close()
+        del self._connections[self._current]
+        self._current = next(iter(self._connections), None)
+
+    def _simulation(self):
+        if self._current is None:
+            raise FatalTraCIError("Not connected.")
+        return self._connections[self._current]
+
+    def __getattr__(self, name):
+        # edge, trafficlight, vehicle, simulation, simulationStep, load...
+        if name.startswith("__"):
+            raise AttributeError(name)  # __name__, __deepcopy__... ne concernent pas la simulation
+        return getattr(self._simulation(), name)
@@ -0,0 +1,135 @@
+'''Mesure du temps passé dans chaque phase d'un pas d'entraînement ou de test
+(allers-retours TraCI, choix d'action, mise à jour du réseau, écritures...).
+- PhaseTimers.lap(phase, t) ajoute la durée écoulée depuis t à la phase et renvoie
+  l'instant courant : deux appels à perf_counter par phase, aucune allocation.
+- end_episode écrit une ligne JSON par épisode : pour chaque phase nombre d'appels,
+  total, moyenne, p50, p95, p99 (en µs), compteurs, secondes simulées par seconde
+  réelle et mémoire résidente (RSS) du processus.
+- profile_dir : profil cProfile de chaque épisode dans profile_dir/episode_<n>.prof
+NULL_TIMERS a la même interface et ne mesure rien (instrumentation désactivée).
+'''
+import cProfile
+import json
+import os
+import time
+from collections import defaultdict
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def current_rss():
+    """Mémoire résidente actuelle du processus en octets (pic de RSS si indisponible, None sinon)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # ko sous Linux
+    return None
+
+
+class PhaseTimers:
+    def __init__(self, path="timings.jsonl", profile_dir=None):
+        self.path = path
+        self.profile_dir = profile_dir
+        self.durations = defaultdict(list)  # phase -> durées (s) de l'épisode courant
+        self.counters = defaultdict(int)
+        self.episode = 0
+        self._episode_start = None
+        self._profiler = None
+
+    @staticmethod
+    def start():
+        return time.perf_counter()
+
+    def lap(self, phase, t):
+        """Ajouter à phase le temps écoulé depuis t ; renvoie l'instant courant"""
+        now = time.perf_counter()
+        self.durations[phase].append(now - t)
+        return now
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def start_episode(self):
+        self.durations.clear()
+        self.counters.clear()
+        self.episode += 1
+        if self.profile_dir:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._episode_start = time.perf_counter()
+
+    def end_episode(self, sim_seconds, **extra):
+        """Résumer l'épisode, l'ajouter au fichier de mesures et le renvoyer"""
+        wall = time.perf_counter() - self._episode_start
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            self._profiler.dump_stats(os.path.join(self.profile_dir, f"episode_{self.episode}.prof"))
+            self._profiler = None
+
+        phases = {}
+        for phase, durations in self.durations.items():
+            us = np.asarray(durations) * 1e6
+            p50, p95, p99 = np.percentile(us, [50, 95, 99])
+            phases[phase] = {"count": len(us), "total_s": float(us.sum() / 1e6), "mean_us": float(us.mean()),
+                             "p50_us": float(p50), "p95_us": float(p95), "p99_us": float(p99)}
+        report = {
+            "episode": self.episode,
+            "wall_s": wall,
+            "sim_s": float(sim_seconds),
+            "sim_s_per_wall_s": float(sim_seconds) / wall if wall > 0 else None,
+            "rss_bytes": current_rss(),
+            "phases": phases,
+            "counters": dict(self.counters),
+            **extra,
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(report, separators=(",", ":")) + "\n")
+        return report
+
+    @staticmethod
+    def format(report):
+        """Résumé lisible d'un rapport (une ligne par phase)"""
+        lines = [f"{report['sim_s']:.0f} s simulées en {report['wall_s']:.1f} s "
+                 f"({report['sim_s_per_wall_s']:.1f} s/s), RSS {(report['rss_bytes'] or 0) / 2 ** 20:.0f} Mo"]
+        for phase, stats in sorted(report["phases"].items(), key=lambda item: -item[1]["total_s"]):
+            lines.append(f"  {phase:<16} {stats['count']:>6} x  total {stats['total_s']:8.3f} s  "
+                         f"p50 {stats['p50_us']:9.1f} µs  p95 {stats['p95_us']:9.1f} µs  p99 {stats['p99_us']:9.1f} µs")
+        return "\n".join(lines)
+
+
+class _NullTimers:
+    """Même interface que PhaseTimers, sans aucune mesure"""
+    profile_dir = None
+
+    @staticmethod
+    def start():
+        return 0.0
+
+    @staticmethod
+    def lap(phase, t):
+        return 0.0
+
+    def count(self, name, n=1):
+        pass
+
+    def start_episode(self):
+        pass
+
+    def end_episode(self, sim_seconds, **extra):
+        return None
+
+
+NULL_TIMERS = _NullTimers()
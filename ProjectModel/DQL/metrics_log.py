@@ -0,0 +1,113 @@
+'''Journal de métriques en ajout seul (append-only).
+- Épisodes : une ligne JSON compacte par épisode (.jsonl), écrite et vidée à la fin
+  de chaque épisode ; le coût ne dépend plus du nombre d'épisodes déjà écrits.
+- Pas (optionnel) : une ligne CSV par pas de décision (récompense, file, vitesse,
+  action, perte, epsilon), accumulée dans un tableau NumPy et écrite par blocs.
+Chaque entraînement a son journal, nommé d'après le modèle (episode_log_path) ; un
+entraînement qui ne reprend pas un point de reprise le recommence (append=False).
+read_episodes relit aussi les anciens fichiers (rewards_history.json,
+rewards_history_with_control.json : une liste JSON indentée, plus jamais écrits ; ceux
+du dépôt sont conservés comme résultats de référence pour load_results) ; follow_episodes lit
+les épisodes ajoutés depuis la dernière lecture (suivi d'un entraînement en cours).
+'''
+import json
+import os
+import types
+import numpy as np
+
+STEP_COLUMNS = ("episode", "step", "action", "reward", "queue", "speed", "loss", "epsilon")
+
+
+def episode_log_path(model_name):
+    """Journal des épisodes d'un entraînement (read_episodes garde un enregistrement par numéro
+    d'épisode : deux entraînements dans le même journal se remplaceraient)"""
+    return f"rewards_history_{model_name}.jsonl"
+
+
+def step_log_path(model_name):
+    """Journal par pas d'un entraînement"""
+    return f"rewards_history_{model_name}_steps.csv"
+
+
+class MetricsWriter:
+    def __init__(self, path="rewards_history.jsonl", step_path=None, chunk_size=4096, append=True):
+        self.path = path
+        self.step_path = step_path  # None : pas de journal par pas
+        self.append = append  # False : les journaux existants sont vidés (nouvel entraînement)
+        self._episodes = open(path, "a" if append else "w")
+        self._steps = None
+        self._buffer = np.empty((chunk_size, len(STEP_COLUMNS)))
+        self._buffered = 0
+
+    def log_episode(self, **record):
+        """Ajouter un épisode (champs libres : episode, reward, steps...)"""
+        self._episodes.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._episodes.flush()
+
+    def log_step(self, episode, step, action, reward, queue, speed, loss=np.nan, epsilon=np.nan):
+        """Ajouter un pas au tampon (écrit quand le tampon est plein ou à flush)"""
+        if self.step_path is None:
+            return
+        self._buffer[self._buffered] = (episode, step, action, reward, queue, speed, loss, epsilon)
+        self._buffered += 1
+        if self._buffered == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        """Écrire les pas en attente"""
+        if self._buffered == 0:
+            return
+        if self._steps is None:
+            new_file = (not self.append or not os.path.exists(self.step_path)
+                        or os.path.getsize(self.step_path) == 0)
+            self._steps = open(self.step_path, "a" if self.append else "w")
+            if new_file:
+                self._steps.write(",".join(STEP_COLUMNS) + "\n")
+        np.savetxt(self._steps, self._buffer[:self._buffered], delimiter=",", fmt="%.6g")
+        self._steps.flush()
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        self._episodes.close()
+        if self._steps is not None:
+            self._steps.close()
+            self._steps = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_episodes(path):
+    """Lire les épisodes d'un journal .jsonl ou d'un ancien fichier JSON (liste).
+    Renvoie des objets ayant les attributs episode, reward, steps (comme TrafficLightRL.EpisodeInfo) ;
+    si un épisode apparaît plusieurs fois (reprise d'entraînement), le dernier enregistrement est gardé."""
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = json.load(f)
+    by_episode = {record["episode"]: record for record in records}
+    return [types.SimpleNamespace(**by_episode[episode]) for episode in sorted(by_episode)]
+
+
+def follow_episodes(path, offset=0):
+    """Épisodes ajoutés au journal .jsonl depuis la position offset (octets), pour suivre un
+    entraînement en cours ; renvoie (épisodes, nouvelle position). Une ligne incomplète
+    (en cours d'écriture) est laissée pour l'appel suivant."""
+    if not os.path.exists(path):
+        return [], offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    records = [types.SimpleNamespace(**json.loads(line)) for line in data[:end].splitlines() if line.strip()]
+    return records, offset + end
+
+
+def read_steps(path):
+    """Lire le journal par pas en tableau structuré (une colonne par champ de STEP_COLUMNS)"""
+    return np.genfromtxt(path, delimiter=",", names=True, ndmin=1)
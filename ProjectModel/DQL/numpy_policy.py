@@ -0,0 +1,61 @@
+'''Passe avant du réseau de l'agent en NumPy, pour choisir les actions sans Keras.
+model.predict sur un seul état (1, 6) coûte plusieurs millisecondes de préparation
+Keras pour un réseau 6-64-64-3 de quelques milliers d'opérations ; ici les poids des
+couches Dense sont copiés dans des tableaux NumPy et le réseau est évalué directement
+(quelques microsecondes). La copie est refaite paresseusement au premier appel qui
+suit invalidate() (après chaque mise à jour des poids).
+'''
+import numpy as np
+
+ACTIVATIONS = {
+    "linear": None,
+    "relu": lambda x: np.maximum(x, 0.0, out=x),
+    "tanh": lambda x: np.tanh(x, out=x),
+    "sigmoid": lambda x: np.divide(1.0, 1.0 + np.exp(-x), out=x),
+}
+
+
+class NumpyPolicy:
+    def __init__(self, model):
+        self.model = model
+        self.layers = []  # (noyau, biais, activation) de chaque couche Dense
+        self.stale = True
+
+    def invalidate(self):
+        """Signaler que les poids du modèle Keras ont changé (copie refaite au prochain appel)"""
+        self.stale = True
+
+    def sync(self):
+        """Copier les poids des couches Dense du modèle Keras"""
+        layers = []
+        for layer in self.model.layers:
+            weights = layer.get_weights()
+            if not weights:
+                continue  # InputLayer, Dropout...
+            activation = getattr(layer.activation, "__name__", "linear")
+            if activation not in ACTIVATIONS or len(weights) != 2:
+                raise ValueError(f"Couche non prise en charge par NumpyPolicy : {layer.name} ({activation})")
+            kernel, bias = weights
+            layers.append((kernel.astype(np.float32), bias.astype(np.float32), ACTIVATIONS[activation]))
+        self.layers = layers
+        self.stale = False
+
+    def q_values(self, states):
+        """Q-valeurs d'un état (ACTION_DIM,) ou d'un lot d'états (N, ACTION_DIM)"""
+        if self.stale:
+            self.sync()
+        x = np.asarray(states, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            x = x @ kernel
+            x += bias
+            if activation is not None:
+                activation(x)
+        return x
+
+    def greedy_action(self, state):
+        """Action de plus grande Q-valeur pour un état"""
+        return int(np.argmax(self.q_values(state)))
+
+    def greedy_actions(self, states):
+        """Actions de plus grande Q-valeur pour un lot d'états"""
+        return np.argmax(self.q_values(states), axis=-1)
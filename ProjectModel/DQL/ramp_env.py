@@ -0,0 +1,214 @@
+'''Environnement de régulation d'accès (feu "n6" de la bretelle de projectnet),
+avec l'interface reset/step de Gymnasium :
+- reset(seed=None) -> (observation, info)
+- step(action) -> (observation, récompense, terminated, truncated, info)
+L'observation est celle de TrafficLightRL.get_state et la récompense celle de
+TrafficLightRL.calculate_reward. L'épisode est tronqué (truncated) quand le temps
+simulé dépasse episode_length : l'état suivant garde une valeur (pas de fin dans la
+cible de Bellman). Avec drain="terminate" (optionnel), l'épisode est aussi coupé dès
+que le réseau s'est vidé (getMinExpectedNumber nul : aucun véhicule en circulation
+ni à insérer), ce qui évite de simuler des centaines de pas sur un réseau vide. Cette
+coupure est elle aussi une troncature (info["drained"]) et non un état terminal : un
+réseau vide rapporte une récompense positive (vitesse limite des edges vides), la
+couper sans valeur pousserait l'agent à éviter de vider le réseau. Les récompenses
+cumulées d'un épisode coupé ne sont pas comparables à celles d'un épisode complet,
+d'où drain=None par défaut. Avec drain="fast_forward", la simulation est en plus
+avancée jusqu'à episode_length en un seul appel (horloge et sorties de SUMO
+identiques à un épisode complet). La construction ne lance pas SUMO (démarrage au
+premier reset), on peut donc créer beaucoup d'environnements à faible coût.
+warmup (secondes, ou liste de secondes) : au premier reset, la simulation avance
+une fois jusqu'à chacun de ces instants et y sauvegarde son état (saveState) ;
+chaque reset recharge ensuite l'un de ces états (tiré au hasard s'il y en a
+plusieurs, donc à différents niveaux de congestion) au lieu de rejouer le début
+de la simulation. Le rechargement passe par load --load-state et non par
+simulation.loadState, qui réinjecte les véhicules déjà arrivés du fichier de routes.
+Gymnasium est optionnel : sans lui, les espaces sont de simples descriptions
+ayant les mêmes attributs (shape, dtype, low, high, n, sample, contains).
+'''
+import os
+import shutil
+import tempfile
+import numpy as np
+import sim_backend
+from instrumentation import NULL_TIMERS
+from reward import traffic_reward
+from state_subscription import StateSubscription, SubscriptionError, DQL_FEATURES
+
+try:
+    from gymnasium import Env, spaces
+except ImportError:
+    Env, spaces = object, None
+
+PHASE_DURATIONS = {0: 82, 1: 3, 2: 5}  # Durée de chaque action en secondes (comme TrafficLightRL._get_phase_duration)
+TL_ID = "n6"
+
+
+class Box:
+    """Espace continu borné (même attributs que gymnasium.spaces.Box)"""
+    def __init__(self, low, high, shape, dtype=np.float32):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.low = np.full(shape, low, dtype=self.dtype)
+        self.high = np.full(shape, high, dtype=self.dtype)
+
+    def sample(self):
+        low, high = self.low, np.minimum(self.high, np.finfo(self.dtype).max / 2)
+        return np.random.uniform(low, high).astype(self.dtype)
+
+    def contains(self, x):
+        x = np.asarray(x)
+        return x.shape == self.shape and bool(np.all((x >= self.low) & (x <= self.high)))
+
+
+class Discrete:
+    """Espace discret {0, ..., n-1} (mêmes attributs que gymnasium.spaces.Discrete)"""
+    def __init__(self, n):
+        self.n = n
+        self.shape = ()
+        self.dtype = np.dtype(np.int64)
+
+    def sample(self):
+        return int(np.random.randint(self.n))
+
+    def contains(self, x):
+        return int(x) == x and 0 <= x < self.n
+
+
+def _box(low, high, shape):
+    return spaces.Box(low, high, shape, dtype=np.float32) if spaces else Box(low, high, shape)
+
+
+def _discrete(n):
+    return spaces.Discrete(n) if spaces else Discrete(n)
+
+
+class RampMeteringEnv(Env):
+    metadata = {"render_modes": []}
+
+    def __init__(self, sumo_config, backend="traci", control_traffic_lights=True, control_interval=None,
+                 episode_length=3600, label=None, sumo_binary="sumo", warmup=None, state_dir=None,
+                 drain=None, sumo_args=()):
+        self.sumo_config = sumo_config
+        self.sumo_args = list(sumo_args)  # Options SUMO supplémentaires (sorties tripinfo... : voir sumo_outputs)
+        self.sim = sim_backend.load_backend(backend)
+        self.control_traffic_lights = control_traffic_lights
+        # control_interval=None : chaque action dure PHASE_DURATIONS[action] secondes, sinon control_interval
+        self.control_interval = control_interval
+        self.episode_length = episode_length
+        if drain not in (None, "terminate", "fast_forward"):
+            raise ValueError(f"drain doit valoir None, 'terminate' ou 'fast_forward' (reçu {drain!r})")
+        self.drain = drain  # None : l'épisode continue sur le réseau vide jusqu'à episode_length
+        self.label = label  # Connexion TraCI étiquetée (plusieurs environnements dans un même processus)
+        self.sumo_binary = sumo_binary
+        if warmup is None:
+            warmup = ()
+        self.warmup = sorted({int(t) for t in np.atleast_1d(warmup) if int(t) > 0})
+        self.state_dir = state_dir  # Répertoire des états sauvegardés (temporaire si None)
+        self.start_states = []  # (instant, fichier) des états de départ, créés au premier reset
+        self._owns_state_dir = False
+        self.np_random = np.random.default_rng()
+
+        self.state_subscription = StateSubscription(DQL_FEATURES)
+        self.observation_space = _box(0.0, np.inf, (self.state_subscription.size,))
+        self.action_space = _discrete(len(PHASE_DURATIONS))
+        self.connection = None  # SUMO n'est lancé qu'au premier reset
+        self.timers = NULL_TIMERS  # Remplacé par un PhaseTimers pour mesurer apply_action / get_state
+        self.state = np.zeros(self.state_subscription.size, dtype=np.float32)
+        self.time = 0.0  # Temps simulé (s), pas d'une seconde
+
+    def _action_duration(self, action):
+        """Nombre de secondes simulées pour une action"""
+        if self.control_interval is not None:
+            return self.control_interval
+        return PHASE_DURATIONS.get(int(action), 5)
+
+    def _observe(self):
+        """État courant lu dans les abonnements (état vide en cas d'erreur, comme TrafficLightRL.get_state)"""
+        try:
+            return self.state_subscription.read(self.connection)
+        except (self.sim.TraCIException, SubscriptionError) as e:
+            print(f"Erreur lors de la récupération de l'état: {e}")
+            return np.zeros(self.state_subscription.size, dtype=np.float32)
+
+    def _save_start_states(self):
+        """Avancer la simulation jusqu'à chaque instant de warmup et y sauvegarder l'état"""
+        if self.state_dir is None:
+            self.state_dir = tempfile.mkdtemp(prefix="ramp_states_")
+            self._owns_state_dir = True
+        os.makedirs(self.state_dir, exist_ok=True)
+        for start_time in self.warmup:
+            while self.connection.simulation.getTime() < start_time:
+                self.connection.simulationStep()
+            path = os.path.join(self.state_dir, f"{self.label or 'state'}_{start_time}.xml")
+            self.connection.simulation.saveState(path)
+            self.start_states.append((start_time, path))
+
+    def reset(self, seed=None, options=None):
+        """Démarrer (premier appel) ou recharger la simulation ; renvoie (observation, info)"""
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+        args = ["-c", self.sumo_config] + (["--seed", str(seed)] if seed is not None else []) + self.sumo_args
+        started = self.connection is None
+        if started:
+            if self.label is None:
+                self.sim.start([self.sumo_binary] + args)
+                self.connection = self.sim
+            else:
+                self.sim.start([self.sumo_binary] + args, label=self.label)
+                self.connection = self.sim.getConnection(self.label)
+            if self.warmup and not self.start_states:
+                self._save_start_states()
+        if self.start_states:  # Recharger un état sauvegardé plutôt que rejouer le début
+            start_time, path = self.start_states[self.np_random.integers(len(self.start_states))]
+            self.connection.load(args + ["--begin", str(start_time), "--load-state", path])
+        elif not started:
+            self.connection.load(args)
+        self.state_subscription.subscribe(self.connection)  # Les abonnements sont perdus à chaque load
+        self.state = self._observe()
+        self.time = self.connection.simulation.getTime()
+        return self.state, {"time": self.time}
+
+    def step(self, action):
+        """Appliquer une action ; renvoie (observation, récompense, terminated, truncated, info)"""
+        sim = self.connection
+        timers = self.timers
+        t = timers.start()
+        try:
+            sim.trafficlight.setPhase(TL_ID, action)  # Phase choisie (phase par défaut sans contrôle)
+            duration = self._action_duration(action) if self.control_traffic_lights else 1
+            # Cible explicite : après un load --begin, simulationStep() sans argument compte depuis 0
+            # et ne fait pas avancer la simulation pendant les begin premiers appels
+            sim.simulationStep(float(self.time + duration))
+            timers.count("simulation_steps", duration)
+        except self.sim.TraCIException as e:
+            print(f"Erreur lors de l'application de l'action: {e}")
+        t = timers.lap("apply_action", t)
+
+        next_state = self._observe()
+        t = timers.lap("get_state", t)
+        reward = float(traffic_reward(self.state, next_state))
+        sim_time = sim.simulation.getTime()
+        t = timers.lap("reward", t)
+
+        drained = False
+        if self.drain is not None and sim.simulation.getMinExpectedNumber() == 0:  # Réseau vidé
+            drained = True
+            if self.drain == "fast_forward" and sim_time < self.episode_length:
+                sim.simulationStep(float(self.episode_length))  # Jusqu'à la fin de l'épisode en un seul appel
+                sim_time = sim.simulation.getTime()
+            timers.lap("drain", t)
+        # Limite de temps ou réseau vidé : troncatures, pas des états terminaux (la cible garde la valeur de next_state)
+        truncated = drained or sim_time > self.episode_length
+        self.state = next_state
+        self.time = sim_time
+        return next_state, reward, False, truncated, {"time": sim_time, "drained": drained}
+
+    def close(self):
+        """Fermer la connexion à SUMO"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self._owns_state_dir:  # Les états temporaires ne servent qu'à cette connexion
+            shutil.rmtree(self.state_dir, ignore_errors=True)
+            self.state_dir, self._owns_state_dir = None, False
+            self.start_states = []
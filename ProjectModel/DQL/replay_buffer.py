@@ -0,0 +1,256 @@
+'''Mémoire de replay circulaire basée sur des tableaux NumPy préalloués.
+Chaque composante d'une transition (état, action, récompense, état suivant, fin)
+est stockée dans son propre tableau contigu : l'insertion est en O(1) et
+l'échantillonnage d'un mini-lot se fait par indexation vectorisée, sans
+aucun objet Python par transition.
+Les tableaux peuvent être sauvegardés en .npy (save) et rechargés (load), en mémoire
+ou par projection (mmap_mode="c") ; detach recopie en mémoire les tableaux projetés.
+'''
+import json
+import os
+import numpy as np
+
+
+class ReplayBuffer:
+    ARRAYS = ("states", "actions", "rewards", "next_states", "dones")  # Tableaux sauvegardés en .npy
+
+    def __init__(self, capacity, state_dim, seed=None):
+        self.capacity = capacity  # Nombre maximal de transitions conservées
+        self.state_dim = state_dim  # Dimension d'un état
+
+        # Tableaux préalloués (un par composante de la transition)
+        self.states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+
+        self.position = 0  # Prochaine case à écrire
+        self.size = 0  # Nombre de transitions valides
+        self.rng = np.random.default_rng(seed)
+        self._batch = None  # Tampons de sortie réutilisés d'un mini-lot à l'autre
+
+    def __len__(self):
+        return self.size
+
+    def append(self, transition):
+        """Ajouter un tuple (state, action, reward, next_state, done), comme pour un deque"""
+        self.add(*transition)
+
+    def add(self, state, action, reward, next_state, done):
+        """Ajouter une transition en écrasant la plus ancienne si la mémoire est pleine"""
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return i
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Ajouter un lot de transitions (une par environnement) en une seule écriture"""
+        indices = (self.position + np.arange(len(actions))) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        self.position = int(indices[-1] + 1) % self.capacity
+        self.size = min(self.size + len(indices), self.capacity)
+        return indices
+
+    def sample_indices(self, batch_size):
+        """Tirer uniformément les indices d'un mini-lot, sans remise (comme random.sample) :
+        aucune transition en double dans un mini-lot, même quand la mémoire est presque vide"""
+        return self.rng.choice(self.size, size=batch_size, replace=False)
+
+    def gather(self, indices):
+        """Copier les transitions demandées dans les tampons de sortie du mini-lot"""
+        batch_size = len(indices)
+        if self._batch is None or len(self._batch[1]) != batch_size:
+            self._batch = (
+                np.empty((batch_size, self.state_dim), dtype=np.float32),
+                np.empty(batch_size, dtype=np.int32),
+                np.empty(batch_size, dtype=np.float32),
+                np.empty((batch_size, self.state_dim), dtype=np.float32),
+                np.empty(batch_size, dtype=np.float32),
+            )
+        states, actions, rewards, next_states, dones = self._batch
+        np.take(self.states, indices, axis=0, out=states)
+        np.take(self.actions, indices, out=actions)
+        np.take(self.rewards, indices, out=rewards)
+        np.take(self.next_states, indices, axis=0, out=next_states)
+        np.take(self.dones, indices, out=dones)
+        return self._batch
+
+    def sample(self, batch_size):
+        """Échantillonner un mini-lot (states, actions, rewards, next_states, dones).
+        Les tableaux renvoyés sont réutilisés au prochain appel."""
+        return self.gather(self.sample_indices(batch_size))
+
+    def clear(self):
+        """Vider la mémoire (les tableaux restent alloués)"""
+        self.position = 0
+        self.size = 0
+
+    def _metadata(self):
+        return {"capacity": self.capacity, "state_dim": self.state_dim, "position": self.position,
+                "size": self.size, "rng": self.rng.bit_generator.state}
+
+    def _restore_metadata(self, metadata):
+        self.position = metadata["position"]
+        self.size = metadata["size"]
+        self.rng.bit_generator.state = metadata["rng"]
+
+    def save(self, directory):
+        """Écrire chaque tableau dans directory/<nom>.npy et les compteurs dans metadata.json"""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "metadata.json"), "w") as f:
+            json.dump(self._metadata(), f)
+
+    def load(self, directory, mmap_mode=None):
+        """Recharger une mémoire sauvegardée par save (en mémoire par défaut). Avec mmap_mode="c"
+        les fichiers sont projetés en mémoire (lus à la demande) et les écritures restent privées
+        (copy-on-write), mais ils restent ouverts : sous Windows, le répertoire ne peut alors être
+        ni renommé ni supprimé avant detach."""
+        with open(os.path.join(directory, "metadata.json")) as f:
+            metadata = json.load(f)
+        if (metadata["capacity"], metadata["state_dim"]) != (self.capacity, self.state_dim):
+            raise ValueError(f"Mémoire sauvegardée de taille {metadata['capacity']}x{metadata['state_dim']}, "
+                             f"attendu {self.capacity}x{self.state_dim}")
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        self._restore_metadata(metadata)
+        self._batch = None
+
+    def detach(self):
+        """Recopier en mémoire les tableaux projetés par load(mmap_mode=...) et libérer leurs fichiers"""
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            if isinstance(array, np.memmap):
+                setattr(self, name, np.array(array))
+
+
+class SumTree:
+    '''Arbre de sommes stocké dans un tableau (le noeud 1 est la racine,
+    les feuilles commencent à leaf_offset). Les parcours se font niveau par
+    niveau pour tout un mini-lot à la fois : O(log n) opérations vectorisées.
+    '''
+    def __init__(self, capacity):
+        self.depth = max(1, int(np.ceil(np.log2(capacity))))  # Nombre de niveaux sous la racine
+        self.leaf_offset = 1 << self.depth  # Indice de la première feuille
+        self.nodes = np.zeros(2 * self.leaf_offset, dtype=np.float64)
+
+    def total(self):
+        """Somme de toutes les priorités"""
+        return self.nodes[1]
+
+    def set(self, index, priority):
+        """Modifier une seule feuille et remonter jusqu'à la racine"""
+        node = index + self.leaf_offset
+        self.nodes[node] = priority
+        node //= 2
+        while node >= 1:
+            self.nodes[node] = self.nodes[2 * node] + self.nodes[2 * node + 1]
+            node //= 2
+
+    def update(self, indices, priorities):
+        """Modifier un lot de feuilles puis recalculer leurs ancêtres niveau par niveau"""
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaf_offset
+        self.nodes[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.nodes[nodes] = self.nodes[2 * nodes] + self.nodes[2 * nodes + 1]
+
+    def priorities(self, indices):
+        """Priorités des feuilles demandées"""
+        return self.nodes[np.asarray(indices) + self.leaf_offset]
+
+    def find(self, values):
+        """Indices des feuilles dont l'intervalle cumulé contient chaque valeur"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.nodes[left]
+            # Aller à droite si la valeur dépasse la somme de gauche (et que la droite n'est pas vide)
+            go_right = (values >= left_sum) & (self.nodes[left + 1] > 0)
+            values = np.where(go_right, values - left_sum, values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.leaf_offset
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    '''Mémoire de replay priorisée (Schaul et al., 2016) : une transition est tirée
+    avec une probabilité proportionnelle à |erreur TD|^alpha, et les poids
+    d'importance compensent le biais introduit dans la perte.
+    '''
+    def __init__(self, capacity, state_dim, alpha=0.6, epsilon=1e-6, seed=None):
+        super().__init__(capacity, state_dim, seed=seed)
+        self.alpha = alpha  # 0 = tirage uniforme, 1 = priorisation complète
+        self.epsilon = epsilon  # Garantit une probabilité non nulle à chaque transition
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0  # Les nouvelles transitions sont tirées au moins une fois
+
+    def add(self, state, action, reward, next_state, done):
+        """Ajouter une transition avec la priorité maximale observée"""
+        i = super().add(state, action, reward, next_state, done)
+        self.tree.set(i, self.max_priority ** self.alpha)
+        return i
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Ajouter un lot de transitions avec la priorité maximale observée"""
+        indices = super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(indices, np.full(len(indices), self.max_priority ** self.alpha))
+        return indices
+
+    def sample_indices(self, batch_size):
+        """Tirage stratifié : une valeur uniforme dans chacun des batch_size segments"""
+        segment = self.tree.total() / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        indices = self.tree.find(values)
+        return np.minimum(indices, self.size - 1)  # Sécurité contre les erreurs d'arrondi
+
+    def sample_with_weights(self, batch_size, beta):
+        """Échantillonner un mini-lot avec ses indices et ses poids d'importance
+        (normalisés par le poids maximal du lot)"""
+        indices = self.sample_indices(batch_size)
+        probabilities = self.tree.priorities(indices) / self.tree.total()
+        weights = (self.size * probabilities) ** (-beta)
+        weights = (weights / weights.max()).astype(np.float32)
+        return self.gather(indices), indices, weights
+
+    def update_priorities(self, indices, td_errors):
+        """Mettre à jour les priorités à partir des erreurs TD du dernier entraînement"""
+        priorities = np.abs(td_errors) + self.epsilon
+        self.tree.update(indices, priorities ** self.alpha)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+    def clear(self):
+        super().clear()
+        self.tree.nodes[:] = 0.0
+        self.max_priority = 1.0
+
+    def _metadata(self):
+        return {**super()._metadata(), "alpha": self.alpha, "max_priority": self.max_priority}
+
+    def _restore_metadata(self, metadata):
+        super()._restore_metadata(metadata)
+        self.max_priority = metadata["max_priority"]
+
+    def save(self, directory):
+        super().save(directory)
+        np.save(os.path.join(directory, "tree.npy"), self.tree.nodes)
+
+    def load(self, directory, mmap_mode=None):
+        super().load(directory, mmap_mode=mmap_mode)
+        self.tree.nodes = np.load(os.path.join(directory, "tree.npy"), mmap_mode=mmap_mode)
+
+    def detach(self):
+        super().detach()
+        if isinstance(self.tree.nodes, np.memmap):
+            self.tree.nodes = np.array(self.tree.nodes)
@@ -0,0 +1,14 @@
+'''Récompense de l'agent, commune à SUMO et au simulateur NumPy.
+Les fonctions acceptent un état (6,) ou un lot d'états (N, 6) :
+[arrêtés "in", arrêtés "E0", vitesse "in", vitesse "E0", occupation "2to3", phase "n6"]
+'''
+
+
+def traffic_reward(state, next_state):
+    """Récompense d'une transition (un scalaire pour un état, un tableau (N,) pour un lot)"""
+    occupancy = next_state[..., 4]
+    queue_length = -(next_state[..., 0] + next_state[..., 1])  # Récompense basée sur la longueur des files d'attente
+    speed_factor = (next_state[..., 2] + next_state[..., 3]) * 0.5  # Facteur basé sur la vitesse moyenne
+    congestion_penalty = -occupancy * 3 * (occupancy > 0.7)  # Pénalité si l'occupation est trop élevée
+    phase_change = -5 * (state[..., 5] != next_state[..., 5])  # Pénalité si la phase du feu a changé
+    return queue_length + speed_factor + congestion_penalty + phase_change
@@ -0,0 +1,66 @@
+'''Choix du backend de simulation.
+Tous les backends exposent l'API du module traci (start, load, close,
+simulationStep, edge, trafficlight, simulation, vehicle, TraCIException) :
+- "traci"   : SUMO dans un processus séparé, piloté par socket (par défaut)
+- "libsumo" : SUMO chargé dans le processus Python, même API sans socket ni
+              sérialisation (beaucoup plus rapide, une seule simulation par processus)
+- "fake"    : simulation factice en mémoire (fake_traci), pour les tests sans SUMO
+- "replay"  : rejeu d'une trace enregistrée (traci_trace), sans SUMO
+Avec trace=<fichier>, les backends traci et libsumo enregistrent leurs appels
+dans ce fichier ; le backend replay les rejoue.
+Un objet ayant la même interface (par exemple un enregistreur ou un rejoueur)
+peut aussi être passé directement à la place du nom.
+'''
+import importlib
+
+BACKENDS = ("traci", "libsumo", "fake", "replay")
+
+
+def load_backend(backend="traci", trace=None):
+    """Renvoyer le module (ou l'objet) de simulation correspondant au backend
+    (enregistré dans trace, ou rejoué depuis trace pour le backend replay)"""
+    if not isinstance(backend, str):
+        return backend  # Objet déjà construit, utilisé tel quel
+    if backend == "replay":
+        if trace is None:
+            raise ValueError("Le backend replay demande un fichier de trace")
+        from traci_trace import TraciReplay
+        return TraciReplay(trace)
+    if trace is not None:
+        from traci_trace import TraciRecorder
+        return TraciRecorder(load_backend(backend), trace)
+    if backend in ("traci", "libsumo"):
+        return importlib.import_module(backend)
+    if backend == "fake":
+        from fake_traci import FakeTraci
+        return FakeTraci()
+    raise ValueError(f"Backend de simulation inconnu : {backend} (choix : {', '.join(BACKENDS)})")
+
+
+def backend_name(sim):
+    """Nom lisible du backend (pour les messages)"""
+    return getattr(sim, "__name__", type(sim).__name__)
+
+
+def supports_labels(sim):
+    """libsumo ne gère qu'une simulation par processus (pas de connexions étiquetées)"""
+    return backend_name(sim) != "libsumo"
+
+
+def load_constants():
+    """Identifiants des variables TraCI, sans dépendre de SUMO s'il n'est pas installé"""
+    try:
+        return importlib.import_module("traci.constants")
+    except ImportError:
+        from fake_traci import constants
+        return constants
+
+
+def add_backend_argument(parser):
+    """Ajouter les options --backend et --trace à un parseur argparse"""
+    parser.add_argument("--backend", choices=BACKENDS, default="traci",
+                        help="Backend de simulation (traci par socket, libsumo en processus, fake sans SUMO, "
+                             "replay pour rejouer --trace)")
+    parser.add_argument("--trace", default=None,
+                        help="Fichier de trace TraCI : enregistré avec traci/libsumo/fake, rejoué avec replay")
+    return parser
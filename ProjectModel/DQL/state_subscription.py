@@ -0,0 +1,69 @@
+'''Acquisition de l'état par abonnements TraCI (subscriptions).
+Au lieu d'un appel TraCI (un aller-retour socket) par variable et par pas,
+les variables sont demandées une fois pour toutes : SUMO renvoie leurs
+valeurs avec la réponse de chaque simulationStep, et la lecture de l'état
+ne fait plus aucun échange avec SUMO.
+Attention : SUMO supprime les abonnements à chaque traci.load, il faut
+donc appeler subscribe() après start() et après chaque load().
+'''
+import numpy as np
+from sim_backend import load_constants
+
+tc = load_constants()
+
+# Observation de l'agent DQL (même ordre que TrafficLightRL.get_state)
+DQL_FEATURES = [
+    ("edge", "in", tc.LAST_STEP_VEHICLE_HALTING_NUMBER),  # Véhicules arrêtés sur "in"
+    ("edge", "E0", tc.LAST_STEP_VEHICLE_HALTING_NUMBER),  # Véhicules arrêtés sur "E0"
+    ("edge", "in", tc.LAST_STEP_MEAN_SPEED),  # Vitesse moyenne sur "in"
+    ("edge", "E0", tc.LAST_STEP_MEAN_SPEED),  # Vitesse moyenne sur "E0"
+    ("edge", "2to3", tc.LAST_STEP_OCCUPANCY),  # Occupation de "2to3"
+    ("trafficlight", "n6", tc.TL_CURRENT_PHASE),  # Phase actuelle du feu
+]
+
+# Observation du modèle QL : [queue_main, queue_ramp, speed_main, speed_ramp]
+QL_FEATURES = [
+    ("edge", "in", tc.LAST_STEP_VEHICLE_HALTING_NUMBER),
+    ("edge", "E2", tc.LAST_STEP_VEHICLE_HALTING_NUMBER),
+    ("edge", "in", tc.LAST_STEP_MEAN_SPEED),
+    ("edge", "E2", tc.LAST_STEP_MEAN_SPEED),
+]
+
+
+class SubscriptionError(LookupError):
+    """Aucun résultat d'abonnement disponible (subscribe() non appelé depuis start/load)"""
+
+
+class StateSubscription:
+    def __init__(self, features=DQL_FEATURES):
+        self.features = list(features)
+        self.size = len(self.features)
+
+        # Regrouper les variables par objet SUMO : un seul abonnement par objet
+        self.objects = {}
+        for domain, object_id, variable in self.features:
+            variables = self.objects.setdefault((domain, object_id), [])
+            if variable not in variables:
+                variables.append(variable)
+        keys = list(self.objects)
+        self._layout = [(keys.index((domain, object_id)), variable)
+                        for domain, object_id, variable in self.features]
+
+    def subscribe(self, sim):
+        """S'abonner aux variables de l'observation (sim : backend de simulation ou connexion)"""
+        for (domain, object_id), variables in self.objects.items():
+            getattr(sim, domain).subscribe(object_id, variables)
+
+    def read(self, sim, out=None):
+        """Décoder les derniers résultats d'abonnement dans un tableau float32
+        (out si fourni, sinon un nouveau tableau). Aucun aller-retour avec SUMO."""
+        if out is None:
+            out = np.empty(self.size, dtype=np.float32)
+        results = [getattr(sim, domain).getSubscriptionResults(object_id)
+                   for domain, object_id in self.objects]
+        try:
+            for i, (group, variable) in enumerate(self._layout):
+                out[i] = results[group][variable]
+        except KeyError:
+            raise SubscriptionError("Aucun résultat d'abonnement : appeler subscribe() après start/load")
+        return out
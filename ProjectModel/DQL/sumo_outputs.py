@@ -0,0 +1,185 @@
+'''Sorties natives de SUMO (tripinfo, summary, edgeData / laneData) pour l'évaluation :
+SUMO calcule lui-même les indicateurs, sans relevé TraCI en Python.
+- SumoOutputs(directory).args(sumo_config) : options à ajouter à start/load ; les
+  fichiers sont écrits dans directory (compressés si compress=True, SUMO écrit en
+  gzip tout fichier en ".gz"), les données d'edges/voies agrégées par intervalles de
+  period secondes (fichier additionnel meandata généré dans directory).
+- read_tripinfo / read_summary / read_meandata : lecture en flux (iterparse) vers des
+  colonnes NumPy typées. Chaque élément est supprimé de l'arbre dès qu'il est lu : la
+  mémoire ne dépend pas de la taille du fichier, seulement des colonnes demandées
+  (les fichiers de plusieurs Go des longues simulations se lisent sans charger le document).
+Les fichiers ne sont complets qu'après close (ou load) de la simulation.
+'''
+import gzip
+import json
+import math
+import os
+import xml.etree.ElementTree as ET
+from array import array
+import numpy as np
+
+# Attribut -> type de colonne ("d" réel, "q" entier, "U" texte)
+TRIPINFO_COLUMNS = {
+    "id": "U", "depart": "d", "arrival": "d", "duration": "d", "routeLength": "d",
+    "waitingTime": "d", "waitingCount": "q", "timeLoss": "d", "departDelay": "d", "vType": "U",
+}
+SUMMARY_COLUMNS = {
+    "time": "d", "loaded": "q", "inserted": "q", "running": "q", "waiting": "q", "ended": "q",
+    "arrived": "q", "halting": "q", "teleports": "q", "meanWaitingTime": "d", "meanTravelTime": "d",
+    "meanSpeed": "d",
+}
+# begin et end viennent de l'intervalle parent ; les mesures absentes (edge vide) valent NaN
+MEANDATA_COLUMNS = {
+    "begin": "d", "end": "d", "id": "U", "sampledSeconds": "d", "traveltime": "d", "density": "d",
+    "occupancy": "d", "waitingTime": "d", "timeLoss": "d", "speed": "d", "departed": "d", "arrived": "d",
+    "entered": "d", "left": "d", "flow": "d",
+}
+MISSING = {"d": math.nan, "q": -1, "U": ""}
+
+
+def _open(path):
+    """Fichier XML, décompressé à la volée s'il est en gzip (quel que soit son nom)"""
+    f = open(path, "rb")
+    if f.read(2) == b"\x1f\x8b":
+        f.close()
+        return gzip.open(path, "rb")
+    f.seek(0)
+    return f
+
+
+def iter_elements(path, tag):
+    """Attributs de chaque élément tag, complétés par ceux de ses ancêtres (intervalle...).
+    Chaque élément terminé est retiré de son parent : l'arbre en mémoire se limite au
+    chemin de la racine à l'élément courant."""
+    with _open(path) as f:
+        stack = [{}]  # Attributs cumulés des éléments ouverts
+        parents = []
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                stack.append({**stack[-1], **elem.attrib})
+                parents.append(elem)
+                continue
+            attrib = stack.pop()
+            parents.pop()
+            if elem.tag == tag:
+                yield attrib
+            if parents:
+                del parents[-1][:]  # Libérer l'élément terminé (et ses enfants)
+
+
+def read_columns(path, tag, columns):
+    """Colonnes NumPy {attribut: tableau} des éléments tag ; columns : {attribut: "d" | "q" | "U"}"""
+    values = {name: [] if code == "U" else array(code) for name, code in columns.items()}
+    fields = [(name, code, values[name].append, float if code == "d" else int if code == "q" else str)
+              for name, code in columns.items()]
+    for attrib in iter_elements(path, tag):
+        for name, code, append, convert in fields:
+            value = attrib.get(name)
+            append(MISSING[code] if value is None else convert(value))
+    return {name: np.array(column) if columns[name] == "U"
+            else np.frombuffer(column, dtype=np.float64 if columns[name] == "d" else np.int64)
+            for name, column in values.items()}
+
+
+def read_tripinfo(path, columns=TRIPINFO_COLUMNS):
+    """Un véhicule par ligne : temps de parcours (duration), retard (timeLoss), attente (waitingTime)...
+    Avec --tripinfo-output.write-unfinished, les véhicules non arrivés ont arrival = -1."""
+    return read_columns(path, "tripinfo", columns)
+
+
+def read_summary(path, columns=SUMMARY_COLUMNS):
+    """Un pas de simulation par ligne (véhicules insérés, en circulation, en attente, arrivés...)"""
+    return read_columns(path, "step", columns)
+
+
+def read_meandata(path, element="edge", columns=MEANDATA_COLUMNS):
+    """Un (intervalle, edge) par ligne (element="lane" pour un fichier laneData)"""
+    return read_columns(path, element, columns)
+
+
+class SumoOutputs:
+    """Fichiers de sortie d'une simulation et leur lecture.
+    period : durée (s) des intervalles edgeData/laneData (None : un seul intervalle) ;
+    lanes : écrire aussi les agrégats par voie ; compress : fichiers .xml.gz."""
+
+    def __init__(self, directory, period=None, lanes=False, compress=False):
+        self.directory = directory
+        self.period = period
+        self.lanes = lanes
+        suffix = ".xml.gz" if compress else ".xml"
+        self.tripinfo_file = os.path.join(directory, "tripinfo" + suffix)
+        self.summary_file = os.path.join(directory, "summary" + suffix)
+        self.edgedata_file = os.path.join(directory, "edgedata" + suffix)
+        self.lanedata_file = os.path.join(directory, "lanedata" + suffix) if lanes else None
+        self.additional_file = os.path.join(directory, "meandata.add.xml")
+
+    def _write_additional(self):
+        """Fichier additionnel déclarant les sorties edgeData / laneData"""
+        root = ET.Element("additional")
+        outputs = [("edgeData", "edges", self.edgedata_file)]
+        if self.lanes:
+            outputs.append(("laneData", "lanes", self.lanedata_file))
+        for element, name, path in outputs:
+            attrib = {"id": name, "file": os.path.abspath(path)}
+            if self.period is not None:
+                attrib["period"] = str(self.period)
+            ET.SubElement(root, element, attrib)
+        ET.ElementTree(root).write(self.additional_file, encoding="UTF-8", xml_declaration=True)
+
+    def args(self, sumo_config=None):
+        """Options SUMO activant les sorties (à ajouter à la ligne de commande de start et de load).
+        sumo_config : ses fichiers additionnels sont conservés (--additional-files les remplace sinon)."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._write_additional()
+        additional = [os.path.abspath(self.additional_file)]
+        if sumo_config is not None:
+            element = ET.parse(sumo_config).getroot().find("input/additional-files")
+            if element is not None:
+                base = os.path.dirname(os.path.abspath(sumo_config))
+                additional = [os.path.join(base, name.strip()) for name in element.get("value").split(",")] + additional
+        return ["--tripinfo-output", self.tripinfo_file, "--tripinfo-output.write-unfinished",
+                "--summary-output", self.summary_file, "--additional-files", ",".join(additional)]
+
+    def trips(self, columns=TRIPINFO_COLUMNS):
+        return read_tripinfo(self.tripinfo_file, columns)
+
+    def summary(self, columns=SUMMARY_COLUMNS):
+        return read_summary(self.summary_file, columns)
+
+    def edges(self, columns=MEANDATA_COLUMNS):
+        return read_meandata(self.edgedata_file, "edge", columns)
+
+    def lane_data(self, columns=MEANDATA_COLUMNS):
+        return read_meandata(self.lanedata_file, "lane", columns)
+
+    def report(self):
+        """Indicateurs agrégés de la simulation (véhicules arrivés seulement pour les moyennes par trajet)"""
+        trips = self.trips({"arrival": "d", "duration": "d", "timeLoss": "d", "waitingTime": "d",
+                            "departDelay": "d"})
+        summary = self.summary({"time": "d", "running": "q", "halting": "q", "meanSpeed": "d"})
+        arrived = trips["arrival"] >= 0
+        finished = {name: column[arrived] for name, column in trips.items()}
+
+        def mean(column):
+            return float(column.mean()) if len(column) else 0.0
+
+        return {
+            "vehicles": int(len(arrived)),
+            "arrived": int(arrived.sum()),
+            "unfinished": int(len(arrived) - arrived.sum()),
+            "mean_travel_time_s": mean(finished["duration"]),
+            "mean_delay_s": mean(finished["timeLoss"]),
+            "mean_waiting_time_s": mean(finished["waitingTime"]),
+            "mean_depart_delay_s": mean(finished["departDelay"]),
+            "total_delay_s": float(trips["timeLoss"].sum()),
+            "end_time": float(summary["time"][-1]) if len(summary["time"]) else 0.0,
+            "max_running": int(summary["running"].max()) if len(summary["running"]) else 0,
+            "max_halting": int(summary["halting"].max()) if len(summary["halting"]) else 0,
+        }
+
+    def save_report(self, path=None):
+        """Écrire report() en JSON (par défaut report.json dans directory) ; le renvoie"""
+        report = self.report()
+        with open(path or os.path.join(self.directory, "report.json"), "w") as f:
+            json.dump(report, f, indent=4)
+        return report
@@ -0,0 +1,304 @@
+'''Simulateur macroscopique (Cell Transmission Model, Daganzo 1994) de la bretelle
+d'accès de projectnet, écrit en NumPy, pour pré-entraîner l'agent sans SUMO.
+- Le réseau (longueur, nombre de voies et vitesse des edges, programme du feu)
+  est lu dans projectnet.net.xml, la demande (départs par route, multipliés par
+  le <scale> du sumocfg) dans projectnet.rou.xml.
+- Chaque edge est découpé en cellules ; à chaque seconde le flux entre deux
+  cellules vaut min(offre amont, capacité d'accueil aval). La bretelle (E0 puis
+  E2) rejoint l'autoroute au premier edge commun des deux routes ; au feu "n6"
+  (fin de E0) le flux n'est autorisé qu'en phase verte.
+- L'observation est la même que TrafficLightRL.get_state :
+  [arrêtés "in", arrêtés "E0", vitesse "in", vitesse "E0", occupation "2to3", phase "n6"]
+Toutes les grandeurs ont une première dimension "lot" : plusieurs scénarios
+indépendants sont simulés en même temps avec les mêmes opérations NumPy.
+'''
+import os
+import time
+import xml.etree.ElementTree as ET
+import numpy as np
+
+SATURATION_FLOW = 0.5  # Capacité d'une voie (véhicules/s, soit 1800 véh/h)
+MIN_GAP = 2.5  # Écart minimal entre véhicules à l'arrêt (m, valeur par défaut de SUMO)
+HALTING_SPEED = 0.1  # En dessous de cette vitesse un véhicule est compté comme arrêté (comme SUMO)
+
+
+def parse_network(net_file):
+    """Lire les edges (hors edges internes) et les programmes des feux du fichier .net.xml"""
+    root = ET.parse(net_file).getroot()
+    edges = {}
+    for edge in root.iter("edge"):
+        if edge.get("function") == "internal":
+            continue
+        lanes = edge.findall("lane")
+        edges[edge.get("id")] = {
+            "from": edge.get("from"),
+            "to": edge.get("to"),
+            "lanes": len(lanes),
+            "speed": float(lanes[0].get("speed")),
+            "length": float(lanes[0].get("length")),
+        }
+    traffic_lights = {
+        tl.get("id"): [(int(float(phase.get("duration"))), phase.get("state")) for phase in tl.iter("phase")]
+        for tl in root.iter("tlLogic")
+    }
+    return edges, traffic_lights
+
+
+def parse_demand(route_file):
+    """Lire les routes et les départs de véhicules du fichier .rou.xml.
+    Renvoie {route: liste d'edges}, {route: temps de départ} et la longueur moyenne des véhicules."""
+    root = ET.parse(route_file).getroot()
+    lengths = {vtype.get("id"): float(vtype.get("length", 5.0)) for vtype in root.iter("vType")}
+    routes = {route.get("id"): route.get("edges").split() for route in root.iter("route")}
+    departs = {route_id: [] for route_id in routes}
+    vehicle_lengths = []
+    for vehicle in root.iter("vehicle"):
+        departs[vehicle.get("route")].append(float(vehicle.get("depart")))
+        vehicle_lengths.append(lengths.get(vehicle.get("type"), 5.0))
+    departs = {route_id: np.array(times) for route_id, times in departs.items()}
+    mean_length = float(np.mean(vehicle_lengths)) if vehicle_lengths else 5.0
+    return routes, departs, mean_length
+
+
+def _mid(a, b, c):
+    """Valeur médiane élément par élément de trois tableaux"""
+    return np.maximum(np.minimum(a, b), np.minimum(np.maximum(a, b), c))
+
+
+def read_sumocfg(sumo_config):
+    """Chemins du réseau et des routes, et facteur d'échelle de la demande, d'un fichier .sumocfg"""
+    root = ET.parse(sumo_config).getroot()
+    base = os.path.dirname(os.path.abspath(sumo_config))
+    net_file = os.path.join(base, root.find("input/net-file").get("value"))
+    route_file = os.path.join(base, root.find("input/route-files").get("value").split(",")[0])
+    scale = root.find("processing/scale")
+    return net_file, route_file, float(scale.get("value")) if scale is not None else 1.0
+
+
+class RampSurrogate:
+    def __init__(self, net_file, route_file, scale=1.0, batch_size=1, demand_scale=1.0,
+                 tl_id="n6", dt=1.0, seed=None):
+        self.batch_size = batch_size
+        self.dt = dt
+        self.tl_id = tl_id
+        edges, traffic_lights = parse_network(net_file)
+        routes, departs, self.vehicle_length = parse_demand(route_file)
+
+        # Programme du feu : durées et facteur de passage (1 en vert, 0 sinon) de chaque phase
+        program = traffic_lights[tl_id]
+        self.phase_durations = np.array([duration for duration, _ in program], dtype=np.int64)
+        self.phase_green = np.array([1.0 if state[0] in "Gg" else 0.0 for _, state in program])
+        self.num_phases = len(program)
+
+        # Route de la bretelle = celle qui traverse le feu ; l'autre est l'autoroute
+        signal_edge = next(edge_id for edge_id, edge in edges.items() if edge["to"] == tl_id)
+        ramp_route = next(route_id for route_id, route in routes.items() if signal_edge in route)
+        main_route = next(route_id for route_id in routes if route_id != ramp_route)
+        main_edges, ramp_edges = routes[main_route], routes[ramp_route]
+        merge_edge = next(edge_id for edge_id in main_edges if edge_id in ramp_edges)
+        main_upstream = main_edges[:main_edges.index(merge_edge)]
+        ramp_upstream = ramp_edges[:ramp_edges.index(merge_edge)]
+        downstream = main_edges[main_edges.index(merge_edge):]
+
+        # Découpage en cellules : longueur >= vitesse libre * dt (condition CFL)
+        self.edge_cells = {}
+        lengths, lanes, speeds = [], [], []
+        for edge_id in main_upstream + ramp_upstream + downstream:
+            edge = edges[edge_id]
+            count = max(1, int(edge["length"] // (edge["speed"] * dt)))
+            start = len(lengths)
+            self.edge_cells[edge_id] = np.arange(start, start + count)
+            lengths += [edge["length"] / count] * count
+            lanes += [edge["lanes"]] * count
+            speeds += [edge["speed"]] * count
+        self.num_cells = len(lengths)
+        self.cell_length = np.array(lengths)
+        self.cell_lanes = np.array(lanes, dtype=np.float64)
+        self.free_speed = np.array(speeds)
+        self.edge_speed = {edge_id: edges[edge_id]["speed"] for edge_id in self.edge_cells}
+        self.edge_lane_length = {edge_id: edges[edge_id]["length"] * edges[edge_id]["lanes"]
+                                 for edge_id in self.edge_cells}
+
+        # Diagramme fondamental triangulaire de chaque cellule (en véhicules par cellule et par pas)
+        self.capacity = self.cell_lanes * SATURATION_FLOW * dt
+        self.jam = self.cell_lanes * self.cell_length / (self.vehicle_length + MIN_GAP)
+        critical = self.capacity / (self.free_speed * dt / self.cell_length)
+        self.wave_ratio = self.capacity / np.maximum(self.jam - critical, 1e-6)  # w * dt / L
+
+        # Liens simples (une cellule amont, une cellule aval) et convergent de la bretelle
+        main_cells = np.concatenate([self.edge_cells[e] for e in main_upstream])
+        ramp_cells = np.concatenate([self.edge_cells[e] for e in ramp_upstream])
+        down_cells = np.concatenate([self.edge_cells[e] for e in downstream])
+        self.link_up = np.concatenate([main_cells[:-1], ramp_cells[:-1], down_cells[:-1]])
+        self.link_down = np.concatenate([main_cells[1:], ramp_cells[1:], down_cells[1:]])
+        self.main_last, self.ramp_last = main_cells[-1], ramp_cells[-1]
+        self.merge_cell = down_cells[0]
+        self.exit_cell = down_cells[-1]
+        self.main_entry, self.ramp_entry = main_cells[0], ramp_cells[0]
+        self.signal_cell = self.edge_cells[signal_edge][-1]
+        main_lanes = edges[main_upstream[-1]]["lanes"]
+        self.main_priority = main_lanes / (main_lanes + edges[ramp_upstream[-1]]["lanes"])
+
+        # Demande : véhicules entrant à chaque pas sur chaque route (multipliés par scale)
+        horizon = int(max(max(times, default=0) for times in departs.values()) // dt) + 1
+        self.main_demand = np.bincount((departs[main_route] // dt).astype(int), minlength=horizon) * scale
+        self.ramp_demand = np.bincount((departs[ramp_route] // dt).astype(int), minlength=horizon) * scale
+        self.demand_scale = np.broadcast_to(np.asarray(demand_scale, dtype=np.float64), (batch_size,)).copy()
+        # Sans graine la demande est la moyenne exacte du fichier de routes ; avec une graine
+        # les arrivées de chaque scénario suivent une loi de Poisson de même moyenne
+        self.rng = None if seed is None else np.random.default_rng(seed)
+
+        # Indices des observations
+        self.observed = {edge_id: self.edge_cells[edge_id] for edge_id in ("in", "E0", "2to3")
+                         if edge_id in self.edge_cells}
+        self.reset()
+
+    @classmethod
+    def from_sumocfg(cls, sumo_config, **kwargs):
+        """Construire le simulateur à partir d'un fichier .sumocfg (réseau, routes, <scale>)"""
+        net_file, route_file, scale = read_sumocfg(sumo_config)
+        return cls(net_file, route_file, scale=scale, **kwargs)
+
+    def reset(self, mask=None):
+        """Réseau vide à t=0, feu en phase 0 (tout le lot, ou seulement les scénarios de mask)"""
+        if mask is not None:
+            self.n[mask] = 0.0
+            self.speed[mask] = self.free_speed
+            self.origin_queue[mask] = 0.0
+            self.time[mask] = 0
+            self.phase[mask] = 0
+            self.phase_remaining[mask] = self.phase_durations[0]
+            return self.get_state()
+        shape = (self.batch_size, self.num_cells)
+        self.n = np.zeros(shape)  # Véhicules par cellule
+        self.speed = np.broadcast_to(self.free_speed, shape).copy()  # Vitesse moyenne par cellule au dernier pas
+        self.origin_queue = np.zeros((self.batch_size, 2))  # Véhicules en attente d'insertion (autoroute, bretelle)
+        self.time = np.zeros(self.batch_size, dtype=np.int64)  # Temps simulé de chaque scénario (s)
+        self.phase = np.zeros(self.batch_size, dtype=np.int64)
+        self.phase_remaining = np.full(self.batch_size, self.phase_durations[0])
+        return self.get_state()
+
+    def set_phase(self, phase, mask=None):
+        """Forcer la phase du feu (comme traci.trafficlight.setPhase) pour tout le lot ou les scénarios de mask"""
+        phase = np.broadcast_to(np.asarray(phase, dtype=np.int64), (self.batch_size,))
+        mask = np.ones(self.batch_size, dtype=bool) if mask is None else mask
+        self.phase = np.where(mask, phase, self.phase)
+        self.phase_remaining = np.where(mask, self.phase_durations[phase], self.phase_remaining)
+
+    def simulation_step(self, mask=None):
+        """Avancer d'un pas de temps (tout le lot, ou seulement les scénarios de mask)"""
+        n = self.n
+        speed_ratio = self.free_speed * self.dt / self.cell_length
+        sending = np.minimum(speed_ratio * n, self.capacity)
+        receiving = np.minimum(self.capacity, self.wave_ratio * (self.jam - n))
+        sending[:, self.signal_cell] *= self.phase_green[self.phase]  # Feu : rien ne passe hors du vert
+
+        inflow = np.zeros_like(n)
+        outflow = np.zeros_like(n)
+        flow = np.minimum(sending[:, self.link_up], receiving[:, self.link_down])
+        outflow[:, self.link_up] = flow
+        inflow[:, self.link_down] = flow
+
+        # Convergent : partage de la capacité d'accueil selon le nombre de voies
+        s_main, s_ramp = sending[:, self.main_last], sending[:, self.ramp_last]
+        r_merge = receiving[:, self.merge_cell]
+        p = self.main_priority
+        congested = s_main + s_ramp > r_merge
+        y_main = np.where(congested, _mid(s_main, r_merge - s_ramp, p * r_merge), s_main)
+        y_ramp = np.where(congested, _mid(s_ramp, r_merge - s_main, (1 - p) * r_merge), s_ramp)
+        y_main, y_ramp = np.maximum(y_main, 0.0), np.maximum(y_ramp, 0.0)
+        outflow[:, self.main_last] = y_main
+        outflow[:, self.ramp_last] = y_ramp
+        inflow[:, self.merge_cell] = y_main + y_ramp
+
+        outflow[:, self.exit_cell] = sending[:, self.exit_cell]  # Sortie libre du réseau
+
+        # Origines : la demande attend (hors réseau) si la première cellule est pleine
+        arriving = self.time < len(self.main_demand)
+        if mask is not None:
+            arriving &= mask
+        t = np.minimum(self.time, len(self.main_demand) - 1)
+        demand = np.stack([self.main_demand[t], self.ramp_demand[t]], axis=1) * self.demand_scale[:, None]
+        if self.rng is not None:
+            demand = self.rng.poisson(demand)
+        self.origin_queue += np.where(arriving[:, None], demand, 0.0)
+        entry = np.minimum(self.origin_queue, receiving[:, [self.main_entry, self.ramp_entry]])
+        inflow[:, self.main_entry] += entry[:, 0]
+        inflow[:, self.ramp_entry] += entry[:, 1]
+
+        # Vitesse moyenne : distance parcourue pendant le pas / véhicules présents au début du pas
+        speed = np.where(n > 1e-6, outflow * self.cell_length / (np.maximum(n, 1e-6) * self.dt), self.free_speed)
+        speed = np.minimum(speed, self.free_speed)
+
+        if mask is None:
+            self.n = n + inflow - outflow
+            self.speed = speed
+            self.origin_queue -= entry
+            advance = 1
+        else:  # Les scénarios hors du masque restent figés
+            m = mask[:, None]
+            self.n = np.where(m, n + inflow - outflow, n)
+            self.speed = np.where(m, speed, self.speed)
+            self.origin_queue -= np.where(m, entry, 0.0)
+            advance = mask.astype(np.int64)
+
+        # Programme du feu : passage automatique à la phase suivante
+        self.phase_remaining = self.phase_remaining - advance
+        expired = self.phase_remaining <= 0
+        if expired.any():
+            next_phase = (self.phase + 1) % self.num_phases
+            self.phase = np.where(expired, next_phase, self.phase)
+            self.phase_remaining = np.where(expired, self.phase_durations[self.phase], self.phase_remaining)
+        self.time += advance
+
+    def _edge_halting(self, cells):
+        """Véhicules arrêtés : en régime congestionné on suppose que les véhicules sont soit
+        arrêtés soit à vitesse libre, la part arrêtée vaut donc 1 - v / v_libre"""
+        free = self.free_speed[cells]
+        stopped_share = 1.0 - self.speed[:, cells] / free
+        stopped_share[stopped_share > 1.0 - HALTING_SPEED / free] = 1.0
+        return (self.n[:, cells] * stopped_share).sum(axis=1)
+
+    def _edge_mean_speed(self, edge_id, cells):
+        """Vitesse moyenne des véhicules de l'edge (vitesse maximale si l'edge est vide, comme SUMO)"""
+        vehicles = self.n[:, cells].sum(axis=1)
+        moving = (self.n[:, cells] * self.speed[:, cells]).sum(axis=1)
+        free = self.edge_speed[edge_id]
+        return np.where(vehicles > 1e-3, moving / np.maximum(vehicles, 1e-9), free)
+
+    def get_state(self):
+        """Observation (lot, 6) identique à TrafficLightRL.get_state"""
+        state = np.empty((self.batch_size, 6), dtype=np.float32)
+        state[:, 0] = np.round(self._edge_halting(self.observed["in"]))
+        state[:, 1] = np.round(self._edge_halting(self.observed["E0"]))
+        state[:, 2] = self._edge_mean_speed("in", self.observed["in"])
+        state[:, 3] = self._edge_mean_speed("E0", self.observed["E0"])
+        occupied = self.n[:, self.observed["2to3"]].sum(axis=1) * self.vehicle_length
+        state[:, 4] = np.minimum(occupied / self.edge_lane_length["2to3"], 1.0)  # Fraction, comme SUMO
+        state[:, 5] = self.phase
+        return state
+
+    def apply_action(self, action, duration):
+        """Équivalent de TrafficLightRL._apply_action : fixer la phase puis avancer de duration secondes"""
+        self.set_phase(action)
+        for _ in range(duration):
+            self.simulation_step()
+        return self.get_state()
+
+
+def main():
+    """Mesurer la vitesse du simulateur (secondes simulées par milliseconde de calcul)"""
+    sumo_config = "../../projectnet.sumocfg"
+    for batch_size in (1, 1024):
+        surrogate = RampSurrogate.from_sumocfg(sumo_config, batch_size=batch_size)
+        start = time.perf_counter()
+        for _ in range(3600):
+            surrogate.simulation_step()
+        state = surrogate.get_state()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Lot de {batch_size} : {3600 * batch_size / elapsed_ms:.0f} s simulées/ms, "
+              f"état final du scénario 0 : {np.round(state[0], 2)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+'''Environnement vectorisé sur le simulateur NumPy (surrogate.RampSurrogate) :
+des milliers de scénarios indépendants de la bretelle avancés ensemble par des
+opérations sur tableaux, sans SUMO. Même interface que SumoVecEnv (reset, step,
+observations, close) et même récompense que TrafficLightRL.calculate_reward,
+donc TrafficLightRL.choose_actions et ReplayBuffer.add_batch s'y branchent
+directement.
+Chaque scénario a son propre facteur de demande et ses propres arrivées
+aléatoires (loi de Poisson, tirées d'une graine commune au lot).
+'''
+import argparse
+import time
+import numpy as np
+from ramp_env import PHASE_DURATIONS
+from reward import traffic_reward
+from surrogate import RampSurrogate
+
+
+class SurrogateVecEnv:
+    STATE_DIM = 6
+    ACTION_DIM = 3
+
+    def __init__(self, sumo_config, num_envs, demand_scale=None, demand_range=(0.5, 1.5), seed=0,
+                 control_interval=None, simulation_time=3600, stochastic=True):
+        self.num_envs = num_envs
+        self.simulation_time = simulation_time  # Un épisode se termine quand time > simulation_time (comme train)
+        # control_interval=None : chaque action dure PHASE_DURATIONS[action] secondes, sinon control_interval
+        self.control_interval = control_interval
+        self.durations = np.array([PHASE_DURATIONS[action] if control_interval is None else control_interval
+                                   for action in range(self.ACTION_DIM)], dtype=np.int64)
+
+        rng = np.random.default_rng(seed)
+        if demand_scale is None:  # Un facteur de demande tiré au hasard par scénario
+            demand_scale = rng.uniform(*demand_range, size=num_envs)
+        self.demand_scale = np.broadcast_to(np.asarray(demand_scale, dtype=np.float64), (num_envs,)).copy()
+        self.surrogate = RampSurrogate.from_sumocfg(
+            sumo_config, batch_size=num_envs, demand_scale=self.demand_scale,
+            seed=int(rng.integers(2 ** 31)) if stochastic else None)
+
+        self.episode_counts = np.zeros(num_envs, dtype=int)  # Épisodes commencés par scénario
+        self.observations = np.zeros((num_envs, self.STATE_DIM), dtype=np.float32)
+
+    def reset(self):
+        """Réinitialiser tous les scénarios et renvoyer les états initiaux (N, STATE_DIM)"""
+        self.episode_counts += 1
+        self.observations = self.surrogate.reset()
+        return self.observations
+
+    def step(self, actions):
+        """Appliquer une action par scénario puis avancer chacun de la durée de son action.
+        Renvoie (next_states, rewards, terminated, truncated) ; self.observations contient ensuite
+        les états à partir desquels choisir les prochaines actions. Les épisodes ne
+        finissent que par la limite de temps (truncated, terminated toujours faux)."""
+        actions = np.asarray(actions, dtype=np.int64)
+        self.surrogate.set_phase(actions)
+        remaining = self.durations[actions]
+        for _ in range(int(remaining.max())):
+            active = remaining > 0
+            self.surrogate.simulation_step(None if active.all() else active)  # Les scénarios finis attendent
+            remaining -= 1
+
+        next_states = self.surrogate.get_state()
+        rewards = traffic_reward(self.observations, next_states).astype(np.float32)
+        truncated = self.surrogate.time > self.simulation_time
+        if truncated.any():  # Réinitialisation automatique des scénarios terminés
+            self.episode_counts[truncated] += 1
+            self.observations = self.surrogate.reset(truncated)
+        else:
+            self.observations = next_states
+        return next_states, rewards, np.zeros_like(truncated), truncated
+
+    def close(self):
+        """Rien à libérer (pour l'interface commune avec SumoVecEnv)"""
+
+
+def main():
+    """Mesurer le nombre de transitions collectées par minute avec des actions aléatoires"""
+    parser = argparse.ArgumentParser(description="Débit de l'environnement vectorisé NumPy")
+    parser.add_argument("--config", default="../../projectnet.sumocfg", help="Fichier de configuration SUMO")
+    parser.add_argument("--envs", type=int, default=4096, help="Nombre de scénarios simulés ensemble")
+    parser.add_argument("--steps", type=int, default=20, help="Nombre de pas (décisions) par scénario")
+    parser.add_argument("--control-interval", type=int, default=None,
+                        help="Durée fixe d'une action en secondes (par défaut : durée de la phase choisie)")
+    args = parser.parse_args()
+
+    env = SurrogateVecEnv(args.config, args.envs, control_interval=args.control_interval)
+    rng = np.random.default_rng(0)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        env.step(rng.integers(env.ACTION_DIM, size=args.envs))
+    elapsed = time.perf_counter() - start
+    transitions = args.steps * args.envs
+    print(f"{transitions} transitions en {elapsed:.2f} s : {transitions / elapsed * 60:,.0f} transitions/min")
+
+
+if __name__ == "__main__":
+    main()
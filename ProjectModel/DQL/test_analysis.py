@@ -98,110 +98,188 @@
 
 # if __name__ == "__main__":
 #     main()
-import pickle
+import argparse
 import numpy as np
 import matplotlib.pyplot as plt
-from collections import defaultdict
+from trajectory import load_trajectory
 
-def analyze_test_results(file_path="DQL_TEST_VISUALISATION.pkl"):
-    # Charger les données de test
-    with open(file_path, "rb") as f:
-        test_data = pickle.load(f)
-    
-    # Initialiser les métriques
-    metrics = {
-        "rewards": [],
-        "queue_lengths": [],
-        "speeds": [],
-        "congestion_levels": [],
-        "phase_changes": [],
-        "action_distribution": defaultdict(int)
+CONGESTION_THRESHOLD = 0.7  # Taux d'occupation de "2to3" au-delà duquel le pas est congestionné
+
+
+def trajectory_metrics(trajectory):
+    """Métriques par pas d'une trajectoire (colonnes de load_trajectory), calculées sur les colonnes entières"""
+    states = np.asarray(trajectory["state"])
+    return {
+        "rewards": np.asarray(trajectory["reward"], dtype=np.float64),
+        "queue_lengths": -(states[:, 0].astype(np.float64) + states[:, 1]),  # Pénalité de file (négative)
+        "speeds": (states[:, 2].astype(np.float64) + states[:, 3]) / 2,
+        "congestion_levels": states[:, 4].astype(np.float64),
+        "phase_changes": (states[1:, 5] != states[:-1, 5]).astype(np.int8),  # Un de moins que de pas
+        "actions": np.asarray(trajectory["action"], dtype=np.int64),
     }
-    
-    window_size = 50  # Pour la moyenne mobile
-    
-    # Collecter les métriques
-    for i, data in enumerate(test_data):
-        metrics["rewards"].append(data["reward"])
-        metrics["queue_lengths"].append(-(data["state"][0] + data["state"][1]))
-        metrics["speeds"].append((data["state"][2] + data["state"][3]) / 2)
-        metrics["congestion_levels"].append(data["state"][4])
-        metrics["action_distribution"][data["action"]] += 1
-        
-        if i > 0:
-            if data["state"][5] != test_data[i-1]["state"][5]:
-                metrics["phase_changes"].append(1)
-            else:
-                metrics["phase_changes"].append(0)
-    
-    # Calculer les statistiques
-    stats = {
-        "avg_reward": np.mean(metrics["rewards"]),
-        "std_reward": np.std(metrics["rewards"]),
-        "avg_queue": abs(np.mean(metrics["queue_lengths"])),
-        "avg_speed": np.mean(metrics["speeds"]),
-        "congestion_rate": np.mean(np.array(metrics["congestion_levels"]) > 0.7),
-        "phase_change_rate": np.mean(metrics["phase_changes"]),
+
+
+def concatenate_metrics(metrics_list):
+    """Métriques de plusieurs trajectoires bout à bout (aucun changement de phase compté entre deux fichiers)"""
+    return {name: np.concatenate([metrics[name] for metrics in metrics_list]) for name in metrics_list[0]}
+
+
+def compute_statistics(metrics, congestion_threshold=CONGESTION_THRESHOLD):
+    """Statistiques globales ; action_distribution : {action: nombre de pas}"""
+    histogram = np.bincount(metrics["actions"]) if len(metrics["actions"]) else np.zeros(0, dtype=np.int64)
+    return {
+        "avg_reward": float(np.mean(metrics["rewards"])),
+        "std_reward": float(np.std(metrics["rewards"])),
+        "avg_queue": float(abs(np.mean(metrics["queue_lengths"]))),
+        "avg_speed": float(np.mean(metrics["speeds"])),
+        "congestion_rate": float(np.mean(metrics["congestion_levels"] > congestion_threshold)),
+        "phase_change_rate": float(np.mean(metrics["phase_changes"])) if len(metrics["phase_changes"]) else 0.0,
+        "action_distribution": {action: int(count) for action, count in enumerate(histogram) if count},
     }
-    
-    # Visualisation
+
+
+def _sliding_extreme(values, window, ufunc, identity):
+    """Minimum ou maximum glissant en O(n) (van Herk / Gil-Werman) : cumul par blocs de window pas,
+    depuis le début et depuis la fin de chaque bloc ; une fenêtre chevauche au plus deux blocs"""
+    n = len(values)
+    blocks = np.concatenate((values, np.full(-n % window, identity))).reshape(-1, window)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+
+
+def rolling_statistics(values, window=50):
+    """Moyenne, écart-type, minimum et maximum glissants sur window pas (len(values) - window + 1 valeurs)"""
+    if window < 1:
+        raise ValueError(f"window doit être un entier positif (reçu {window!r})")
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < window:
+        empty = np.zeros(0)
+        return {"mean": empty, "std": empty, "min": empty, "max": empty}
+    centered = values - values.mean()  # Limite les erreurs d'arrondi des sommes cumulées
+    sums = np.cumsum(np.concatenate(([0.0], centered)))
+    squares = np.cumsum(np.concatenate(([0.0], centered * centered)))
+    mean = (sums[window:] - sums[:-window]) / window
+    variance = (squares[window:] - squares[:-window]) / window - mean * mean
+    return {
+        "mean": mean + values.mean(),
+        "std": np.sqrt(np.maximum(variance, 0.0)),
+        "min": _sliding_extreme(values, window, np.minimum, np.inf),
+        "max": _sliding_extreme(values, window, np.maximum, -np.inf),
+    }
+
+
+def plot_analysis(metrics, output_path="test_analysis.png", window=50):
+    """Les six graphiques de l'analyse (moyenne glissante des récompenses sur window pas)"""
     plt.figure(figsize=(15, 12))
-    
+
     # 1. Récompenses au fil du temps
     plt.subplot(3, 2, 1)
     plt.plot(metrics["rewards"])
+    rolling = rolling_statistics(metrics["rewards"], window)["mean"]
+    if len(rolling):
+        plt.plot(np.arange(window - 1, len(metrics["rewards"])), rolling, color='orange',
+                 label=f'Moyenne mobile ({window})')
+        plt.legend()
     plt.title('Récompenses au fil du temps')
     plt.xlabel('Pas de temps')
     plt.ylabel('Récompense')
-    
+
     # 2. Longueur moyenne des files d'attente
     plt.subplot(3, 2, 2)
     plt.plot(metrics["queue_lengths"])
     plt.title('Longueur des files d\'attente')
     plt.xlabel('Pas de temps')
     plt.ylabel('Nombre de véhicules')
-    
+
     # 3. Vitesse moyenne
     plt.subplot(3, 2, 3)
     plt.plot(metrics["speeds"])
     plt.title('Vitesse moyenne')
     plt.xlabel('Pas de temps')
     plt.ylabel('Vitesse (m/s)')
-    
+
     # 4. Niveau de congestion
     plt.subplot(3, 2, 4)
     plt.plot(metrics["congestion_levels"])
-    plt.axhline(y=0.7, color='r', linestyle='--')
+    plt.axhline(y=CONGESTION_THRESHOLD, color='r', linestyle='--')
     plt.title('Niveau de congestion')
     plt.xlabel('Pas de temps')
     plt.ylabel('Taux d\'occupation')
-    
+
     # 5. Distribution des actions
     plt.subplot(3, 2, 5)
-    actions = list(metrics["action_distribution"].keys())
-    counts = list(metrics["action_distribution"].values())
-    plt.bar(actions, counts)
+    histogram = np.bincount(metrics["actions"]) if len(metrics["actions"]) else np.zeros(0)
+    plt.bar(np.arange(len(histogram)), histogram)
     plt.title('Distribution des actions')
     plt.xlabel('Action')
     plt.ylabel('Fréquence')
-    
+
     # 6. Changements de phase
     plt.subplot(3, 2, 6)
     plt.plot(np.cumsum(metrics["phase_changes"]))
     plt.title('Changements de phase cumulés')
     plt.xlabel('Pas de temps')
     plt.ylabel('Nombre de changements')
-    
+
     plt.tight_layout()
-    plt.savefig('test_analysis.png')
-    
+    plt.savefig(output_path)
+    plt.close()
+
+
+def analyze_files(file_paths, congestion_threshold=CONGESTION_THRESHOLD):
+    """Statistiques de chaque trajectoire et de leur ensemble ; renvoie ({chemin: stats}, stats, métriques)"""
+    metrics_list = [trajectory_metrics(load_trajectory(path)) for path in file_paths]
+    per_file = {path: compute_statistics(metrics, congestion_threshold)
+                for path, metrics in zip(file_paths, metrics_list)}
+    metrics = concatenate_metrics(metrics_list)
+    return per_file, compute_statistics(metrics, congestion_threshold), metrics
+
+
+def analyze_test_results(file_path="DQL_TEST_VISUALISATION.traj", plot_path="test_analysis.png", window=50):
+    """Analyser une trajectoire de test (.traj, .npz ou ancien .pkl) ; plot_path=None : sans graphique"""
+    metrics = trajectory_metrics(load_trajectory(file_path))
+    stats = compute_statistics(metrics)
+    if plot_path:
+        plot_analysis(metrics, plot_path, window)
     return stats, metrics
 
-# Exécuter l'analyse
-stats, metrics = analyze_test_results()
-print("\nStatistiques de test:")
-for key, value in stats.items():
-    print(f"{key}: {value:.4f}")
+
+def print_statistics(stats):
+    for key, value in stats.items():
+        print(f"{key}: {value}" if isinstance(value, dict) else f"{key}: {value:.4f}")
+
+
+def _positive_int(text):
+    """Type argparse : entier >= 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"entier positif attendu (reçu {text})")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse des trajectoires de test de l'agent DQL")
+    parser.add_argument("files", nargs="*", default=["DQL_TEST_VISUALISATION.traj"],
+                        help="Trajectoires (.traj, .npz ou .pkl), analysées ensemble")
+    parser.add_argument("--window", type=_positive_int, default=50, help="Fenêtre des statistiques glissantes (pas)")
+    parser.add_argument("--plot", default="test_analysis.png", help="Fichier des graphiques ('' : aucun)")
+    args = parser.parse_args()
+
+    per_file, stats, metrics = analyze_files(args.files)
+    if len(per_file) > 1:
+        for path, file_stats in per_file.items():
+            print(f"\n{path} :")
+            print_statistics(file_stats)
+    if args.plot:
+        plot_analysis(metrics, args.plot, args.window)
+    print("\nStatistiques de test:")
+    print_statistics(stats)
+
+
+if __name__ == "__main__":
+    main()
+
 # Statistiques de test
 # Récompense moyenne (avg_reward): 3.5229
 
@@ -0,0 +1,246 @@
+'''Enregistrement et rejeu des appels TraCI, pour exécuter train, test ou
+evaluate_traffic sans SUMO de façon déterministe (benchmarks, intégration continue).
+- TraciRecorder(backend, path) : même interface que le module traci ; chaque appel
+  (start, simulationStep, edge.getSubscriptionResults, trafficlight.setPhase...)
+  est transmis au vrai backend puis enregistré avec ses arguments et sa réponse
+  (ou son exception) dans un fichier binaire (pickle compressé, par blocs).
+- TraciReplay(path) : même interface, sans SUMO ; chaque appel est comparé au
+  prochain appel enregistré et reçoit la réponse enregistrée. Au premier écart
+  (autre fonction, autres arguments, trace épuisée) TraceDivergence est levée.
+Les appels sont rangés par connexion (principale ou étiquetée) : l'ordre entre
+connexions avancées depuis des threads différents (SumoVecEnv) n'est pas imposé.
+check_round_trip (ou python traci_trace.py --backends traci libsumo) enregistre un
+épisode court de RampMeteringEnv avec un vrai backend puis le rejoue depuis la trace.
+'''
+import argparse
+import atexit
+import gzip
+import os
+import tempfile
+import pickle
+import threading
+import types
+from collections import defaultdict, deque
+import numpy as np
+import fake_traci
+from sim_backend import backend_name, load_backend, load_constants
+
+TRACE_VERSION = 1
+CHUNK_SIZE = 10000  # Appels par bloc écrit dans le fichier
+PASSTHROUGH = ("TraCIException", "FatalTraCIError", "exceptions", "constants")
+DOMAINS = ("edge", "lane", "junction", "trafficlight", "simulation", "vehicle", "person", "route")  # Rejoués comme objets
+MAIN_STREAM = "main"
+
+
+class TraceDivergence(BaseException):
+    '''Les appels rejoués ne suivent plus la trace enregistrée.
+    Hérite de BaseException (comme KeyboardInterrupt) pour ne pas être absorbée
+    par les "except Exception" des boucles d'entraînement et de test.'''
+
+
+def _normalize(value):
+    """Arguments comparables et sérialisables (scalaires NumPy -> Python, listes -> tuples)"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def _stream(path, name, args, kwargs, stream):
+    """Connexion à laquelle s'applique un appel de premier niveau"""
+    if stream != MAIN_STREAM:
+        return stream
+    if "label" in kwargs:
+        return kwargs["label"]
+    if name in ("getConnection", "switch") and args:
+        return args[0]
+    return MAIN_STREAM
+
+
+class _RecordingProxy:
+    def __init__(self, recorder, target, path="", stream=MAIN_STREAM):
+        self._recorder = recorder
+        self._target = target
+        self._path = path
+        self._stream = stream
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        attr = getattr(self._target, name)
+        if name in DOMAINS and self._path in ("", "connection."):  # Classes dans libsumo, objets dans traci
+            return _RecordingProxy(self._recorder, attr, f"{self._path}{name}.", self._stream)
+        if name in PASSTHROUGH or isinstance(attr, (type, types.ModuleType)):
+            return attr  # Exceptions, constantes
+        if not callable(attr):
+            return _RecordingProxy(self._recorder, attr, f"{self._path}{name}.", self._stream)  # Domaine (edge...)
+
+        def call(*args, **kwargs):
+            stream = _stream(self._path, name, args, kwargs, self._stream)
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self._recorder._record(stream, self._path + name, args, kwargs, "error", (type(e).__name__, str(e)))
+                raise
+            if name == "getConnection":  # La connexion elle-même est enregistrée par ses appels
+                self._recorder._record(stream, self._path + name, args, kwargs, "connection", None)
+                return _RecordingProxy(self._recorder, result, "connection.", stream)
+            self._recorder._record(stream, self._path + name, args, kwargs, "ok", _normalize(result))
+            if name == "close":
+                self._recorder.flush()
+            return result
+        return call
+
+
+class TraciRecorder(_RecordingProxy):
+    def __init__(self, backend, path):
+        super().__init__(self, backend)
+        self.__name__ = backend_name(backend)  # libsumo reste reconnu par supports_labels
+        self._file = gzip.open(path, "wb")
+        pickle.dump({"version": TRACE_VERSION, "backend": self.__name__}, self._file)
+        self._buffer = []
+        self._lock = threading.Lock()
+        atexit.register(self.close_trace)
+
+    def _record(self, stream, path, args, kwargs, status, value):
+        with self._lock:
+            self._buffer.append((stream, path, _normalize(args), _normalize(kwargs), status, value))
+            if len(self._buffer) >= CHUNK_SIZE:
+                self._write()
+
+    def _write(self):
+        if self._buffer:
+            pickle.dump(self._buffer, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+            self._buffer = []
+
+    def flush(self):
+        """Écrire les appels en attente (fait automatiquement à chaque close)"""
+        with self._lock:
+            self._write()
+            self._file.flush()
+
+    def close_trace(self):
+        """Terminer le fichier de trace (appelé aussi à la sortie du programme)"""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class _ReplayProxy:
+    def __init__(self, replay, path="", stream=MAIN_STREAM):
+        self._replay = replay
+        self._path = path
+        self._stream = stream
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            stream = _stream(self._path, name, args, kwargs, self._stream)
+            status, value = self._replay._next(stream, self._path + name, args, kwargs)
+            if status == "connection":
+                return _ReplayProxy(self._replay, "connection.", stream)
+            if status == "error":
+                error_type, message = value
+                raise getattr(self._replay, error_type, RuntimeError)(message)
+            return value
+
+        if name in DOMAINS and self._path in ("", "connection."):
+            return _ReplayProxy(self._replay, f"{self._path}{name}.", self._stream)
+        return call
+
+
+class TraciReplay(_ReplayProxy):
+    TraCIException = fake_traci.TraCIException
+    FatalTraCIError = fake_traci.FatalTraCIError
+    exceptions = fake_traci.exceptions
+
+    def __init__(self, path):
+        super().__init__(self)
+        self.constants = load_constants()
+        self._streams = defaultdict(deque)
+        self._positions = defaultdict(int)
+        self._lock = threading.Lock()
+        with gzip.open(path, "rb") as f:
+            header = pickle.load(f)
+            if header.get("version") != TRACE_VERSION:
+                raise ValueError(f"Version de trace non prise en charge : {header.get('version')}")
+            self.__name__ = header["backend"]
+            while True:
+                try:
+                    chunk = pickle.load(f)
+                except EOFError:  # Fin du fichier (ou enregistrement interrompu après le dernier bloc)
+                    break
+                for stream, *record in chunk:
+                    self._streams[stream].append(record)
+
+    def _next(self, stream, path, args, kwargs):
+        """Vérifier l'appel contre la trace et renvoyer (statut, réponse) enregistrés"""
+        with self._lock:
+            position = self._positions[stream]
+            if not self._streams[stream]:
+                raise TraceDivergence(f"Trace épuisée pour la connexion {stream!r} à l'appel {position} : "
+                                      f"{path}{_normalize(args)}")
+            expected_path, expected_args, expected_kwargs, status, value = self._streams[stream][0]
+            got_args, got_kwargs = _normalize(args), _normalize(kwargs)
+            if (path, got_args, got_kwargs) != (expected_path, expected_args, expected_kwargs):
+                raise TraceDivergence(
+                    f"Divergence sur la connexion {stream!r} à l'appel {position} : "
+                    f"attendu {expected_path}{expected_args}{expected_kwargs or ''}, "
+                    f"reçu {path}{got_args}{got_kwargs or ''}")
+            self._streams[stream].popleft()
+            self._positions[stream] = position + 1
+            return status, value
+
+    def remaining(self):
+        """Nombre d'appels enregistrés pas encore rejoués, par connexion"""
+        return {stream: len(records) for stream, records in self._streams.items() if records}
+
+
+def _run_episode(sim, sumo_config, steps, seed):
+    """Observations d'un épisode de steps décisions d'une seconde (phases prises à tour de rôle)"""
+    from ramp_env import RampMeteringEnv  # ramp_env importe sim_backend, qui importe ce module à la demande
+    env = RampMeteringEnv(sumo_config, backend=sim, control_interval=1, drain=None)
+    try:
+        observations = [env.reset(seed=seed)[0]]
+        for step in range(steps):
+            observations.append(env.step(step % env.action_space.n)[0])
+    finally:
+        env.close()
+    return np.array(observations)
+
+
+def check_round_trip(backend, sumo_config, path, steps=200, seed=0):
+    """Enregistrer un épisode avec backend ("traci", "libsumo"...) dans path puis le rejouer ;
+    renvoie le nombre d'appels rejoués. TraceDivergence si un appel n'est pas enregistré,
+    AssertionError si le rejeu ne redonne pas les mêmes observations ou laisse des appels."""
+    recorder = load_backend(backend, path)
+    recorded = _run_episode(recorder, sumo_config, steps, seed)
+    recorder.close_trace()
+    replay = TraciReplay(path)
+    replayed = _run_episode(replay, sumo_config, steps, seed)
+    assert np.array_equal(recorded, replayed), "Observations rejouées différentes des observations enregistrées"
+    assert not replay.remaining(), f"Appels enregistrés non rejoués : {replay.remaining()}"
+    return sum(replay._positions.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enregistrement puis rejeu d'un épisode court (vérification)")
+    parser.add_argument("--backends", nargs="+", default=["traci", "libsumo"], help="Backends à vérifier")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         "..", "..", "projectnet.sumocfg"),
+                        help="Fichier de configuration SUMO")
+    parser.add_argument("--steps", type=int, default=200, help="Décisions enregistrées")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends:
+            calls = check_round_trip(backend, args.config, os.path.join(directory, f"{backend}.trace"), args.steps)
+            print(f"{backend} : {calls} appels enregistrés puis rejoués à l'identique")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+'''Trajectoires de test en colonnes typées (remplace la liste de dicts picklée).
+Une trajectoire est un répertoire (<nom>.traj) :
+- meta.json : type NumPy et forme d'une ligne de chaque colonne ;
+- un fichier binaire brut par colonne (step.bin, state.bin, action.bin, reward.bin,
+  next_state.bin, time.bin), rempli par blocs de chunk_size pas depuis des tampons
+  préalloués : aucun objet Python par pas, et une trajectoire interrompue reste lisible
+  jusqu'au dernier bloc écrit.
+load_trajectory ouvre chaque colonne en np.memmap : lire une colonne (ou une tranche)
+ne lit que ces octets. save_npz en fait une archive .npz compressée (chaque colonne
+n'est décompressée qu'à son premier accès), que load_trajectory relit aussi, comme les
+anciens fichiers .pkl (DQL_TEST_VISUALISATION.pkl, test_data.pkl) ; convert_pickle les
+convertit en une fois.
+Points de sauvegarde : TrajectoryWriter.checkpoint enregistre l'état de la simulation
+(saveState) avant un pas dans states/ et l'ajoute à l'index checkpoints.json (pas,
+temps simulé, fichier) ; un rejeu peut ainsi repartir du point le plus proche
+(voir dql_test_visualization_with_sumo.py). Les options SUMO du test (sumo_args) sont
+gardées dans meta.json pour relancer la même simulation.
+'''
+import argparse
+import json
+import os
+import pickle
+import shutil
+import numpy as np
+
+TRAJECTORY_VERSION = 1
+COLUMNS = ("step", "state", "action", "reward", "next_state", "time")
+META_FILE = "meta.json"
+CHECKPOINT_INDEX = "checkpoints.json"
+STATES_DIR = "states"
+# Options SUMO rendant les points de sauvegarde exacts : générateurs aléatoires et valeurs à pleine précision
+CHECKPOINT_SUMO_ARGS = ["--save-state.rng", "--save-state.precision", "17"]
+
+
+def _column_types(state_size, state_dtype=np.float32):
+    """Colonne -> (type NumPy, forme d'une ligne)"""
+    state_dtype = np.dtype(state_dtype)
+    return {
+        "step": (np.dtype(np.int64), ()),
+        "state": (state_dtype, (state_size,)),
+        "action": (np.dtype(np.int16), ()),
+        "reward": (np.dtype(np.float64), ()),
+        "next_state": (state_dtype, (state_size,)),
+        "time": (np.dtype(np.float64), ()),  # Temps simulé où state a été observé (NaN s'il est inconnu)
+    }
+
+
+class TrajectoryWriter:
+    def __init__(self, path, state_size, chunk_size=4096, state_dtype=np.float32, sumo_args=None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.types = _column_types(state_size, state_dtype)
+        self.size = 0  # Pas enregistrés (écrits ou en tampon)
+        self.checkpoints = []  # Index des points de sauvegarde : {"step", "time", "file"}
+        self._buffered = 0
+        self._buffers = {name: np.empty((chunk_size,) + shape, dtype) for name, (dtype, shape) in self.types.items()}
+        os.makedirs(path, exist_ok=True)
+        shutil.rmtree(os.path.join(path, STATES_DIR), ignore_errors=True)  # Points d'un test précédent
+        if os.path.exists(os.path.join(path, CHECKPOINT_INDEX)):
+            os.remove(os.path.join(path, CHECKPOINT_INDEX))
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump({"version": TRAJECTORY_VERSION,
+                       "columns": {name: {"dtype": dtype.str, "shape": list(shape)}
+                                   for name, (dtype, shape) in self.types.items()},
+                       "sumo_args": list(sumo_args or [])}, f, indent=4)
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), "wb") for name in self.types}
+
+    def append(self, step, state, action, reward, next_state, time=np.nan):
+        """Enregistrer un pas (copié dans les tampons ; écrit sur disque tous les chunk_size pas)"""
+        i = self._buffered
+        buffers = self._buffers
+        buffers["step"][i] = step
+        buffers["state"][i] = state
+        buffers["action"][i] = action
+        buffers["reward"][i] = reward
+        buffers["next_state"][i] = next_state
+        buffers["time"][i] = time
+        self._buffered += 1
+        self.size += 1
+        if self._buffered == self.chunk_size:
+            self.flush()
+
+    def checkpoint(self, sim, step, time):
+        """Sauvegarder l'état de la simulation avant le pas step (temps simulé time) et l'indexer.
+        La simulation doit avoir été lancée avec CHECKPOINT_SUMO_ARGS pour un rejeu exact."""
+        file_name = os.path.join(STATES_DIR, f"state_{int(step):08d}.xml.gz")
+        os.makedirs(os.path.join(self.path, STATES_DIR), exist_ok=True)
+        sim.simulation.saveState(os.path.join(self.path, file_name))
+        self.checkpoints.append({"step": int(step), "time": float(time), "file": file_name})
+        index_path = os.path.join(self.path, CHECKPOINT_INDEX)
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(self.checkpoints, f)
+        os.replace(index_path + ".tmp", index_path)  # L'index ne désigne que des états complets
+
+    def flush(self):
+        """Écrire les pas en tampon à la fin de chaque colonne"""
+        for name, f in self._files.items():
+            self._buffers[name][:self._buffered].tofile(f)
+            f.flush()
+        self._buffered = 0
+
+    def close(self):
+        if not all(f.closed for f in self._files.values()):
+            self.flush()
+            for f in self._files.values():
+                f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _NpzColumns:
+    """Colonnes d'une archive .npz : NpzFile redécompresse un membre à chaque accès,
+    chaque colonne est donc gardée après sa première lecture"""
+
+    def __init__(self, archive):
+        self.archive = archive
+        self._cache = {}
+
+    def __getitem__(self, name):
+        if name not in self._cache:
+            self._cache[name] = self.archive[name]
+        return self._cache[name]
+
+    def keys(self):
+        return self.archive.files
+
+
+class Trajectory:
+    """Colonnes d'une trajectoire (traj["reward"], traj["state"][:, 5]...), en lecture seule"""
+
+    def __init__(self, columns, path=None, sumo_args=(), checkpoints=()):
+        self.columns = columns  # Nom -> tableau (np.memmap, colonne de .npz ou en mémoire)
+        self.path = path
+        self.sumo_args = list(sumo_args)  # Options SUMO du test enregistré
+        self.checkpoints = list(checkpoints)  # {"step", "time", "file"} triés par pas ; file relatif à path
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return len(self.columns["step"])
+
+    def keys(self):
+        return self.columns.keys()
+
+    @classmethod
+    def from_records(cls, records, path=None):
+        """Depuis l'ancien format : liste de dicts {"state", "action", "reward", "next_state"}"""
+        states = np.asarray([r["state"] for r in records], dtype=np.float32)
+        n = len(records)
+        types = _column_types(states.shape[1] if states.ndim == 2 else 0)
+        columns = {
+            "step": np.arange(n, dtype=types["step"][0]),
+            "state": states.reshape((n,) + types["state"][1]),
+            "action": np.fromiter((r["action"] for r in records), types["action"][0], n),
+            "reward": np.fromiter((r["reward"] for r in records), types["reward"][0], n),
+            "next_state": np.asarray([r["next_state"] for r in records],
+                                     dtype=np.float32).reshape((n,) + types["next_state"][1]),
+            "time": np.full(n, np.nan),  # Non enregistré dans l'ancien format
+        }
+        return cls(columns, path)
+
+
+def _open_directory(path):
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("version") != TRAJECTORY_VERSION:
+        raise ValueError(f"Version de trajectoire non prise en charge : {meta.get('version')}")
+    columns = {}
+    for name, info in meta["columns"].items():
+        dtype, shape = np.dtype(info["dtype"]), tuple(info["shape"])
+        file_path = os.path.join(path, f"{name}.bin")
+        row_size = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        rows = os.path.getsize(file_path) // row_size if row_size else 0
+        columns[name] = (np.memmap(file_path, dtype=dtype, mode="r", shape=(rows,) + shape) if rows
+                         else np.empty((0,) + shape, dtype))  # mmap refuse un fichier vide
+    rows = min(len(column) for column in columns.values())  # Écriture interrompue au milieu d'un bloc
+    checkpoints = []
+    if os.path.exists(os.path.join(path, CHECKPOINT_INDEX)):
+        with open(os.path.join(path, CHECKPOINT_INDEX)) as f:
+            checkpoints = [checkpoint for checkpoint in json.load(f) if checkpoint["step"] <= rows]
+    return Trajectory({name: column[:rows] for name, column in columns.items()}, path,
+                      meta.get("sumo_args", ()), checkpoints)
+
+
+def load_trajectory(path):
+    """Ouvrir une trajectoire : répertoire .traj (mmap), archive .npz ou ancien fichier .pkl"""
+    if os.path.isdir(path):
+        return _open_directory(path)
+    if path.endswith(".npz"):
+        return Trajectory(_NpzColumns(np.load(path)), path)
+    with open(path, "rb") as f:
+        return Trajectory.from_records(pickle.load(f), path)
+
+
+def save_trajectory(trajectory, path, chunk_size=65536):
+    """Écrire une trajectoire (n'importe quelle source) dans un répertoire .traj"""
+    state = trajectory["state"]
+    with TrajectoryWriter(path, state.shape[1], chunk_size, state.dtype) as writer:
+        for name, f in writer._files.items():
+            column = trajectory[name]
+            for start in range(0, len(column), chunk_size):  # Par blocs : la source peut être un mmap
+                np.ascontiguousarray(column[start:start + chunk_size], writer.types[name][0]).tofile(f)
+    return path
+
+
+def save_npz(trajectory, path):
+    """Archive compressée d'une trajectoire (une entrée par colonne)"""
+    np.savez_compressed(path, **{name: np.asarray(trajectory[name]) for name in COLUMNS})
+    return path
+
+
+def convert_pickle(pkl_path, out_path=None, compress=False):
+    """Convertir un ancien fichier .pkl (liste de dicts) ; renvoie le chemin écrit
+    (<nom>.traj par défaut, <nom>.npz avec compress=True)"""
+    trajectory = load_trajectory(pkl_path)
+    base = os.path.splitext(pkl_path)[0]
+    if compress:
+        return save_npz(trajectory, out_path or base + ".npz")
+    return save_trajectory(trajectory, out_path or base + ".traj")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversion des anciennes trajectoires .pkl en colonnes typées")
+    parser.add_argument("files", nargs="+", help="Fichiers .pkl à convertir")
+    parser.add_argument("--compress", action="store_true", help="Écrire une archive .npz compressée")
+    args = parser.parse_args()
+    for pkl_path in args.files:
+        out_path = convert_pickle(pkl_path, compress=args.compress)
+        print(f"{pkl_path} -> {out_path} ({len(load_trajectory(out_path))} pas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+'''Environnement vectorisé : N instances SUMO indépendantes avancées en parallèle.
+Chaque instance est un processus SUMO séparé, piloté par sa propre connexion
+TraCI étiquetée (traci.start(..., label=...)). Les pas de simulation des N
+connexions sont envoyés depuis un pool de threads : les appels TraCI attendent
+sur une socket et libèrent le GIL, donc les N processus SUMO calculent en même
+temps. Chaque instance est un RampMeteringEnv ; les environnements terminés
+sont réinitialisés automatiquement.
+'''
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from ramp_env import RampMeteringEnv
+from sim_backend import backend_name, supports_labels
+
+
+class SumoVecEnv:
+    def __init__(self, agent, sumo_config, num_envs, control_traffic_lights=True,
+                 base_seed=0, sumo_binary="sumo", control_interval=None, warmup=None):
+        self.agent = agent  # Fournit le backend et la durée des épisodes
+        if not supports_labels(agent.sim):
+            raise ValueError(f"Le backend {backend_name(agent.sim)} ne gère qu'une simulation par processus")
+        self.num_envs = num_envs
+        self.base_seed = base_seed
+        self.envs = [RampMeteringEnv(sumo_config, backend=agent.sim, control_traffic_lights=control_traffic_lights,
+                                     control_interval=control_interval, episode_length=agent.SIMULATION_TIME,
+                                     label=f"vec_env_{i}", sumo_binary=sumo_binary, warmup=warmup)
+                     for i in range(num_envs)]
+        self.observation_space = self.envs[0].observation_space
+        self.action_space = self.envs[0].action_space
+
+        self.episode_counts = np.zeros(num_envs, dtype=int)  # Épisodes commencés par instance
+        self.observations = np.zeros((num_envs, agent.STATE_DIM), dtype=np.float32)
+        self.pool = ThreadPoolExecutor(max_workers=num_envs)
+
+    def _seed(self, i):
+        """Graine distincte pour chaque instance et chaque épisode"""
+        return self.base_seed + i + self.num_envs * int(self.episode_counts[i])
+
+    def _reset_one(self, i):
+        """Recharger la simulation i et renvoyer son état initial"""
+        self.episode_counts[i] += 1
+        state, _ = self.envs[i].reset(seed=self._seed(i))
+        return state
+
+    def reset(self):
+        """Réinitialiser toutes les simulations et renvoyer les états initiaux (N, STATE_DIM)"""
+        self.observations = np.stack(list(self.pool.map(self._reset_one, range(self.num_envs))))
+        return self.observations
+
+    def _step_one(self, i, action):
+        """Appliquer une action dans la simulation i"""
+        next_state, reward, terminated, truncated, _ = self.envs[i].step(action)
+        observation = self._reset_one(i) if terminated or truncated else next_state
+        return next_state, reward, terminated, truncated, observation
+
+    def step(self, actions):
+        """Avancer les N simulations en parallèle (lockstep).
+        Renvoie (next_states, rewards, terminated, truncated) ; self.observations contient ensuite
+        les états à partir desquels choisir les prochaines actions."""
+        results = list(self.pool.map(self._step_one, range(self.num_envs), actions))
+        next_states = np.stack([r[0] for r in results])
+        rewards = np.array([r[1] for r in results], dtype=np.float32)
+        terminated = np.array([r[2] for r in results], dtype=bool)
+        truncated = np.array([r[3] for r in results], dtype=bool)
+        self.observations = np.stack([r[4] for r in results])  # Nouveau tableau : les lots précédents restent valides
+        return next_states, rewards, terminated, truncated
+
+    def close(self):
+        """Fermer toutes les connexions SUMO"""
+        for env in self.envs:
+            try:
+                env.close()
+            except Exception as e:
+                print(f"Erreur lors de la fermeture de SUMO: {e}")
+        self.pool.shutdown(wait=False)
@@ -1,8 +1,20 @@
-import traci
+import argparse
+import os
+import sys
 import numpy as np
 import tensorflow as tf
 import matplotlib.pyplot as plt
 
+# Modules shared with the DQL agent (replay buffer, ...)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "DQL"))
+from replay_buffer import ReplayBuffer
+from state_subscription import StateSubscription, QL_FEATURES
+import sim_backend
+
+# Simulation backend: traci (socket), libsumo (in-process) or fake (no SUMO)
+args, _ = sim_backend.add_backend_argument(argparse.ArgumentParser(description="QL training")).parse_known_args()
+traci = sim_backend.load_backend(args.backend, args.trace)
+
 # Constants
 NUM_PHASES = 3  # Number of traffic light phases
 STATE_DIM = 4  # [queue_main, queue_ramp, speed_main, speed_ramp]
@@ -23,8 +35,11 @@ model = tf.keras.Sequential([
 ])
 model.compile(optimizer=tf.optimizers.Adam(learning_rate=ALPHA), loss="mse")
 
-# Replay memory
-memory = []
+# Replay memory (preallocated ring buffer)
+memory = ReplayBuffer(MEMORY_CAPACITY, STATE_DIM)
+
+# State variables are delivered by SUMO with every simulation step
+state_subscription = StateSubscription(QL_FEATURES)
 
 # Performance tracking
 episode_rewards = []
@@ -35,13 +50,7 @@ def get_state():
     Returns:
         np.array: State vector [queue_main, queue_ramp, speed_main, speed_ramp].
     """
-    state = [
-        traci.edge.getLastStepHaltingNumber("in"),      # Queue on main road
-        traci.edge.getLastStepHaltingNumber("E2"),      # Queue on ramp
-        traci.edge.getLastStepMeanSpeed("in"),          # Speed on main road
-        traci.edge.getLastStepMeanSpeed("E2"),          # Speed on ramp
-    ]
-    return np.array(state)
+    return state_subscription.read(traci)
 
 def choose_action(state):
     """
@@ -86,15 +95,8 @@ def update_q_network():
     if len(memory) < BATCH_SIZE:
         return
 
-    # Sample indices manually
-    indices = np.random.choice(len(memory), BATCH_SIZE, replace=False)
-    minibatch = [memory[i] for i in indices]
-
-    states = np.vstack([transition[0] for transition in minibatch])
-    actions = np.array([transition[1] for transition in minibatch])
-    rewards = np.array([transition[2] for transition in minibatch])
-    next_states = np.vstack([transition[3] for transition in minibatch])
-    terminals = np.array([transition[4] for transition in minibatch])
+    # Sample a minibatch as ready-made arrays
+    states, actions, rewards, next_states, terminals = memory.sample(BATCH_SIZE)
 
     q_values = model.predict(states, verbose=0)
     next_q_values = model.predict(next_states, verbose=0)
@@ -120,6 +122,7 @@ sumo_binary = "sumo-gui"  # Use "sumo" for command-line version
 config_file = r"C:\Users\PRO INFORMATIQUE\Desktop\rl\rlprj\projectnet.sumocfg"# Replace with your SUMO configuration file
 
 traci.start([sumo_binary, "-c", config_file])
+state_subscription.subscribe(traci)
 
 # Training loop
 # Training loop
@@ -147,9 +150,7 @@ for episode in range(NUM_EPISODES):
         done = check_if_done()
 
         # Store the transition in the replay memory
-        memory.append((state, action, reward, next_state, done))
-        if len(memory) > MEMORY_CAPACITY:
-            memory.pop(0)
+        memory.add(state, action, reward, next_state, done)
 
         # Update the Q-network
         update_q_network()
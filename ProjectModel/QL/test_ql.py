@@ -1,25 +1,28 @@
-import pickle
 import time
 import numpy as np
+import os
+import sys
 import traci
 import tensorflow as tf
 from tensorflow.keras.losses import MeanSquaredError
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "DQL"))
+from state_subscription import StateSubscription, QL_FEATURES
+from trajectory import TrajectoryWriter
+
 # Charger le modèle
 model = tf.keras.models.load_model(
     "trained_traffic_light_model_ql.h5",
     custom_objects={"mse": MeanSquaredError()}
 )
 
+# Abonnements TraCI : l'état est renvoyé par SUMO à chaque pas de simulation
+state_subscription = StateSubscription(QL_FEATURES)
+
 # Fonction pour obtenir l'état actuel
 def get_state():
     """Récupérer l'état actuel de la circulation depuis SUMO."""
-    return [
-        traci.edge.getLastStepHaltingNumber("in"),
-        traci.edge.getLastStepHaltingNumber("E2"),
-        traci.edge.getLastStepMeanSpeed("in"),
-        traci.edge.getLastStepMeanSpeed("E2"),
-    ]
+    return state_subscription.read(traci).tolist()
 
 # Fonction pour calculer la récompense
 def calculate_reward(state, next_state):
@@ -32,13 +35,14 @@ def calculate_reward(state, next_state):
 config_file = r"C:\Users\PRO INFORMATIQUE\Desktop\rl\rlprj\projectnet.sumocfg"
 try:
     traci.start(["sumo-gui", "-c", config_file])
+    state_subscription.subscribe(traci)
     print("SUMO démarré avec succès.")
 except Exception as e:
     print(f"Erreur lors du démarrage de SUMO: {e}")
     exit()
 
-# Initialiser les données de test
-test_data = []
+# Enregistrer les données de test en colonnes typées (voir DQL/trajectory.py)
+test_data = TrajectoryWriter("test_data.traj", len(QL_FEATURES))
 
 # Limite d'itérations pour éviter une boucle infinie
 iteration_limit = 1000
@@ -49,6 +53,7 @@ try:
     while traci.simulation.getMinExpectedNumber() > 0 and iteration_count < iteration_limit:
         # Récupérer l'état actuel
         state = get_state()
+        sim_time = traci.simulation.getTime()  # Instant où l'état est observé
 
         # Prédire les valeurs Q et choisir la meilleure action
         q_values = model.predict(np.array(state).reshape(1, -1), verbose=0)[0]
@@ -67,12 +72,7 @@ try:
         reward = calculate_reward(state, next_state)
 
         # Enregistrer les données de test
-        test_data.append({
-            "state": state,
-            "action": action,
-            "reward": reward,
-            "next_state": next_state
-        })
+        test_data.append(iteration_count, state, action, reward, next_state, sim_time)
 
         # Compter le nombre d'itérations
         iteration_count += 1
@@ -83,9 +83,8 @@ except Exception as e:
 
 finally:
     # Sauvegarder les données de test dans un fichier
-    with open("test_data.pkl", "wb") as f:
-        pickle.dump(test_data, f)
-        print("Données de test sauvegardées dans 'test_data.pkl'.")
+    test_data.close()
+    print(f"Données de test sauvegardées dans 'test_data.traj' ({test_data.size} pas).")
 
     # Fermer la connexion SUMO
     traci.close()
@@ -1,10 +1,14 @@
 import traci
-import pickle
+import os
+import sys
 import time
 import numpy as np
 import tensorflow as tf
 from keras.losses import MeanSquaredError  # Importer la fonction de perte
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "DQL"))
+from trajectory import load_trajectory
+
 # Charger le modèle entraîné avec la fonction de perte 'mse'
 # Charger le modèle
 model = tf.keras.models.load_model(
@@ -13,9 +17,8 @@ model = tf.keras.models.load_model(
 )
 # Charger les données de test
 try:
-    with open(r"C:\Users\PRO INFORMATIQUE\Desktop\rl\rlprj\ProjectModel\QL\test_data.pkl", "rb") as f:
- 
-        test_data = pickle.load(f)
+    # Colonnes typées (un ancien test_data.pkl se relit aussi, ou se convertit avec DQL/trajectory.py)
+    test_data = load_trajectory(r"C:\Users\PRO INFORMATIQUE\Desktop\rl\rlprj\ProjectModel\QL\test_data.traj")
     print("Données de test chargées avec succès.")
 except Exception as e:
     print(f"Erreur lors du chargement des données de test: {e}")
@@ -27,9 +30,7 @@ try:
     print("Connexion à SUMO réussie.")
 
     # Boucler à travers les données de test et appliquer les actions
-    for entry in test_data:
-        state = entry["state"]
-
+    for state in test_data["state"]:
         # Utiliser le modèle entraîné pour choisir une action
         q_values = model.predict(np.array(state).reshape(1, -1))[0]
         action = np.argmax(q_values)